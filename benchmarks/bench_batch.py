@@ -0,0 +1,98 @@
+"""
+Benchmark: prompts for many ranges from one `batch` process versus one `run` process per range.
+
+Creates a synthetic repository with `--ranges` branches, each changing a few
+functions in `--files-per-branch` modules, then generates a prompt for every
+`main..branch` range, once with a single `codereviewprompt batch` process and
+once with as many sequential `codereviewprompt run` processes. Both start with
+a cold symbol cache.
+
+    python benchmarks/bench_batch.py --ranges 200
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from codereviewprompt.bench import Scenario, _module_source
+
+CLI = [sys.executable, '-m', 'codereviewprompt.cli']
+
+
+def make_repo(root: str, ranges: int, files: int, files_per_branch: int) -> list[str]:
+    """Create a repo with a `main` branch and `ranges` topic branches; return their names."""
+    scenario = Scenario('batch', files=files, functions=100, hunk_density=0.05, depth=1)
+
+    def git(*args):
+        subprocess.run(['git', *args], cwd=root, check=True, stdout=subprocess.DEVNULL)
+
+    git('init', '-q', '-b', 'main')
+    git('config', 'user.email', 'bench@example.com')
+    git('config', 'user.name', 'Bench')
+    os.makedirs(os.path.join(root, 'pkg'))
+    base, changed = _module_source(scenario, False), _module_source(scenario, True)
+    for n in range(files):
+        with open(os.path.join(root, 'pkg', f'mod_{n}.py'), 'w', encoding='utf-8') as f:
+            f.write(base)
+    git('add', '.')
+    git('commit', '-q', '-m', 'base')
+    branches = []
+    for i in range(ranges):
+        branch = f'topic-{i}'
+        git('checkout', '-q', '-b', branch, 'main')
+        for k in range(files_per_branch):
+            with open(os.path.join(root, 'pkg', f'mod_{(i + k) % files}.py'), 'w', encoding='utf-8') as f:
+                f.write(changed)
+        git('commit', '-q', '-am', branch)
+        branches.append(branch)
+    git('checkout', '-q', 'main')
+    return branches
+
+
+def timed(commands: list[list[str]], cwd: str) -> float:
+    start = time.perf_counter()
+    for command in commands:
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ranges', type=int, default=200)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--files-per-branch', type=int, default=3)
+    parser.add_argument('--context-lines', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        branches = make_repo(root, args.ranges, args.files, args.files_per_branch)
+        ranges_file = os.path.join(root, 'ranges.txt')
+        with open(ranges_file, 'w', encoding='utf-8') as f:
+            f.writelines(f'main..{branch}\n' for branch in branches)
+        common = ['--context-lines', str(args.context_lines)]
+        subprocess.run(CLI + ['cache', 'clear'], cwd=root, check=True, stdout=subprocess.DEVNULL)
+        batch = CLI + ['batch', ranges_file, '--out-dir', os.path.join(root, 'batch')] + common
+        if args.jobs:
+            batch += ['--jobs', str(args.jobs)]
+        batch_seconds = timed([batch], root)
+        subprocess.run(CLI + ['cache', 'clear'], cwd=root, check=True, stdout=subprocess.DEVNULL)
+        os.makedirs(os.path.join(root, 'run'))
+        runs = [
+            CLI + ['run', '--base', 'main', '--head', branch, '--out',
+                   os.path.join(root, 'run', f'{branch}.md')] + common
+            for branch in branches
+        ]
+        run_seconds = timed(runs, root)
+
+    print(f'{args.ranges} ranges, {args.files_per_branch} changed files each')
+    print(f'{"mode":<16} {"seconds":>8} {"ranges/s":>9}')
+    for name, seconds in (('batch', batch_seconds), ('sequential run', run_seconds)):
+        print(f'{name:<16} {seconds:>8.2f} {args.ranges / seconds:>9.1f}')
+    print(f'speedup: {run_seconds / batch_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
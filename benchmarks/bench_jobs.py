@@ -0,0 +1,60 @@
+"""
+Benchmark: context extraction throughput versus worker count.
+
+Generates a directory of synthetic Python modules and times `extract_all`
+with 1, 2, 4, ... workers up to the CPU count.
+
+    python benchmarks/bench_jobs.py --files 500 --functions 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from codereviewprompt.context import extract_all
+
+
+def make_files(root: str, files: int, functions: int) -> dict[str, list[tuple[int, int]]]:
+    """Write `files` modules of `functions` functions each and return a hunk map."""
+    hunks_map = {}
+    body = ''.join(
+        f'def func_{i}(x):\n    y = x + {i}\n    return y * 2\n\n' for i in range(functions)
+    )
+    for n in range(files):
+        path = os.path.join(root, f'mod_{n}.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(body)
+        # One hunk in every tenth function
+        hunks_map[path] = [(i * 4 + 2, i * 4 + 2) for i in range(0, functions, 10)]
+    return hunks_map
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--functions', type=int, default=200)
+    parser.add_argument('--context-lines', type=int, default=5)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 <= cpus:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cpus:
+        workers.append(cpus)
+
+    with tempfile.TemporaryDirectory() as root:
+        hunks_map = make_files(root, args.files, args.functions)
+        baseline = None
+        print(f'{"jobs":>4}  {"seconds":>8}  {"files/s":>8}  {"speedup":>7}')
+        for jobs in workers:
+            start = time.perf_counter()
+            for _ in extract_all(hunks_map, args.context_lines, jobs):
+                pass
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f'{jobs:>4}  {elapsed:>8.3f}  {args.files / elapsed:>8.1f}  {baseline / elapsed:>6.2f}x')
+
+
+if __name__ == '__main__':
+    main()
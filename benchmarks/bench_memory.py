@@ -0,0 +1,86 @@
+"""
+Benchmark: memory held by hunk and snippet records for a very large diff.
+
+Builds the hunk map and line-window snippets for `--files` files with
+`--hunks` hunks each (100k hunks and the CLI's 50 context lines by default),
+once with lists of tuples and snippet dicts holding copied text, and once with
+the array-backed hunks and buffer-view snippets, and reports the memory each
+keeps alive via tracemalloc. Views keep whole files alive, so they only pay
+off when snippets cover a good part of each file.
+
+    python benchmarks/bench_memory.py --files 1000 --hunks 100
+"""
+import argparse
+import gc
+import tracemalloc
+
+from codereviewprompt.diff import extract_context
+from codereviewprompt.records import IntTuples, SourceBuffer
+
+
+def make_lines(count: int) -> list[str]:
+    return [f'    value_{i} = compute({i}, other={i * 2})\n' for i in range(count)]
+
+
+def legacy(lines: list[str], files: int, hunks: int, context_lines: int):
+    """Tuples in lists and dict snippets with their own copy of the text."""
+    hunks_map, contexts = {}, []
+    for n in range(files):
+        path = f'pkg/mod_{n}.py'
+        ranges = [(i * 20 + 10, i * 20 + 11) for i in range(hunks)]
+        hunks_map[path] = ranges
+        file_lines = list(lines)
+        for start, end in ranges:
+            ctx_start = max(1, start - context_lines)
+            ctx_end = min(len(file_lines), end + context_lines)
+            contexts.append({
+                'file_path': path,
+                'hunk_start': start,
+                'hunk_end': end,
+                'context_start': ctx_start,
+                'context_end': ctx_end,
+                'snippet': ''.join(file_lines[ctx_start - 1:ctx_end]),
+            })
+    return hunks_map, contexts
+
+
+def compact(lines: list[str], files: int, hunks: int, context_lines: int):
+    """Array-backed hunks and snippets viewing one buffer per file."""
+    hunks_map, contexts = {}, []
+    for n in range(files):
+        path = f'pkg/mod_{n}.py'
+        ranges = IntTuples(2, ((i * 20 + 10, i * 20 + 11) for i in range(hunks)))
+        hunks_map[path] = ranges
+        contexts.extend(extract_context(path, ranges, context_lines, SourceBuffer(lines)))
+    return hunks_map, contexts
+
+
+def measure(build, *args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    kept = build(*args)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--hunks', type=int, default=100, help='hunks per file')
+    parser.add_argument('--context-lines', type=int, default=50)
+    args = parser.parse_args()
+
+    lines = make_lines(args.hunks * 20 + 10)
+    params = (lines, args.files, args.hunks, args.context_lines)
+    before = measure(legacy, *params)
+    after = measure(compact, *params)
+    print(f'{args.files * args.hunks} hunks, {args.context_lines} context lines')
+    print(f'{"tuples + dict snippets":<24} {before / 2**20:>8.1f} MiB')
+    print(f'{"arrays + buffer views":<24} {after / 2**20:>8.1f} MiB  ({before / after:.1f}x less)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: line windows from a huge generated file, read versus memory-mapped.
+
+Writes a `--megabytes` SQL-dump-like file and extracts `--hunks` line windows
+from it, once through `readlines()` and once through a memory-mapped
+`MappedBuffer`, reporting wall time and the peak Python heap (tracemalloc).
+
+    python benchmarks/bench_mmap.py --megabytes 300 --hunks 100
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from codereviewprompt.diff import extract_context
+from codereviewprompt.mapped import MappedBuffer
+
+
+def write_dump(path: str, megabytes: int) -> int:
+    """Write about `megabytes` MiB of INSERT statements and return the line count."""
+    line = "INSERT INTO events VALUES ({}, 'user', '2024-01-01T00:00:00', 'payload');\n"
+    lines = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while f.tell() < megabytes * 2**20:
+            f.write(''.join(line.format(lines + i) for i in range(10_000)))
+            lines += 10_000
+    return lines
+
+
+def measure(func) -> tuple[float, int]:
+    """Wall time of one plain run, then peak Python heap of a traced run."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--megabytes', type=int, default=200)
+    parser.add_argument('--hunks', type=int, default=100)
+    parser.add_argument('--context-lines', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'dump.sql')
+        lines = write_dump(path, args.megabytes)
+        step = lines // (args.hunks + 1)
+        hunks = [(i * step, i * step) for i in range(1, args.hunks + 1)]
+
+        def rendered(source):
+            return sum(len(ctx['snippet']) for ctx in extract_context(path, hunks, args.context_lines, source))
+
+        runs = {
+            'readlines': lambda: rendered(None),
+            'mmap': lambda: rendered(MappedBuffer(path)),
+        }
+        print(f'{lines} lines, {args.hunks} hunks')
+        print(f'{"reader":<10} {"seconds":>8} {"peak heap (MiB)":>16}')
+        for name, func in runs.items():
+            elapsed, peak = measure(func)
+            print(f'{name:<10} {elapsed:>8.3f} {peak / 2**20:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
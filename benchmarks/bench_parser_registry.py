@@ -0,0 +1,72 @@
+"""
+Benchmark: per-file parse overhead before and after the parser registry.
+
+Parses 1,000 small Python sources three ways:
+  * legacy: the previous per-file path (import tree_sitter_languages, build a
+    new Parser, and on failure re-parse the source with `ast`);
+  * fresh: a new Language and Parser built for every file;
+  * registry: the process-wide registry in `codereviewprompt.context`.
+
+    python benchmarks/bench_parser_registry.py --files 1000
+"""
+import argparse
+import ast
+import time
+
+from codereviewprompt.context import get_language, get_parser, parser_backend
+
+
+def legacy_parse(source: bytes) -> None:
+    """The per-file parse path used before the registry existed."""
+    try:
+        from tree_sitter import Parser
+        from tree_sitter_languages import get_language as legacy_get_language
+
+        parser = Parser()
+        parser.language = legacy_get_language('python')
+        parser.parse(source)
+        return
+    except Exception:
+        pass
+    for node in ast.walk(ast.parse(source)):
+        pass
+
+
+def timed(label: str, func, sources: list[bytes]) -> float:
+    start = time.perf_counter()
+    for source in sources:
+        func(source)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<10} {elapsed * 1e6 / len(sources):8.1f} us/file')
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=1000)
+    args = parser.parse_args()
+
+    if parser_backend('python') != 'tree-sitter':
+        raise SystemExit('No Tree-sitter Python grammar installed; nothing to compare.')
+
+    sources = [
+        f'def func_{i}(x):\n    return x + {i}\n\nclass C{i}:\n    pass\n'.encode()
+        for i in range(args.files)
+    ]
+
+    from tree_sitter import Language, Parser
+    import tree_sitter_python
+
+    def fresh_parse(source: bytes) -> None:
+        Parser(Language(tree_sitter_python.language())).parse(source)
+
+    get_language('python')  # exclude the one-off grammar load from the timing
+    print(f'{args.files} files')
+    legacy = timed('legacy', legacy_parse, sources)
+    timed('fresh', fresh_parse, sources)
+    registry = timed('registry', lambda source: get_parser('python').parse(source), sources)
+    print(f'speedup vs legacy: {legacy / registry:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+Benchmark: every pipeline stage on synthetic git repositories.
+
+Thin wrapper around `codereviewprompt bench`; results saved with `--output`
+can be compared against a later commit with `--compare`.
+
+    python benchmarks/bench_suite.py -s medium -o before.json
+    python benchmarks/bench_suite.py -s medium --compare before.json
+"""
+import sys
+
+from codereviewprompt.cli import cli
+
+if __name__ == '__main__':
+    cli(['bench', *sys.argv[1:]])
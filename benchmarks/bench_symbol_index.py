@@ -0,0 +1,64 @@
+"""
+Benchmark: hunk-to-symbol lookup, linear scan versus SymbolIndex.
+
+Builds the symbol ranges of a synthetic ~50k-line module (classes with
+methods plus top-level functions) and resolves a few hundred hunks with
+the old first-match linear scan and with the bisect-based SymbolIndex.
+
+    python benchmarks/bench_symbol_index.py --lines 50000 --hunks 500
+"""
+import argparse
+import random
+import time
+
+from codereviewprompt.context import SymbolIndex
+
+
+def synthetic_ranges(lines: int) -> list[tuple[int, int]]:
+    """Symbol ranges for a module of classes (10 methods of 8 lines) and functions."""
+    ranges = []
+    line = 1
+    while line < lines:
+        if (line // 100) % 2:
+            start = line
+            line += 1
+            for _ in range(10):
+                ranges.append((line, line + 7))
+                line += 8
+            ranges.append((start, line - 1))
+        else:
+            ranges.append((line, line + 5))
+            line += 7
+    return ranges
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=50_000)
+    parser.add_argument('--hunks', type=int, default=500)
+    args = parser.parse_args()
+
+    ranges = synthetic_ranges(args.lines)
+    rng = random.Random(0)
+    hunks = [rng.randint(1, args.lines) for _ in range(args.hunks)]
+
+    start = time.perf_counter()
+    for line in hunks:
+        next(((s, e) for (s, e) in ranges if s <= line <= e), None)
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SymbolIndex(ranges)
+    built = time.perf_counter() - start
+    for line in hunks:
+        index.innermost(line)
+    indexed = time.perf_counter() - start
+
+    print(f'{len(ranges)} symbols, {len(hunks)} hunks')
+    print(f'linear scan:         {linear * 1000:9.2f} ms')
+    print(f'SymbolIndex (total): {indexed * 1000:9.2f} ms  (build {built * 1000:.2f} ms)')
+    print(f'speedup:             {linear / indexed:9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Batch mode: generate one prompt file per `base..head` range in a single
+process, sharing the git object reader, grammar registry and symbol cache.
+"""
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+from codereviewprompt.blobs import BlobReader
+from codereviewprompt.context import coalesce_contexts, extract_all
+from codereviewprompt.diff import read_diff
+from codereviewprompt.filters import PathFilter, exclude_paths
+from codereviewprompt.render import fixed_text, write_prompt
+
+if TYPE_CHECKING:
+    from codereviewprompt.cache import SymbolCache
+
+_UNSAFE_NAME_RE = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+@dataclass(frozen=True)
+class Range:
+    """One line of a ranges file: diff `base` against `head`, written to `name`.md."""
+    base: str
+    head: str
+    # 'base...head': diff against the merge base, like a pull request
+    symmetric: bool = False
+    name: str = ''
+
+    @property
+    def spec(self) -> str:
+        return f"{self.base}{'...' if self.symmetric else '..'}{self.head}"
+
+
+@dataclass
+class RangeResult:
+    """Outcome of one range: the prompt written, or why there is none."""
+    range: Range
+    path: str | None = None
+    files: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+    # Files left without context because extraction failed, with the reason
+    skipped: dict[str, str] = field(default_factory=dict)
+
+
+def parse_ranges(lines: Iterable[str]) -> list[Range]:
+    """
+    Parse ranges, one per line: `base..head` or `base...head`, optionally
+    followed by a prompt file name. An empty side means HEAD, as in git.
+    Names are made file-name safe like the default ones derived from the
+    range; names with path separators and duplicate names are rejected.
+    Blank lines and '#' comments are skipped; anything else raises ValueError.
+    """
+    ranges = []
+    seen: dict[str, int] = {}
+    for number, line in enumerate(lines, 1):
+        fields = line.split('#', 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) > 2:
+            raise ValueError(f"line {number}: expected a range and an optional name")
+        spec = fields[0]
+        symmetric = '...' in spec
+        base, sep, head = spec.partition('...' if symmetric else '..')
+        if not sep or '..' in head:
+            raise ValueError(f"line {number}: not a base..head range: {spec}")
+        if len(fields) == 2 and ('/' in fields[1] or '\\' in fields[1]):
+            raise ValueError(f"line {number}: name must not contain a path separator: {fields[1]}")
+        name = _UNSAFE_NAME_RE.sub('_', fields[1] if len(fields) == 2 else spec)
+        if name in seen:
+            raise ValueError(f"line {number}: name {name} is already used on line {seen[name]}")
+        seen[name] = number
+        ranges.append(Range(base or 'HEAD', head or 'HEAD', symmetric, name))
+    return ranges
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(
+            ['git', *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def _resolve(rng: Range) -> tuple[str, str]:
+    """Commit ids to diff for `rng`; raises ValueError for unknown revisions."""
+    head = _git('rev-parse', '--verify', '--quiet', f'{rng.head}^{{commit}}')
+    base = _git('rev-parse', '--verify', '--quiet', f'{rng.base}^{{commit}}')
+    for rev, commit in ((rng.base, base), (rng.head, head)):
+        if not commit:
+            raise ValueError(f"unknown revision: {rev}")
+    if rng.symmetric:
+        base = _git('merge-base', base, head)
+        if not base:
+            raise ValueError(f"no merge base for {rng.spec}")
+    return base, head
+
+
+class BatchRunner:
+    """
+    Generates prompts for many ranges with one `git cat-file` process, one
+    symbol cache and the process-wide grammar registry. Up to `jobs` ranges
+    (default: CPU count) are processed at once, each by one thread that diffs,
+    extracts and renders it; files within a range are extracted in order.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        context_lines: int,
+        scope: str = 'innermost',
+        cache: 'SymbolCache | None' = None,
+        jobs: int | None = None,
+        path_filter: PathFilter | None = None,
+        max_tokens: int | None = None,
+        count_tokens: Callable[[str], int] | None = None,
+    ):
+        self.out_dir = out_dir
+        self.context_lines = context_lines
+        self.scope = scope
+        self.cache = cache
+        self.jobs = jobs or os.cpu_count() or 1
+        self.path_filter = path_filter or PathFilter(skip_generated=False, max_file_size=None)
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.objects = BlobReader()
+
+    def __enter__(self) -> 'BatchRunner':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.objects.close()
+
+    def run(self, ranges: list[Range]) -> Iterator[RangeResult]:
+        """Process `ranges` concurrently, yielding their results in input order."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.jobs == 1 or len(ranges) <= 1:
+            yield from map(self.run_one, ranges)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(ranges))) as pool:
+            yield from pool.map(self.run_one, ranges)
+
+    def run_one(self, rng: Range) -> RangeResult:
+        """Diff, extract and render one range; failures are reported, not raised."""
+        start = time.perf_counter()
+        result = RangeResult(rng)
+        try:
+            result.path, result.files = self._generate(rng, result.skipped)
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _generate(self, rng: Range, skipped: dict[str, str]) -> tuple[str | None, int]:
+        base, head = _resolve(rng)
+        specs = self.path_filter.pathspecs()
+        oversized = self.path_filter.oversized(base, head, specs)
+        if oversized:
+            specs = (specs or [':/']) + exclude_paths(oversized)
+        with read_diff(base, unified=0, head=head, paths=specs) as diff_result:
+            if not diff_result:
+                return None, 0
+            contexts = []
+            results = extract_all(
+                diff_result.hunks, self.context_lines, 1, self.scope, self.cache,
+                reader=self.objects.at(head),
+            )
+            for file_path, snippets, error in results:
+                if error is not None:
+                    skipped[file_path] = str(error) or type(error).__name__
+                contexts.extend(snippets)
+            contexts, _ = coalesce_contexts(contexts)
+            path = os.path.join(self.out_dir, f'{rng.name}.md')
+            with open(path, 'w', encoding='utf-8') as out:
+                self._write(out, diff_result, contexts)
+            return path, len(diff_result.files)
+
+    def _write(self, out, diff_result, contexts) -> None:
+        """Render the prompt, packed into `max_tokens` when a budget is set."""
+        if self.max_tokens is None:
+            write_prompt(out, diff_result, contexts)
+            return
+        from codereviewprompt.budget import pack
+
+        packed = pack(
+            diff_result, contexts, self.max_tokens, self.count_tokens,
+            self.count_tokens(fixed_text(diff_result)),
+        )
+        write_prompt(
+            out, diff_result, packed.contexts, None, packed.diff_files, packed.omitted_diff_files
+        )
@@ -0,0 +1,189 @@
+"""
+Benchmark suite: generates synthetic git repositories and times each stage of
+prompt generation, saving JSON results that can be compared between commits.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Shape of a synthetic repository and of the change made to it."""
+    name: str
+    files: int
+    # Functions per file; each function is 4 lines long
+    functions: int
+    # Fraction of functions whose body is changed
+    hunk_density: float
+    # Number of nested classes wrapping every function
+    depth: int
+
+
+SCENARIOS = {
+    'small': Scenario('small', files=10, functions=50, hunk_density=0.1, depth=1),
+    'medium': Scenario('medium', files=100, functions=200, hunk_density=0.05, depth=2),
+    'large': Scenario('large', files=300, functions=1000, hunk_density=0.02, depth=3),
+    'deep': Scenario('deep', files=20, functions=200, hunk_density=0.1, depth=20),
+}
+
+STAGES = ('get_diff_hunks', 'extract_context', 'extract_by_symbol', 'run_cold', 'run_warm', 'run_async')
+
+
+def _module_source(scenario: Scenario, changed: bool) -> str:
+    """Source of one synthetic module; `changed` edits every n-th function body."""
+    every = max(1, round(1 / scenario.hunk_density)) if scenario.hunk_density else 0
+    lines = []
+    for level in range(scenario.depth):
+        lines.append('    ' * level + f'class Level{level}:')
+    indent = '    ' * scenario.depth
+    for i in range(scenario.functions):
+        value = f'{i} * 2' if changed and every and i % every == 0 else f'{i}'
+        lines.append(f'{indent}def func_{i}(self, x):')
+        lines.append(f'{indent}    y = x + {value}')
+        lines.append(f'{indent}    return y')
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def make_repo(root: str, scenario: Scenario) -> str:
+    """Create a git repo under `root` with a committed base and an uncommitted change."""
+    repo = os.path.join(root, scenario.name)
+    os.makedirs(repo)
+
+    def git(*args):
+        subprocess.run(['git', *args], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+
+    git('init', '-q')
+    git('config', 'user.email', 'bench@example.com')
+    git('config', 'user.name', 'Bench')
+    paths = [os.path.join(repo, 'pkg', f'mod_{n}.py') for n in range(scenario.files)]
+    os.makedirs(os.path.join(repo, 'pkg'))
+    base, changed = _module_source(scenario, False), _module_source(scenario, True)
+    for path in paths:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(base)
+    git('add', '.')
+    git('commit', '-q', '-m', 'base')
+    for path in paths:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(changed)
+    return repo
+
+
+def _time(func, repeat: int) -> dict:
+    """Run `func` `repeat` times and return min/mean wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {'min': min(samples), 'mean': sum(samples) / len(samples), 'repeat': repeat}
+
+
+def _run_cli(args: list[str]) -> None:
+    from codereviewprompt.cli import cli
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        cli.main(args, standalone_mode=False)
+
+
+def bench_scenario(scenario: Scenario, repeat: int = 3, context_lines: int = 5) -> list[dict]:
+    """Time every stage on a fresh synthetic repository for `scenario`."""
+    from codereviewprompt.context import extract_by_symbol
+    from codereviewprompt.diff import extract_context, get_diff_hunks
+
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        repo = make_repo(root, scenario)
+        os.chdir(repo)
+        try:
+            hunks_map = get_diff_hunks('HEAD')
+            out = os.path.join(root, 'prompt.md')
+            run_args = ['run', '--base', 'HEAD', '--out', out, '--context-lines', str(context_lines)]
+            stages = {
+                'get_diff_hunks': lambda: get_diff_hunks('HEAD'),
+                'extract_context': lambda: [
+                    extract_context(path, hunks, context_lines) for path, hunks in hunks_map.items()
+                ],
+                'extract_by_symbol': lambda: [
+                    extract_by_symbol(path, hunks, context_lines) for path, hunks in hunks_map.items()
+                ],
+                'run_cold': lambda: _run_cli(run_args + ['--no-cache']),
+                'run_warm': lambda: _run_cli(run_args),
+                'run_async': lambda: _run_cli(run_args + ['--async']),
+            }
+            _run_cli(run_args)  # populate the symbol cache for the warm run
+            for stage in STAGES:
+                timing = _time(stages[stage], repeat)
+                results.append({'scenario': scenario.name, 'stage': stage, **timing})
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def _source_commit() -> str | None:
+    """Commit of the codereviewprompt checkout being benchmarked, if any."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def run_suite(names: list[str], repeat: int = 3) -> dict:
+    """Benchmark the named scenarios and return a JSON-serializable report."""
+    results = []
+    for name in names:
+        results.extend(bench_scenario(SCENARIOS[name], repeat))
+    return {
+        'meta': {
+            'commit': _source_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'scenarios': {name: asdict(SCENARIOS[name]) for name in names},
+        },
+        'results': results,
+    }
+
+
+def format_report(report: dict, baseline: dict | None = None) -> str:
+    """Render results as a table, with the speedup versus `baseline` if given."""
+    before = {}
+    if baseline:
+        before = {(r['scenario'], r['stage']): r['min'] for r in baseline['results']}
+    header = f"{'scenario':<10} {'stage':<18} {'min (ms)':>10} {'mean (ms)':>10}"
+    if baseline:
+        header += f" {'baseline':>10} {'speedup':>8}"
+    rows = [header]
+    for r in report['results']:
+        row = f"{r['scenario']:<10} {r['stage']:<18} {r['min'] * 1000:>10.1f} {r['mean'] * 1000:>10.1f}"
+        old = before.get((r['scenario'], r['stage']))
+        if old is not None:
+            row += f" {old * 1000:>10.1f} {old / r['min']:>7.2f}x"
+        rows.append(row)
+    return '\n'.join(rows)
+
+
+def save_report(report: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
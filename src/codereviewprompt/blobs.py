@@ -0,0 +1,177 @@
+"""
+Read file contents from the git object store through one long-lived
+`git cat-file --batch` process, or from the working tree.
+"""
+import atexit
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+
+from codereviewprompt.mapped import MMAP_MIN_BYTES, MappedBuffer
+
+# Upper bound on blob bytes kept in the in-memory LRU
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024
+
+
+class BlobReader:
+    """
+    Fetch blobs by object name (`<rev>:<path>` or a blob id) over a single
+    `git cat-file --batch` pipe, started on first use. Recently read blobs are
+    kept in a small LRU bounded by `cache_bytes`. When `rev` is set, `read(path)`
+    returns the file as of that revision. Safe to share between threads.
+    """
+
+    def __init__(self, rev: str | None = None, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.rev = rev
+        self.cache_bytes = cache_bytes
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen | None = None
+
+    def __enter__(self) -> 'BlobReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _start(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ['git', 'cat-file', '--batch'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._proc
+
+    def read(self, path: str) -> bytes | None:
+        """Return the contents of `path` at this reader's revision, or None if missing."""
+        return self.read_object(f'{self.rev or "HEAD"}:{path}')
+
+    def read_object(self, obj: str) -> bytes | None:
+        """Return the contents of a blob by object name, or None if it does not exist."""
+        with self._lock:
+            data = self._cache.get(obj)
+            if data is not None:
+                self._cache.move_to_end(obj)
+                return data
+            try:
+                data = self._request(obj)
+            except (OSError, ValueError):
+                # Restart the pipe on the next request
+                self._stop()
+                return None
+            if data is not None and len(data) <= self.cache_bytes:
+                self._cache[obj] = data
+                self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+            return data
+
+    def at(self, rev: str) -> 'RevisionReader':
+        """A reader of paths at `rev` that shares this reader's pipe and LRU."""
+        return RevisionReader(self, rev)
+
+    def _request(self, obj: str) -> bytes | None:
+        proc = self._start()
+        proc.stdin.write(obj.encode('utf-8') + b'\n')
+        proc.stdin.flush()
+        header = proc.stdout.readline()
+        if not header:
+            raise OSError('git cat-file exited unexpectedly')
+        # "<sha> <type> <size>\n", or "<obj> missing\n" / "<obj> ambiguous\n"
+        parts = header.split()
+        if len(parts) != 3:
+            return None
+        size = int(parts[2])
+        data = proc.stdout.read(size)
+        proc.stdout.read(1)  # trailing newline
+        if parts[1] != b'blob':
+            return None
+        return data
+
+    def _stop(self) -> None:
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+            self._proc.wait()
+            self._proc = None
+
+    def close(self) -> None:
+        """Stop the cat-file process and drop cached blobs."""
+        with self._lock:
+            self._stop()
+            self._cache.clear()
+            self._cached_bytes = 0
+
+
+class RevisionReader:
+    """
+    Reads paths at one revision through a shared `BlobReader`, so many
+    revisions can be read over a single `git cat-file` process. Closing it
+    leaves the shared reader running.
+    """
+
+    def __init__(self, objects: BlobReader, rev: str):
+        self.objects = objects
+        self.rev = rev
+
+    def read(self, path: str) -> bytes | None:
+        """Return the contents of `path` at this revision, or None if missing."""
+        return self.objects.read_object(f'{self.rev}:{path}')
+
+    def close(self) -> None:
+        pass
+
+
+class WorkingTreeReader:
+    """Read file contents from the working tree; the default source for extraction."""
+
+    rev = None
+
+    def read(self, path: str) -> bytes | None:
+        """Return the contents of `path`, or None if it is not a regular file."""
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def map(self, path: str, min_bytes: int = MMAP_MIN_BYTES) -> MappedBuffer | None:
+        """
+        Return `path` memory-mapped with its line index if it is a regular file of
+        at least `min_bytes`, else None. Raises UnsupportedContentError for
+        binary or non-UTF-8 files.
+        """
+        try:
+            if os.path.getsize(path) < min_bytes or not os.path.isfile(path):
+                return None
+        except OSError:
+            return None
+        return MappedBuffer(path)
+
+
+_shared: dict[str, BlobReader] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_reader() -> BlobReader:
+    """
+    Return the process-wide object reader for the repository in the current
+    directory, starting it on first use.
+    """
+    cwd = os.getcwd()
+    with _shared_lock:
+        if cwd not in _shared:
+            _shared[cwd] = BlobReader()
+        return _shared[cwd]
+
+
+@atexit.register
+def _close_shared() -> None:
+    for reader in _shared.values():
+        reader.close()
@@ -0,0 +1,188 @@
+"""
+Local token estimation and budget-driven packing of diff and context snippets.
+"""
+import io
+from dataclasses import dataclass
+from typing import Callable
+
+from codereviewprompt.diff import DiffResult, FileDiff
+from codereviewprompt.records import Snippet
+
+# Average bytes per token for code and English text with BPE tokenizers
+BYTES_PER_TOKEN = 4
+
+Tokenizer = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, network-free token estimate: UTF-8 bytes divided by BYTES_PER_TOKEN."""
+    return (len(text.encode('utf8')) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+def _tiktoken_tokenizer() -> Tokenizer:
+    import tiktoken
+
+    encoding = tiktoken.get_encoding('cl100k_base')
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+# Tokenizer factories by name; 'bytes' needs no extra packages
+TOKENIZERS: dict[str, Callable[[], Tokenizer]] = {
+    'bytes': lambda: estimate_tokens,
+    'tiktoken': _tiktoken_tokenizer,
+}
+
+
+def get_tokenizer(name: str = 'bytes') -> Tokenizer:
+    """
+    Return the token counting function registered under `name`. Raises
+    ValueError for unknown names and ImportError if its package is missing.
+    """
+    try:
+        factory = TOKENIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown tokenizer: {name}") from None
+    return factory()
+
+
+@dataclass
+class PackResult:
+    """Outcome of fitting a diff and its context snippets into a token budget."""
+    diff_files: list[FileDiff]
+    contexts: list[dict]
+    diff_tokens: int = 0
+    context_tokens: int = 0
+    omitted_diff_files: int = 0
+    trimmed: int = 0
+    dropped: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.diff_tokens + self.context_tokens
+
+    def summary(self, max_tokens: int) -> str:
+        """One-line human readable description of what was kept and trimmed."""
+        text = (
+            f"Token budget {max_tokens}: ~{self.tokens} used "
+            f"(diff {self.diff_tokens}, context {self.context_tokens})"
+        )
+        changes = []
+        if self.omitted_diff_files:
+            changes.append(f"{self.omitted_diff_files} diff files omitted")
+        if self.trimmed:
+            changes.append(f"{self.trimmed} snippets trimmed")
+        if self.dropped:
+            changes.append(f"{self.dropped} snippets dropped")
+        if changes:
+            text += '; ' + ', '.join(changes)
+        return text + '.'
+
+
+def _snippet_overhead(ctx: dict, tokenizer: Tokenizer) -> int:
+    """Tokens spent on a snippet's Markdown header and code fences."""
+    header = f"### {ctx['file_path']}:{ctx['context_start']}-{ctx['context_end']}"
+    return tokenizer(header + '\n```\n```\n')
+
+
+def _trim_snippet(ctx: dict, budget: int, tokenizer: Tokenizer) -> tuple[dict | None, int]:
+    """
+    Shrink a snippet to at most `budget` tokens by keeping its hunk lines and
+    growing context around them one line at a time on alternating sides.
+    Returns (trimmed snippet, tokens) or (None, 0) if the hunks alone do not fit.
+    """
+    lines = io.StringIO(ctx['snippet'], newline='\n').readlines()
+    offset = ctx['context_start']
+    hunks = ctx.get('hunks') or [(ctx['hunk_start'], ctx['hunk_end'])]
+    core_start = max(min(s for s, _ in hunks), offset) - offset
+    core_end = min(max(e for _, e in hunks), offset + len(lines) - 1) - offset
+    if core_start > core_end:
+        return None, 0
+    costs = [tokenizer(line) for line in lines]
+    used = _snippet_overhead(ctx, tokenizer) + sum(costs[core_start:core_end + 1])
+    if used > budget:
+        return None, 0
+    lo, hi = core_start, core_end
+    grew = True
+    while grew:
+        grew = False
+        if lo > 0 and used + costs[lo - 1] <= budget:
+            lo -= 1
+            used += costs[lo]
+            grew = True
+        if hi < len(lines) - 1 and used + costs[hi + 1] <= budget:
+            hi += 1
+            used += costs[hi]
+            grew = True
+    if isinstance(ctx, Snippet) and ctx._text is None:
+        # Narrow the view; the text is sliced from the file buffer at render time
+        trimmed = ctx.replace(context_start=offset + lo, context_end=offset + hi)
+    else:
+        trimmed = dict(
+            ctx,
+            snippet=''.join(lines[lo:hi + 1]),
+            context_start=offset + lo,
+            context_end=offset + hi,
+        )
+    return trimmed, used
+
+
+def pack(
+    diff_result: DiffResult,
+    contexts: list[dict],
+    max_tokens: int,
+    tokenizer: Tokenizer = estimate_tokens,
+    reserved: int = 0,
+) -> PackResult:
+    """
+    Fit the diff and context snippets into `max_tokens`, after `reserved` tokens
+    for fixed prompt text. Diff sections have top priority; a file diff that does
+    not fit in what is left is omitted whole. Snippets around enclosing symbols
+    come next, then plain line windows; a snippet that does not fit whole is
+    trimmed towards its hunk lines, and dropped if even those do not fit. Runs in
+    time linear in the size of the diff and snippets; kept snippets retain their
+    original order.
+    """
+    budget = max_tokens - reserved
+    result = PackResult(diff_files=[], contexts=[])
+
+    for file_diff in diff_result.files:
+        if file_diff.pure_move:
+            # Rendered as one line of the rename summary, not as a diff section
+            continue
+        if tokenizer is estimate_tokens:
+            # Byte length is known from the spool; no need to decode the text
+            cost = (file_diff.length + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+        else:
+            cost = tokenizer(diff_result.text(file_diff))
+        if cost > budget - result.diff_tokens:
+            result.omitted_diff_files += 1
+            continue
+        result.diff_files.append(file_diff)
+        result.diff_tokens += cost
+    budget -= result.diff_tokens
+
+    # Enclosing-symbol snippets carry a parse backend; plain windows do not
+    ranked = [i for i, ctx in enumerate(contexts) if 'backend' in ctx]
+    ranked += [i for i, ctx in enumerate(contexts) if 'backend' not in ctx]
+    kept: dict[int, dict] = {}
+    for i in ranked:
+        ctx = contexts[i]
+        if tokenizer is estimate_tokens and isinstance(ctx, Snippet):
+            # Byte length comes from the buffer's line offsets without slicing
+            text_cost = (ctx.size() + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+        else:
+            text_cost = tokenizer(ctx['snippet'])
+        cost = _snippet_overhead(ctx, tokenizer) + text_cost
+        if cost <= budget:
+            kept[i] = ctx
+        else:
+            trimmed, cost = _trim_snippet(ctx, budget, tokenizer)
+            if trimmed is None:
+                result.dropped += 1
+                continue
+            kept[i] = trimmed
+            result.trimmed += 1
+        budget -= cost
+        result.context_tokens += cost
+    result.contexts = [kept[i] for i in range(len(contexts)) if i in kept]
+    return result
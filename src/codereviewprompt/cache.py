@@ -0,0 +1,265 @@
+"""
+Persistent symbol-range and definition cache keyed by git blob hash, stored in
+SQLite under the repository's git directory.
+"""
+import hashlib
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from array import array
+
+# Default upper bound on the cached range data before LRU eviction kicks in
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHE_DIR_NAME = 'codereviewprompt'
+CACHE_FILE_NAME = 'symbols.sqlite'
+# Seconds to wait for another process's write; a busy cache is skipped, not waited on
+BUSY_TIMEOUT = 0.25
+# Stored as the database's user_version. Bump it whenever cached entries would
+# come out differently: the encoding, a language's definition node types or
+# query, or `definition_name`. Caches of another version are dropped on open.
+CACHE_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    blob TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ranges BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (blob, kind)
+)
+"""
+
+
+def blob_sha(data: bytes) -> str:
+    """Return the git blob SHA-1 of `data`, as `git hash-object` would compute it."""
+    h = hashlib.sha1(b'blob %d\0' % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def default_cache_path() -> str | None:
+    """
+    Return the cache file path under the current repository's git directory
+    (shared by all worktrees), or None when not inside a git repository.
+    """
+    try:
+        git_dir = subprocess.check_output(
+            ['git', 'rev-parse', '--git-common-dir'],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return os.path.join(os.path.abspath(git_dir), CACHE_DIR_NAME, CACHE_FILE_NAME)
+
+
+def _encode(ranges: list[tuple[int, int]]) -> bytes:
+    flat = array('I')
+    for start, end in ranges:
+        flat.append(start)
+        flat.append(end)
+    return flat.tobytes()
+
+
+def _decode(blob: bytes) -> list[tuple[int, int]]:
+    flat = array('I')
+    flat.frombytes(blob)
+    return list(zip(flat[0::2], flat[1::2]))
+
+
+def _encode_definitions(definitions: list[tuple[str, int, int]]) -> bytes:
+    return '\n'.join(f'{name}\t{start}\t{end}' for name, start, end in definitions).encode('utf-8')
+
+
+def _decode_definitions(blob: bytes) -> list[tuple[str, int, int]]:
+    definitions = []
+    for line in blob.decode('utf-8').split('\n') if blob else ():
+        name, start, end = line.split('\t')
+        definitions.append((name, int(start), int(end)))
+    return definitions
+
+
+# Blobs looked up per query by `get_definitions_many`, below SQLite's variable limit
+_LOOKUP_CHUNK = 500
+
+
+class SymbolCache:
+    """
+    SQLite-backed map from (git blob SHA, language) to symbol line ranges, and
+    from (git blob SHA, 'defs:' + language) to named definitions.
+
+    Ranges are stored as packed unsigned ints, definitions as tab-separated
+    text. Entries carry a last-used timestamp; once the stored data exceeds
+    `max_bytes`, the least recently used entries are evicted. Safe to share
+    between threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: dict[tuple[str, str], float] = {}
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] != CACHE_VERSION:
+            # Entries of another version may hold stale ranges or definitions
+            self._conn.execute('DROP TABLE IF EXISTS symbols')
+            self._conn.execute(f'PRAGMA user_version = {CACHE_VERSION}')
+        self._conn.execute(_SCHEMA)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS symbols_lru ON symbols (last_used)')
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM symbols').fetchone()[0]
+
+    @classmethod
+    def open_default(cls, max_bytes: int = DEFAULT_MAX_BYTES) -> 'SymbolCache | None':
+        """Open the cache of the current repository, or return None outside a repo."""
+        path = default_cache_path()
+        if path is None:
+            return None
+        try:
+            return cls(path, max_bytes)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def __enter__(self) -> 'SymbolCache':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, blob: str, kind: str) -> list[tuple[int, int]] | None:
+        """Return cached ranges for the blob, or None on a miss."""
+        data = self._load(blob, kind)
+        return _decode(data) if data is not None else None
+
+    def put(self, blob: str, kind: str, ranges: list[tuple[int, int]]) -> None:
+        """Store ranges for the blob, evicting old entries if over budget."""
+        self._store(blob, kind, _encode(ranges))
+
+    def get_definitions_many(
+        self, blobs: list[str], language: str
+    ) -> dict[str, list[tuple[str, int, int]]]:
+        """Cached (name, start, end) definitions of each blob that has an entry."""
+        kind = f'defs:{language}'
+        found = {}
+        with self._lock:
+            for i in range(0, len(blobs), _LOOKUP_CHUNK):
+                chunk = blobs[i:i + _LOOKUP_CHUNK]
+                try:
+                    rows = self._conn.execute(
+                        f'SELECT blob, ranges FROM symbols WHERE kind = ? AND blob IN '
+                        f'({",".join("?" * len(chunk))})',
+                        (kind, *chunk),
+                    ).fetchall()
+                except sqlite3.Error:
+                    rows = []
+                found.update(rows)
+            now = time.time()
+            for blob in found:
+                self._touched[(blob, kind)] = now
+            self.hits += len(found)
+            self.misses += len(set(blobs)) - len(found)
+        return {blob: _decode_definitions(data) for blob, data in found.items()}
+
+    def put_definitions(
+        self, blob: str, language: str, definitions: list[tuple[str, int, int]]
+    ) -> None:
+        """Store the (name, start, end) definitions of a blob."""
+        self._store(blob, f'defs:{language}', _encode_definitions(definitions))
+
+    def _load(self, blob: str, kind: str) -> bytes | None:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT ranges FROM symbols WHERE blob = ? AND kind = ?', (blob, kind)
+                ).fetchone()
+            except sqlite3.Error:
+                # A locked or damaged cache must never fail extraction
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Recency updates are batched and written on close()
+            self._touched[(blob, kind)] = time.time()
+        return row[0]
+
+    def _store(self, blob: str, kind: str, data: bytes) -> None:
+        with self._lock:
+            try:
+                old = self._conn.execute(
+                    'SELECT size FROM symbols WHERE blob = ? AND kind = ?', (blob, kind)
+                ).fetchone()
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?)',
+                    (blob, kind, data, len(data), time.time()),
+                )
+                self._total += len(data) - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict()
+                # Commit right away: an open write transaction would lock out
+                # every other process for the lifetime of this one (watch, batch)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until 90% of the budget is free."""
+        target = self.max_bytes * 9 // 10
+        rows = self._conn.execute(
+            'SELECT blob, kind, size FROM symbols ORDER BY last_used'
+        )
+        doomed = []
+        for blob, kind, size in rows:
+            if self._total <= target:
+                break
+            doomed.append((blob, kind))
+            self._total -= size
+        self._conn.executemany('DELETE FROM symbols WHERE blob = ? AND kind = ?', doomed)
+
+    def stats(self) -> dict:
+        """Return entry count, stored bytes and this session's hit/miss counters."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM symbols'
+            ).fetchone()
+        return {
+            'path': self.path,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def clear(self) -> int:
+        """Delete all entries and return how many were removed."""
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM symbols').rowcount
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+            self._total = 0
+            self._touched.clear()
+        return removed
+
+    def close(self) -> None:
+        """Flush pending recency updates and writes, then close the database."""
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.executemany(
+                    'UPDATE symbols SET last_used = ? WHERE blob = ? AND kind = ?',
+                    [(ts, blob, kind) for (blob, kind), ts in self._touched.items()],
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+            self._conn = None
@@ -2,6 +2,40 @@
 import sys
 import click
 
+# Only click is imported eagerly: diff, context, tree-sitter, sqlite3 and pyperclip
+# are imported inside the code paths that need them to keep startup fast.
+
+def _filter_options(command):
+    """Options selecting which changed files are diffed, shared by run, watch and batch."""
+    command = click.option(
+        '--max-file-size', default=1024 * 1024, show_default=True, type=click.IntRange(min=0),
+        help='Skip files larger than this many bytes on either side of the diff (0: no limit)',
+    )(command)
+    command = click.option(
+        '--exclude', multiple=True, metavar='GLOB',
+        help='Leave out matching paths; repeatable. Adds to .codereviewpromptignore',
+    )(command)
+    command = click.option(
+        '--include', multiple=True, metavar='GLOB',
+        help='Only review matching paths; repeatable',
+    )(command)
+    return command
+
+
+def _pathspecs(base, head, include, exclude, max_file_size):
+    """Git pathspecs for the filter options, with oversized files excluded by name."""
+    from codereviewprompt.filters import PathFilter, exclude_paths
+
+    path_filter = PathFilter.from_options(include, exclude, max_file_size)
+    specs = path_filter.pathspecs()
+    oversized = path_filter.oversized(base, head, specs)
+    if oversized:
+        shown = ', '.join(oversized[:5]) + (', ...' if len(oversized) > 5 else '')
+        click.echo(f"Skipping {len(oversized)} files over {max_file_size} bytes: {shown}", err=True)
+        specs = (specs or [':/']) + exclude_paths(oversized)
+    return specs
+
+
 @click.group()
 def cli():
     """codereviewprompt CLI."""
@@ -10,6 +44,8 @@ def cli():
 @cli.command()
 @click.option('--base', default='main', show_default=True,
               help='Commit/branch/tag to diff against')
+@click.option('--head', default=None,
+              help='Review this revision instead of the working tree (read from git objects)')
 @click.option('--ticket', default=None,
               help='Ticket ID to include in prompt (description fetch coming soon)')
 @click.option('--context-lines', default=50, show_default=True, type=int,
@@ -18,106 +54,519 @@ def cli():
               help='clipboard, stdout, or a file path')
 @click.option('--model', default='gemini', show_default=True,
               help='Reserved for future custom prompts')
-def run(base, ticket, context_lines, out, model):
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1),
+              help='Worker threads for context extraction  [default: CPU count]')
+@click.option('--symbol-scope', default='innermost', show_default=True,
+              type=click.Choice(['innermost', 'outermost']),
+              help='Extract the innermost or outermost definition enclosing each hunk')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Do not read or write the on-disk symbol cache')
+@click.option('--max-tokens', default=None, type=click.IntRange(min=1),
+              help='Trim diff and context to fit this many tokens')
+@click.option('--tokenizer', default='bytes', show_default=True,
+              type=click.Choice(['bytes', 'tiktoken']),
+              help='Token counter for --max-tokens and JSON token estimates (bytes is a local heuristic)')
+@click.option('--related-tokens', default=0, show_default=True, type=click.IntRange(min=0),
+              help='Add definitions of names used in changed lines, up to this many tokens')
+@click.option('--format', 'output_format', default='markdown', show_default=True,
+              type=click.Choice(['markdown', 'json', 'jsonl']),
+              help='Prompt format; jsonl streams one record per file as it is extracted')
+@_filter_options
+@click.option('--async', 'use_async', is_flag=True, default=False,
+              help='Extract each file as soon as its diff section arrives (asyncio pipeline)')
+@click.option('--timings', 'timings_format', default=None,
+              type=click.Choice(['table', 'json', 'chrome']),
+              help='Report wall time, bytes and counts per stage in this format')
+@click.option('--timings-file', default=None, type=click.Path(dir_okay=False),
+              help='Write the --timings report here instead of stderr')
+@click.option('--profile', default=None, type=click.Path(dir_okay=False),
+              help='Dump cProfile statistics for the whole run to this file')
+def run(base, head, ticket, context_lines, out, model, jobs, symbol_scope, no_cache, max_tokens,
+        tokenizer, related_tokens, output_format, use_async, timings_format, timings_file,
+        profile, include, exclude, max_file_size):
     """Generate a code-review prompt based on local git diff and context extraction."""
-    # Step 1: compute diff hunks against the base
-    from codereviewprompt.diff import get_diff_hunks, extract_context
+    if max_tokens is not None and output_format != 'markdown':
+        raise click.UsageError(
+            "--max-tokens only applies to --format markdown; JSON records carry token estimates."
+        )
+    if related_tokens and output_format != 'markdown':
+        raise click.UsageError("--related-tokens only applies to --format markdown.")
+    timings = None
+    if timings_format or timings_file:
+        from codereviewprompt.timings import Timings
 
-    hunks_map = get_diff_hunks(base, unified=0)
-    if not hunks_map:
-        click.echo("No changes detected.")
+        timings = Timings()
+    profiler = None
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        paths = _pathspecs(base, head, include, exclude, max_file_size)
+        _run(
+            base, head, ticket, context_lines, out, jobs, symbol_scope, no_cache, max_tokens,
+            tokenizer, timings, use_async, paths, output_format, related_tokens,
+        )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            click.echo(f"Profile written to {profile}", err=True)
+        if timings is not None:
+            _report_timings(timings, timings_format or 'table', timings_file)
+
+
+def _report_timings(timings, timings_format, timings_file):
+    """Write the per-stage timings report to `timings_file`, or stderr."""
+    if timings_format == 'table':
+        text = timings.format_table() + '\n'
+    else:
+        import json
+
+        data = timings.to_json() if timings_format == 'json' else timings.to_chrome_trace()
+        text = json.dumps(data, indent=2) + '\n'
+    if timings_file is None:
+        click.echo(text, err=True, nl=False)
         return
+    with open(timings_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    click.echo(f"Timings written to {timings_file}", err=True)
 
-    # Step 2: extract context snippets for each hunk
-    contexts = []
-    # Step 2: extract context snippets for each hunk, preferring symbol-based when available
-    from codereviewprompt.context import extract_by_symbol
-    for file_path, hunks in hunks_map.items():
-        if not hunks:
-            continue
+
+def _open_cache(no_cache):
+    """The repository's symbol cache, unless disabled or unavailable."""
+    if no_cache:
+        return None
+    from codereviewprompt.cache import SymbolCache
+
+    return SymbolCache.open_default()
+
+
+def _open_reader(head):
+    """With --head, file contents come from git objects, not the working tree."""
+    if not head:
+        return None
+    from codereviewprompt.blobs import BlobReader
+
+    return BlobReader(rev=head)
+
+
+def _run(base, head, ticket, context_lines, out, jobs, symbol_scope, no_cache, max_tokens,
+         tokenizer, timings, use_async=False, paths=None, output_format='markdown',
+         related_tokens=0):
+    """Body of `run`, separated so it can be timed and profiled as a whole."""
+    if use_async:
+        _run_streaming(
+            base, head, ticket, context_lines, out, jobs, symbol_scope, no_cache, max_tokens,
+            tokenizer, timings, paths, output_format, related_tokens,
+        )
+        return
+    # Step 1: run git diff once, collecting hunks and raw diff text together
+    from codereviewprompt.diff import read_diff
+
+    with read_diff(base, unified=0, head=head, timings=timings, paths=paths) as diff_result:
+        if not diff_result:
+            click.echo("No changes detected.")
+            return
+        cache = _open_cache(no_cache)
+        reader = _open_reader(head)
         try:
-            # Try AST-based symbol extraction for Python
-            snippets = extract_by_symbol(file_path, hunks, context_lines)
-        except FileNotFoundError:
-            # Skip deleted or missing files
+            _generate_prompt(
+                diff_result, ticket, context_lines, out, jobs, symbol_scope, cache, max_tokens,
+                tokenizer, reader, timings, output_format, related_tokens,
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+            if reader is not None:
+                reader.close()
+
+
+def _run_streaming(base, head, ticket, context_lines, out, jobs, symbol_scope, no_cache,
+                   max_tokens, tokenizer, timings, paths=None,
+                   output_format='markdown', related_tokens=0):
+    """`run --async`: extraction starts while git diff is still streaming."""
+    from codereviewprompt.pipeline import extract_streaming
+
+    cache = _open_cache(no_cache)
+    reader = _open_reader(head)
+    try:
+        diff_result, results = extract_streaming(
+            base, context_lines, jobs, symbol_scope, cache, reader, head, timings, paths,
+        )
+        with diff_result:
+            if not diff_result:
+                click.echo("No changes detected.")
+                return
+            if output_format != 'markdown':
+                _emit_structured(diff_result, results, ticket, out, output_format, tokenizer, timings)
+                return
+            contexts = _collect_contexts(results)
+            if not contexts:
+                click.echo("No context available for the detected changes.")
+                return
+            related = _related(contexts, related_tokens, tokenizer, cache, head, jobs, timings)
+            _emit_prompt(diff_result, contexts, ticket, out, max_tokens, tokenizer, timings, related)
+    finally:
+        if cache is not None:
+            cache.close()
+        if reader is not None:
+            reader.close()
+
+
+def _collect_contexts(results):
+    """Concatenate extracted snippets, reporting files that had to be skipped."""
+    contexts = []
+    for file_path, snippets, error in results:
+        if error is not None:
+            click.echo(f"Skipping {file_path}: {error}", err=True)
             continue
-        # Fallback to raw diff context if no symbol snippets
-        if not snippets:
-            snippets = extract_context(file_path, hunks, context_lines)
         contexts.extend(snippets)
+    return contexts
+
+
+def _generate_prompt(diff_result, ticket, context_lines, out, jobs, symbol_scope, cache,
+                     max_tokens, tokenizer, reader, timings=None,
+                     output_format='markdown', related_tokens=0):
+    """Extract context and render the prompt for an already computed diff."""
+    # Step 2: extract context snippets for each hunk, preferring symbol-based when available
+    from codereviewprompt.context import extract_all
 
+    results = extract_all(
+        diff_result.hunks, context_lines, jobs, symbol_scope, cache, reader=reader, timings=timings
+    )
+    if output_format != 'markdown':
+        _emit_structured(diff_result, results, ticket, out, output_format, tokenizer, timings)
+        return
+    contexts = _collect_contexts(results)
     if not contexts:
         click.echo("No context available for the detected changes.")
         return
+    head = reader.rev if reader is not None else None
+    related = _related(contexts, related_tokens, tokenizer, cache, head, jobs, timings)
+    _emit_prompt(diff_result, contexts, ticket, out, max_tokens, tokenizer, timings, related)
+
+
+def _related(contexts, related_tokens, tokenizer, cache, head, jobs, timings=None):
+    """Definitions of names referenced by the changed lines, within `related_tokens`."""
+    if not related_tokens:
+        return []
+    from codereviewprompt.budget import get_tokenizer
+    from codereviewprompt.definitions import related_definitions
 
-    # Step 3: compose prompt with rubric, diff, and context snippets
-    lines: list[str] = []
-    lines.append('# Code Review Prompt')
-    lines.append('')
-    # Rubric & severity guide
-    lines.append('## Review Rubric & Severity Guide')
-    lines.append('')
-    lines.append('**Critical**: security vulnerabilities, data loss, crashes.')
-    lines.append('**Major**: logic errors, performance regressions, incorrect functionality.')
-    lines.append('**Minor**: code readability, maintainability, edge cases.')
-    lines.append('**Style**: formatting, naming, comments.')
-    lines.append('')
-    # Optional ticket info
-    if ticket:
-        lines.append(f'**Ticket**: {ticket}')
-        lines.append('')
-    # Full diff
-    lines.append('## Diff')
-    lines.append('')
-    lines.append('```diff')
-    # Retrieve raw git diff; handle errors explicitly
-    import subprocess
     try:
-        diff_text = subprocess.check_output(
-            ['git', 'diff', f'--unified=0', base],
-            stderr=subprocess.PIPE,
-            text=True,
+        count_tokens = get_tokenizer(tokenizer)
+    except ImportError:
+        raise click.UsageError(f"The '{tokenizer}' tokenizer is not installed.")
+    related = related_definitions(contexts, related_tokens, count_tokens, cache, head, jobs, timings)
+    if related:
+        click.echo(f"Added {len(related)} referenced definitions.", err=True)
+    return related
+
+
+def _emit_prompt(diff_result, contexts, ticket, out, max_tokens, tokenizer, timings=None,
+                 related=None):
+    """Coalesce and budget the snippets, then render the prompt into `out`."""
+    from codereviewprompt.context import coalesce_contexts
+    from codereviewprompt.timings import stage
+
+    # Merge snippets that overlap or touch so shared code is emitted once
+    snippet_count = len(contexts)
+    with stage(timings, 'coalesce', snippets=snippet_count):
+        contexts, saved = coalesce_contexts(contexts)
+    if len(contexts) < snippet_count:
+        click.echo(
+            f"Merged {snippet_count} context snippets into {len(contexts)} (saved {saved} bytes).",
+            err=True,
         )
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        diff_text = ''
-    # Include raw diff lines
-    for l in diff_text.rstrip().splitlines():
-        lines.append(l)
-    lines.append('```')
-    lines.append('')
-    # Contextual snippets grouped by file
-    lines.append('## Context Snippets')
-    lines.append('')
-    for ctx in contexts:
-        header = f"### {ctx['file_path']}:{ctx['context_start']}-{ctx['context_end']}"
-        lines.append(header)
-        lines.append('```')
-        snippet = ctx['snippet'].rstrip('\n')
-        lines.append(snippet)
-        lines.append('```')
-        lines.append('')
-    prompt = '\n'.join(lines)
-
-    # Step 4: output
+
+    # Step 3: fit diff and snippets into the token budget, if one was given
+    from codereviewprompt.render import fixed_text, write_prompt
+
+    diff_files = diff_result.files
+    omitted_diff_files = 0
+    if max_tokens is not None:
+        from codereviewprompt.budget import get_tokenizer, pack
+
+        try:
+            count_tokens = get_tokenizer(tokenizer)
+        except ImportError:
+            raise click.UsageError(f"The '{tokenizer}' tokenizer is not installed.")
+        reserved = count_tokens(fixed_text(diff_result, ticket))
+        # Referenced definitions were already fit into their own budget
+        reserved += sum(count_tokens(ctx['snippet']) for ctx in related or ())
+        with stage(timings, 'pack'):
+            packed = pack(diff_result, contexts, max_tokens, count_tokens, reserved)
+        diff_files, contexts = packed.diff_files, packed.contexts
+        omitted_diff_files = packed.omitted_diff_files
+        click.echo(packed.summary(max_tokens), err=True)
+
+    # Step 4: render the prompt straight into its destination
+    def render(sink):
+        with stage(timings, 'render', snippets=len(contexts)):
+            write_prompt(
+                sink, diff_result, contexts, ticket, diff_files, omitted_diff_files, related
+            )
+
+    _deliver(out, render, timings)
+
+
+def _emit_structured(diff_result, results, ticket, out, output_format, tokenizer, timings=None):
+    """Write one JSON record per file into `out`; jsonl writes each as its file is extracted."""
+    from codereviewprompt.budget import get_tokenizer
+    from codereviewprompt.structured import file_records, write_json, write_jsonl
+    from codereviewprompt.timings import stage
+
+    try:
+        count_tokens = get_tokenizer(tokenizer)
+    except ImportError:
+        raise click.UsageError(f"The '{tokenizer}' tokenizer is not installed.")
+
+    def render(sink):
+        with stage(timings, 'render', format=output_format) as record:
+            records = file_records(diff_result, results, count_tokens)
+            if output_format == 'jsonl':
+                record['files'] = write_jsonl(sink, records)
+            else:
+                record['files'] = write_json(sink, records, ticket)
+
+    _deliver(out, render, timings)
+
+
+def _deliver(out, render, timings=None):
+    """Call `render(sink)` with stdout, a buffer for the clipboard, or the file `out`."""
+    from codereviewprompt.timings import stage
+
     if out == 'stdout':
-        click.echo(prompt)
+        render(sys.stdout)
+        with stage(timings, 'output', destination='stdout'):
+            sys.stdout.flush()
     elif out == 'clipboard':
         try:
             import pyperclip
-
-            pyperclip.copy(prompt)
-            click.echo("Prompt copied to clipboard.")
         except ImportError:
             click.echo("pyperclip not installed; cannot copy to clipboard.")
+            return
+        # The clipboard API needs the whole prompt as one string
+        import io
+
+        buffer = io.StringIO()
+        render(buffer)
+        with stage(timings, 'output', destination='clipboard', chars=buffer.tell()):
+            pyperclip.copy(buffer.getvalue())
+        click.echo("Prompt copied to clipboard.")
     else:
         # treat 'out' as a file path
         try:
-            with open(out, 'w', encoding='utf-8') as f:
-                f.write(prompt)
+            with stage(timings, 'output', destination='file') as record:
+                with open(out, 'w', encoding='utf-8') as f:
+                    render(f)
+                    record['bytes'] = f.tell()
             click.echo(f"Prompt written to {out}")
         except OSError as e:
             click.echo(f"Failed to write prompt to {out}: {e}")
 
+@cli.command()
+@click.option('--base', default='main', show_default=True,
+              help='Commit/branch/tag to diff against')
+@click.option('--ticket', default=None,
+              help='Ticket ID to include in prompt (description fetch coming soon)')
+@click.option('--context-lines', default=50, show_default=True, type=int,
+              help='Lines of context around each touched symbol')
+@click.option('--out', default='clipboard', show_default=True,
+              help='clipboard, stdout, or a file path; rewritten on every change')
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1),
+              help='Worker threads for context extraction  [default: CPU count]')
+@click.option('--symbol-scope', default='innermost', show_default=True,
+              type=click.Choice(['innermost', 'outermost']),
+              help='Extract the innermost or outermost definition enclosing each hunk')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Do not read or write the on-disk symbol cache')
+@click.option('--max-tokens', default=None, type=click.IntRange(min=1),
+              help='Trim diff and context to fit this many tokens')
+@click.option('--tokenizer', default='bytes', show_default=True,
+              type=click.Choice(['bytes', 'tiktoken']),
+              help='Token counter for --max-tokens (bytes is a local heuristic)')
+@click.option('--interval', default=0.5, show_default=True, type=click.FloatRange(min=0.05),
+              help='Seconds between checks for changes')
+@click.option('--polls', default=None, type=click.IntRange(min=1), hidden=True,
+              help='Stop after this many checks')
+@_filter_options
+def watch(base, ticket, context_lines, out, jobs, symbol_scope, no_cache, max_tokens, tokenizer,
+          interval, polls, include, exclude, max_file_size):
+    """Regenerate the prompt whenever the working tree changes, recomputing only changed files."""
+    import time
+
+    from codereviewprompt.watch import Watcher
+
+    cache = _open_cache(no_cache)
+    from codereviewprompt.filters import PathFilter
+
+    pathspecs = PathFilter.from_options(include, exclude, max_file_size).pathspecs()
+    watcher = Watcher(base, context_lines, symbol_scope, cache, jobs, pathspecs, max_file_size or None)
+    click.echo(f"Watching for changes against {base}; press Ctrl+C to stop.", err=True)
+    count = 0
+    first = True
+    try:
+        while polls is None or count < polls:
+            if count:
+                time.sleep(interval)
+            count += 1
+            start = time.perf_counter()
+            changed = watcher.poll()
+            if changed is None:
+                raise click.ClickException(f"Cannot diff against {base}.")
+            if not changed and not first:
+                continue
+            first = False
+            errors = watcher.errors()
+            for path in changed:
+                if path in errors:
+                    click.echo(f"Skipping {path}: {errors[path]}", err=True)
+            if not watcher.files:
+                click.echo("No changes detected.")
+                continue
+            contexts = watcher.contexts()
+            if not contexts:
+                click.echo("No context available for the detected changes.")
+                continue
+            with watcher.diff_result() as diff_result:
+                _emit_prompt(diff_result, contexts, ticket, out, max_tokens, tokenizer)
+            elapsed = (time.perf_counter() - start) * 1000
+            click.echo(f"Recomputed {len(changed)} of {len(watcher.files)} files in {elapsed:.0f} ms.",
+                       err=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cache is not None:
+            cache.close()
+
+@cli.command()
+@click.argument('ranges_file', default='-', type=click.File('r', encoding='utf-8'))
+@click.option('--out-dir', default='prompts', show_default=True, type=click.Path(file_okay=False),
+              help='Directory to write one <name>.md prompt per range into')
+@click.option('--context-lines', default=50, show_default=True, type=int,
+              help='Lines of context around each touched symbol')
+@click.option('--jobs', '-j', default=None, type=click.IntRange(min=1),
+              help='Ranges processed at once  [default: CPU count]')
+@click.option('--symbol-scope', default='innermost', show_default=True,
+              type=click.Choice(['innermost', 'outermost']),
+              help='Extract the innermost or outermost definition enclosing each hunk')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Do not read or write the on-disk symbol cache')
+@click.option('--max-tokens', default=None, type=click.IntRange(min=1),
+              help='Trim diff and context of each prompt to fit this many tokens')
+@click.option('--tokenizer', default='bytes', show_default=True,
+              type=click.Choice(['bytes', 'tiktoken']),
+              help='Token counter for --max-tokens (bytes is a local heuristic)')
+@_filter_options
+def batch(ranges_file, out_dir, context_lines, jobs, symbol_scope, no_cache, max_tokens, tokenizer,
+          include, exclude, max_file_size):
+    """
+    Write a prompt for every base..head range in RANGES_FILE (default: stdin).
+
+    Each line holds a range (base...head diffs against the merge base) and
+    optionally the prompt's file name; '#' starts a comment.
+    """
+    import time
+
+    from codereviewprompt.batch import BatchRunner, parse_ranges
+    from codereviewprompt.filters import PathFilter
+
+    try:
+        ranges = parse_ranges(ranges_file)
+    except ValueError as e:
+        raise click.UsageError(f"{ranges_file.name}: {e}")
+    count_tokens = None
+    if max_tokens is not None:
+        from codereviewprompt.budget import get_tokenizer
+
+        try:
+            count_tokens = get_tokenizer(tokenizer)
+        except ImportError:
+            raise click.UsageError(f"The '{tokenizer}' tokenizer is not installed.")
+    path_filter = PathFilter.from_options(include, exclude, max_file_size)
+    cache = _open_cache(no_cache)
+    failed = 0
+    start = time.perf_counter()
+    try:
+        with BatchRunner(out_dir, context_lines, symbol_scope, cache, jobs, path_filter,
+                         max_tokens, count_tokens) as runner:
+            for result in runner.run(ranges):
+                for path, error in result.skipped.items():
+                    click.echo(f"Skipping {path} in {result.range.spec}: {error}", err=True)
+                if result.error is not None:
+                    failed += 1
+                    click.echo(f"Failed {result.range.spec}: {result.error}", err=True)
+                elif result.path is None:
+                    click.echo(f"No changes in {result.range.spec}.", err=True)
+                else:
+                    click.echo(f"Prompt for {result.range.spec} ({result.files} files) "
+                               f"written to {result.path}")
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - start
+    rate = len(ranges) / elapsed if elapsed else 0.0
+    click.echo(f"Processed {len(ranges)} ranges in {elapsed:.2f} s ({rate:.1f} ranges/s).", err=True)
+    if failed:
+        raise click.ClickException(f"{failed} of {len(ranges)} ranges failed.")
+
+@cli.group('cache')
+def cache_group():
+    """Inspect or clear the on-disk symbol cache."""
+    pass
+
+@cache_group.command('stats')
+def cache_stats():
+    """Show the location, size and entry count of the symbol cache."""
+    from codereviewprompt.cache import SymbolCache
+
+    symbol_cache = SymbolCache.open_default()
+    if symbol_cache is None:
+        click.echo("Not inside a git repository; no symbol cache.")
+        return
+    with symbol_cache:
+        stats = symbol_cache.stats()
+    click.echo(f"Path: {stats['path']}")
+    click.echo(f"Entries: {stats['entries']}")
+    click.echo(f"Size: {stats['bytes']} / {stats['max_bytes']} bytes")
+
+@cache_group.command('clear')
+def cache_clear():
+    """Remove every entry from the symbol cache."""
+    from codereviewprompt.cache import SymbolCache
+
+    symbol_cache = SymbolCache.open_default()
+    if symbol_cache is None:
+        click.echo("Not inside a git repository; no symbol cache.")
+        return
+    with symbol_cache:
+        removed = symbol_cache.clear()
+    click.echo(f"Removed {removed} cached entries.")
+
+@cli.command()
+@click.option('--scenario', '-s', 'scenarios', multiple=True, default=('small', 'medium'),
+              show_default=True, type=click.Choice(['small', 'medium', 'large', 'deep']),
+              help='Synthetic repository shape to benchmark; repeat to run several.')
+@click.option('--repeat', default=3, show_default=True, type=click.IntRange(min=1),
+              help='Runs per stage; the minimum and mean wall times are reported.')
+@click.option('--output', '-o', default=None, type=click.Path(dir_okay=False),
+              help='Write the results as JSON to this file.')
+@click.option('--compare', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='JSON results from an earlier run to compare against.')
+def bench(scenarios, repeat, output, compare):
+    """Time each pipeline stage on generated synthetic git repositories."""
+    from codereviewprompt.bench import format_report, load_report, run_suite, save_report
+
+    report = run_suite(list(scenarios), repeat)
+    baseline = load_report(compare) if compare else None
+    click.echo(format_report(report, baseline))
+    if output:
+        save_report(report, output)
+        click.echo(f"Results written to {output}")
+
 """Entry point: invoke the CLI when run as a script."""
 # Invoke CLI after all commands are registered
 if __name__ == '__main__':  # pragma: no cover
@@ -1,97 +1,553 @@
 """
 Context extraction by symbol (using Tree-sitter or Python AST) with fallback to raw diff context.
 """
+import io
 import os
 import ast
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import TYPE_CHECKING, Iterator
 
-from codereviewprompt.diff import extract_context
+from codereviewprompt.blobs import BlobReader, WorkingTreeReader, shared_reader
+from codereviewprompt.diff import FileDiff, extract_context
+from codereviewprompt.languages import (
+    definitions_query,
+    get_language,
+    get_parser,
+    language_for_path,
+    parser_backend,
+)
+from codereviewprompt.mapped import UnsupportedContentError, sniff
+from codereviewprompt.records import IntTuples, SourceBuffer, Snippet
+from codereviewprompt.timings import Timings, stage
+
+if TYPE_CHECKING:
+    # sqlite3 is only imported when a cache is actually used
+    from codereviewprompt.cache import SymbolCache
+
+
+class SymbolIndex:
+    """
+    Sorted interval index over (start, end) symbol line ranges.
+
+    Ranges are sorted by start line (outer ranges first on ties) and each range
+    keeps a pointer to its nearest enclosing range, so the symbols enclosing a
+    line are found with one bisect plus a walk up the (shallow) nesting chain.
+    Ranges that only overlap, such as two declarators sharing a line, are
+    siblings: a parent always contains the whole of its child.
+    """
+
+    def __init__(self, ranges: list[tuple[int, int]]):
+        self.ranges = sorted(set(ranges), key=lambda r: (r[0], -r[1]))
+        self._starts = [s for s, _ in self.ranges]
+        self._parent: list[int] = []
+        self._root: list[int] = []
+        stack: list[int] = []
+        for i, (_, e) in enumerate(self.ranges):
+            while stack and self.ranges[stack[-1]][1] < e:
+                stack.pop()
+            parent = stack[-1] if stack else -1
+            self._parent.append(parent)
+            self._root.append(self._root[parent] if parent >= 0 else i)
+            stack.append(i)
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def _innermost_index(self, line: int) -> int:
+        i = bisect_right(self._starts, line) - 1
+        while i >= 0 and self.ranges[i][1] < line:
+            i = self._parent[i]
+        return i
+
+    def innermost(self, line: int) -> tuple[int, int] | None:
+        """Return the smallest range enclosing `line`, or None."""
+        i = self._innermost_index(line)
+        return self.ranges[i] if i >= 0 else None
+
+    def outermost(self, line: int) -> tuple[int, int] | None:
+        """Return the top-level range enclosing `line`, or None."""
+        i = self._innermost_index(line)
+        return self.ranges[self._root[i]] if i >= 0 else None
+
+    def lookup(self, line: int, scope: str = 'innermost') -> tuple[int, int] | None:
+        """Return the enclosing range for `line` in the given scope."""
+        if scope == 'outermost':
+            return self.outermost(line)
+        return self.innermost(line)
+
+
+def _merge_line_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Merge overlapping or adjacent (start, end) line ranges into sorted spans."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# Serializes point ranges set on shared Query objects (tree-sitter < 0.25)
+_query_lock = threading.Lock()
+
+
+def _query_nodes(query, root, start_point, end_point) -> list:
+    """Run `query` over the part of `root` intersecting the point range."""
+    try:
+        from tree_sitter import QueryCursor
+    except ImportError:
+        # tree-sitter < 0.25 runs queries directly on the Query object, which
+        # holds the point range itself
+        with _query_lock:
+            query.set_point_range((start_point, end_point))
+            captures = query.captures(root)
+    else:
+        cursor = QueryCursor(query)
+        cursor.set_point_range(start_point, end_point)
+        captures = cursor.captures(root)
+    if isinstance(captures, dict):
+        return [node for nodes in captures.values() for node in nodes]
+    return [node for node, _ in captures]
+
+
+# Parsed base-revision trees keyed by (language, base blob id), most recent last
+BASE_TREE_CACHE_SIZE = 64
+_base_trees: OrderedDict[tuple[str, str], tuple[object, list[int]]] = OrderedDict()
+_base_trees_lock = threading.Lock()
+
+
+def decode_lines(data: bytes) -> list[str]:
+    """
+    Decode file bytes into lines the way the extractors read files: UTF-8 with
+    undecodable bytes dropped and universal newlines, line endings kept. Line
+    numbers of symbol ranges index into this list (1-based).
+    """
+    return io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+
+
+def _line_offsets(lines: list[str]) -> list[int]:
+    """Byte offset of the start of every line, plus the total length."""
+    return list(accumulate((len(line.encode('utf8')) for line in lines), initial=0))
+
+
+def _base_tree(name: str, parser, blob: str) -> tuple[object, list[int]] | None:
+    """Return the cached (tree, line offsets) of a base blob, parsing it on first use."""
+    key = (name, blob)
+    with _base_trees_lock:
+        if key in _base_trees:
+            _base_trees.move_to_end(key)
+            return _base_trees[key]
+    data = shared_reader().read_object(blob)
+    if data is None:
+        return None
+    lines = decode_lines(data)
+    entry = (parser.parse(''.join(lines).encode('utf8')), _line_offsets(lines))
+    with _base_trees_lock:
+        _base_trees[key] = entry
+        while len(_base_trees) > BASE_TREE_CACHE_SIZE:
+            _base_trees.popitem(last=False)
+    return entry
+
+
+def _edits_tree_copies() -> bool:
+    """
+    True if the Tree-sitter runtime can edit more than one copy of a tree.
+    Before 0.25 (the release that added QueryCursor) editing a second copy of
+    a cached base tree crashes the interpreter.
+    """
+    try:
+        from tree_sitter import QueryCursor  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _incremental_parse(name: str, parser, lines: list[str], source: bytes, base: FileDiff):
+    """
+    Reparse `source` by applying the diff's hunk edits to the cached base tree, so
+    Tree-sitter reuses every unchanged subtree. Returns None when the base is
+    unavailable, the edits do not line up with the file, or the runtime cannot
+    safely edit copies of the cached tree.
+    """
+    if not _edits_tree_copies():
+        return None
+    entry = _base_tree(name, parser, base.old_blob)
+    if entry is None:
+        return None
+    base_tree, old_offsets = entry
+    removed = sum(old_len for _, old_len, _, _ in base.edits)
+    added = sum(new_len for _, _, _, new_len in base.edits)
+    if len(old_offsets) - 1 - removed + added != len(lines):
+        return None
+    new_offsets = _line_offsets(lines)
+
+    tree = base_tree.copy()
+    for old_start, old_len, new_start, new_len in base.edits:
+        # A zero-length side means "after line N"; otherwise lines N..N+len-1
+        old_row = old_start if old_len == 0 else old_start - 1
+        new_row = new_start if new_len == 0 else new_start - 1
+        # Earlier edits are already applied, so positions before this hunk are new ones
+        start_byte = new_offsets[new_row]
+        old_bytes = old_offsets[old_row + old_len] - old_offsets[old_row]
+        tree.edit(
+            start_byte=start_byte,
+            old_end_byte=start_byte + old_bytes,
+            new_end_byte=new_offsets[new_row + new_len],
+            start_point=(new_row, 0),
+            old_end_point=(new_row + old_len, 0),
+            new_end_point=(new_row + new_len, 0),
+        )
+    return parser.parse(source, tree)
+
+
+def _tree_sitter_ranges(
+    parser,
+    query,
+    lines: list[str],
+    line_ranges: list[tuple[int, int]] | None,
+    base: FileDiff | None,
+    language: str,
+) -> list[tuple[int, int]]:
+    """Definition ranges from a Tree-sitter parse; see `parse_symbol_ranges`."""
+    source = ''.join(lines).encode('utf8')
+    tree = None
+    if base is not None and base.old_blob and base.edits:
+        tree = _incremental_parse(language, parser, lines, source, base)
+    if tree is None:
+        tree = parser.parse(source)
+    if line_ranges is None:
+        spans = [(1, max(len(lines), 1))]
+    else:
+        spans = _merge_line_ranges(line_ranges)
+    # The query runs in C and only descends into subtrees overlapping each span
+    symbol_ranges: set[tuple[int, int]] = set()
+    for start, end in spans:
+        for node in _query_nodes(query, tree.root_node, (max(start - 1, 0), 0), (end, 0)):
+            symbol_ranges.add((node.start_point[0] + 1, node.end_point[0] + 1))
+    return sorted(symbol_ranges)
+
+
+def parse_symbol_ranges(
+    lines: list[str],
+    line_ranges: list[tuple[int, int]] | None = None,
+    base: FileDiff | None = None,
+    language: str = 'python',
+) -> tuple[list[tuple[int, int]] | None, str]:
+    """
+    Parse source lines of `language` and return the (start, end) line ranges of
+    all function, class and method definitions together with the backend that
+    produced them. With `line_ranges`, Tree-sitter only reports definitions
+    overlapping those lines (which includes every definition enclosing them).
+    With a `base` file diff, the tree is derived incrementally from the parsed
+    base revision. Ranges are None if the source cannot be parsed.
+    """
+    parser = get_parser(language)
+    query = definitions_query(language) if parser is not None else None
+    if query is not None:
+        try:
+            ranges = _tree_sitter_ranges(parser, query, lines, line_ranges, base, language)
+            return ranges, 'tree-sitter'
+        except Exception:
+            # Fall back to the AST or line windows rather than dropping the file
+            pass
+
+    # Fall back to the Python AST when no grammar is available
+    if language != 'python':
+        return None, 'none'
+    symbol_ranges = []
+    try:
+        tree = ast.parse(''.join(lines))
+    except SyntaxError:
+        return None, 'ast'
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            s = getattr(node, 'lineno', None)
+            e = getattr(node, 'end_lineno', None)
+            if s is None:
+                continue
+            if e is None:
+                e = s
+                for child in ast.walk(node):
+                    if hasattr(child, 'lineno'):
+                        e = max(e, child.lineno)
+            symbol_ranges.append((s, e))
+    return symbol_ranges, 'ast'
 
 
 def extract_by_symbol(
     file_path: str,
     hunks: list[tuple[int, int]],
     context_lines: int,
-) -> list[dict]:
+    scope: str = 'innermost',
+    cache: 'SymbolCache | None' = None,
+    base: FileDiff | None = None,
+    data: bytes | None = None,
+    timings: Timings | None = None,
+) -> list[Snippet]:
     """
-    For Python files, use Tree-sitter to locate enclosing function/class definitions
-    for each hunk, and extract full symbol blocks with additional context lines.
+    For files of a registered language, use Tree-sitter (or the Python AST) to
+    locate enclosing function/class/method definitions for each hunk, and extract
+    full symbol blocks with additional context lines.
+    `scope` selects the innermost (default) or outermost enclosing definition.
+    When a `cache` is given, symbol ranges are looked up by the file's git blob
+    hash and the file is only parsed on a miss. Symbol snippets record the
+    `backend` that produced their ranges: 'tree-sitter', 'ast' or 'cache'.
+    Passing the file's `base` diff enables incremental reparsing from the
+    cached base-revision tree. `data` is the raw file contents if already read.
+    `timings` records the 'parse' and 'symbol lookup' stages for this file.
     Falls back to raw diff-based context for unsupported files or missing symbols.
     """
-    if not os.path.isfile(file_path):
+    if data is None and not os.path.isfile(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
-    _, ext = os.path.splitext(file_path)
-    if ext.lower() != '.py':
+    spec = language_for_path(file_path)
+    if spec is None:
         return []
 
-    # Read source lines
-    with open(file_path, encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
+    # Read source lines, keeping the raw bytes to key the symbol cache
+    if data is None:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    lines = decode_lines(data)
     total_lines = len(lines)
-    source = ''.join(lines).encode('utf8')
 
-    # Collect symbol ranges: try Tree-sitter first, then Python AST
-    symbol_ranges: list[tuple[int, int]] = []
-    try:
-        from tree_sitter import Parser
-        from tree_sitter_languages import get_language
+    symbol_ranges = None
+    backend = 'cache'
+    with stage(timings, 'parse', bytes=len(data), lines=total_lines) as record:
+        if cache is not None:
+            from codereviewprompt.cache import blob_sha
 
-        # Load Python language via tree-sitter-languages
-        PY_LANGUAGE = get_language('python')
-        parser = Parser()
-        parser.language = PY_LANGUAGE
-        tree = parser.parse(source)
-        # Traverse Tree-sitter tree for symbols
-        def traverse(node):
-            if node.type in ('function_definition', 'class_definition'):
-                s = node.start_point[0] + 1
-                e = node.end_point[0] + 1
-                symbol_ranges.append((s, e))
-            for child in node.children:
-                traverse(child)
-        traverse(tree.root_node)
-    except Exception:
-        symbol_ranges = []
-    # Fallback to AST if no symbols found
-    if not symbol_ranges:
-        try:
-            tree = ast.parse(''.join(lines))
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                    s = getattr(node, 'lineno', None)
-                    e = getattr(node, 'end_lineno', None)
-                    if s is None:
-                        continue
-                    if e is None:
-                        e = s
-                        for child in ast.walk(node):
-                            if hasattr(child, 'lineno'):
-                                e = max(e, child.lineno)
-                    symbol_ranges.append((s, e))
-        except SyntaxError:
-            # Fallback entirely to raw diff context
-            return extract_context(file_path, hunks, context_lines)
-
-    contexts: list[dict] = []
-    for hunk_start, hunk_end in hunks:
-        # Find first symbol that encloses the hunk start
-        match = next(
-            ((s, e) for (s, e) in symbol_ranges if s <= hunk_start <= e),
-            None,
+            key = blob_sha(data)
+            symbol_ranges = cache.get(key, spec.name)
+        if symbol_ranges is None:
+            # Cached entries must cover the whole file; otherwise only hunk lines matter
+            line_ranges = None if cache is not None else hunks
+            symbol_ranges, backend = parse_symbol_ranges(lines, line_ranges, base, spec.name)
+            # A fallback after a Tree-sitter failure is served but never cached
+            if (
+                symbol_ranges is not None and cache is not None
+                and backend == parser_backend(spec.name)
+            ):
+                cache.put(key, spec.name, symbol_ranges)
+        record['backend'] = backend
+    # Snippets are views into one buffer per file rather than copies of its text
+    source = SourceBuffer(lines)
+    if symbol_ranges is None:
+        # Fallback entirely to raw diff context
+        return extract_context(file_path, hunks, context_lines, source)
+
+    with stage(timings, 'symbol lookup', hunks=len(hunks), symbols=len(symbol_ranges)):
+        return _symbol_contexts(
+            file_path, hunks, context_lines, scope, source, SymbolIndex(symbol_ranges), backend
         )
+
+
+def _symbol_contexts(
+    file_path: str,
+    hunks: list[tuple[int, int]],
+    context_lines: int,
+    scope: str,
+    source: SourceBuffer,
+    index: SymbolIndex,
+    backend: str,
+) -> list[Snippet]:
+    """Build one snippet per hunk from its enclosing symbol, or a line window if none."""
+    total_lines = len(source)
+    contexts: list[Snippet] = []
+    for hunk_start, hunk_end in hunks:
+        # Find the symbol that encloses the hunk start
+        match = index.lookup(hunk_start, scope)
         if match:
             s, e = match
             ctx_start = max(1, s - context_lines)
             ctx_end = min(total_lines, e + context_lines)
-            snippet = ''.join(lines[ctx_start - 1 : ctx_end])
-            contexts.append({
-                'file_path': file_path,
-                'hunk_start': hunk_start,
-                'hunk_end': hunk_end,
-                'context_start': ctx_start,
-                'context_end': ctx_end,
-                'snippet': snippet,
-            })
+            contexts.append(
+                Snippet(file_path, hunk_start, hunk_end, ctx_start, ctx_end, source, backend,
+                        symbol=match)
+            )
         else:
             # Fallback to raw diff context for this hunk
-            contexts.extend(extract_context(file_path, [(hunk_start, hunk_end)], context_lines))
-    return contexts
\ No newline at end of file
+            contexts.extend(extract_context(file_path, [(hunk_start, hunk_end)], context_lines, source))
+    return contexts
+
+
+def extract_file_context(
+    file_path: str,
+    hunks: list[tuple[int, int]],
+    context_lines: int,
+    scope: str = 'innermost',
+    cache: 'SymbolCache | None' = None,
+    base: FileDiff | None = None,
+    reader: BlobReader | WorkingTreeReader | None = None,
+    timings: Timings | None = None,
+) -> list[Snippet]:
+    """
+    Extract context snippets for one file, preferring symbol-based extraction and
+    falling back to raw line windows when no symbol snippets are available.
+    The file is read once through `reader` (default: the working tree). Large
+    working tree files are memory-mapped and only get line windows. Binary and
+    non-UTF-8 files raise UnsupportedContentError.
+    """
+    reader = reader or WorkingTreeReader()
+    with stage(timings, 'read') as record:
+        mapped = reader.map(file_path) if isinstance(reader, WorkingTreeReader) else None
+        if mapped is not None:
+            record['bytes'] = mapped.size(1, len(mapped))
+            record['mapped'] = 1
+            return extract_context(file_path, hunks, context_lines, mapped)
+        data = reader.read(file_path)
+        record['bytes'] = len(data) if data is not None else 0
+    if data is None:
+        raise FileNotFoundError(f"File not found: {file_path}")
+    reason = sniff(data)
+    if reason is not None:
+        raise UnsupportedContentError(reason)
+    snippets = extract_by_symbol(file_path, hunks, context_lines, scope, cache, base, data, timings)
+    if not snippets:
+        snippets = extract_context(file_path, hunks, context_lines, decode_lines(data))
+    return snippets
+
+
+def extract_one(
+    file_path: str,
+    hunks: list[tuple[int, int]],
+    context_lines: int,
+    scope: str = 'innermost',
+    cache: 'SymbolCache | None' = None,
+    base: FileDiff | None = None,
+    reader: BlobReader | WorkingTreeReader | None = None,
+    timings: Timings | None = None,
+) -> tuple[str, list[Snippet], Exception | None]:
+    """
+    `extract_file_context` that never raises: returns (file_path, snippets,
+    error), with no snippets for a missing file and the exception as `error`
+    for any other failure.
+    """
+    try:
+        snippets = extract_file_context(
+            file_path, hunks, context_lines, scope, cache, base, reader, timings
+        )
+        return file_path, snippets, None
+    except FileNotFoundError:
+        # Skip deleted or missing files
+        return file_path, [], None
+    except Exception as e:
+        return file_path, [], e
+
+
+def extract_all(
+    hunks_map: dict[str, list[tuple[int, int]]],
+    context_lines: int,
+    jobs: int | None = None,
+    scope: str = 'innermost',
+    cache: 'SymbolCache | None' = None,
+    bases: dict[str, FileDiff] | None = None,
+    reader: BlobReader | WorkingTreeReader | None = None,
+    timings: Timings | None = None,
+) -> Iterator[tuple[str, list[Snippet], Exception | None]]:
+    """
+    Extract context for every file in `hunks_map` using a pool of `jobs` worker
+    threads (default: CPU count). Yields (file_path, snippets, error) in the
+    order of `hunks_map`, regardless of completion order. Missing files are
+    skipped; any other failure is reported as `error` instead of aborting the run.
+    `bases` maps paths to their file diffs to enable incremental reparsing, and
+    `reader` supplies file contents (default: the working tree), and `timings`
+    records per-file read, parse and lookup stages.
+    """
+    bases = bases or {}
+    items = [(path, hunks) for path, hunks in hunks_map.items() if hunks]
+    jobs = jobs or os.cpu_count() or 1
+
+    def work(item):
+        file_path, hunks = item
+        return extract_one(
+            file_path, hunks, context_lines, scope, cache, bases.get(file_path), reader, timings
+        )
+
+    if jobs == 1 or len(items) <= 1:
+        yield from map(work, items)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as pool:
+        yield from pool.map(work, items)
+
+
+def _snippet_lines(snippet: str) -> list[str]:
+    """Split a snippet into lines at '\n' only, keeping line endings."""
+    return io.StringIO(snippet, newline='\n').readlines()
+
+
+def _snippet_size(ctx) -> int:
+    """UTF-8 byte length of a snippet's text."""
+    if isinstance(ctx, Snippet):
+        return ctx.size()
+    return len(ctx['snippet'].encode('utf8'))
+
+
+def _is_view_of(ctx, other) -> bool:
+    """True if both snippets are unmodified views into the same file buffer."""
+    return (
+        isinstance(ctx, Snippet) and isinstance(other, Snippet)
+        and ctx.source is other.source and ctx._text is None and other._text is None
+    )
+
+
+def coalesce_contexts(contexts: list[Snippet]) -> tuple[list[Snippet], int]:
+    """
+    Merge overlapping or adjacent context snippets of the same file into single
+    snippets, so code shared by several hunks is emitted once. Each merged
+    snippet lists all of its hunks under `hunks`. Files keep their first-seen
+    order and snippets are sorted by line within a file (O(n log n)). Views into
+    the same file buffer merge by widening their line range, without copying
+    text; other snippets (e.g. plain dicts) are merged by joining their lines.
+    Returns (merged contexts, bytes of snippet text saved).
+    """
+    by_file: dict[str, list[Snippet]] = {}
+    for ctx in contexts:
+        by_file.setdefault(ctx['file_path'], []).append(ctx)
+
+    merged: list[Snippet] = []
+    before = after = 0
+    for file_contexts in by_file.values():
+        file_contexts.sort(key=lambda c: (c['context_start'], c['context_end']))
+        current = None
+        # Lines of the merged text, once a snippet could not be merged as a view
+        current_lines: list[str] | None = None
+        for ctx in file_contexts:
+            before += _snippet_size(ctx)
+            hunks = ctx.get('hunks') or [(ctx['hunk_start'], ctx['hunk_end'])]
+            if current is not None and ctx['context_start'] <= current['context_end'] + 1:
+                # Extend by only the lines this snippet adds beyond the current one
+                if ctx['context_end'] > current['context_end']:
+                    if current_lines is not None or not _is_view_of(current, ctx):
+                        if current_lines is None:
+                            current_lines = _snippet_lines(current['snippet'])
+                        skip = current['context_end'] - ctx['context_start'] + 1
+                        current_lines.extend(_snippet_lines(ctx['snippet'])[skip:])
+                    current['context_end'] = ctx['context_end']
+                current['hunks'].extend(hunks)
+                continue
+            if current is not None:
+                merged.append(_finish_merge(current, current_lines))
+            if isinstance(ctx, Snippet):
+                current = ctx.replace(hunks=list(hunks))
+            else:
+                current = dict(ctx, hunks=list(hunks))
+            current_lines = None
+        if current is not None:
+            merged.append(_finish_merge(current, current_lines))
+    after = sum(_snippet_size(ctx) for ctx in merged)
+    return merged, before - after
+
+
+def _finish_merge(ctx: Snippet, lines: list[str] | None) -> Snippet:
+    """Finalize a merged snippet: set its joined text if any, and sort/dedupe its hunks."""
+    if lines is not None:
+        ctx['snippet'] = ''.join(lines)
+    ctx['hunks'] = IntTuples(2, sorted(set(ctx['hunks'])))
+    ctx['hunk_start'] = ctx['hunks'][0][0]
+    ctx['hunk_end'] = max(end for _, end in ctx['hunks'])
+    return ctx
@@ -0,0 +1,271 @@
+"""
+Cross-file definition index: the name and line range of every function, class
+and method in the repository, from the same Tree-sitter/AST pass as context
+extraction and cached per git blob. Used to add the definitions of names that
+changed lines reference, such as called helpers, under a token budget.
+"""
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable
+
+from codereviewprompt.blobs import BlobReader, shared_reader
+from codereviewprompt.context import decode_lines, parse_symbol_ranges
+from codereviewprompt.languages import definition_name, language_for_path, parser_backend
+from codereviewprompt.mapped import sniff
+from codereviewprompt.records import SourceBuffer, Snippet
+from codereviewprompt.timings import Timings, stage
+
+if TYPE_CHECKING:
+    from codereviewprompt.cache import SymbolCache
+
+# Identifiers in changed lines that may name a definition
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_$][\w$]*')
+# Names defined more often than this are too ambiguous to resolve, unless one
+# definition is in the referencing file
+MAX_CANDIDATES = 3
+# Tracked files larger than this are not indexed (usually generated)
+MAX_INDEXED_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class Definition:
+    """A named definition at lines `start`..`end` of `path`, whose content is `blob`."""
+    name: str
+    path: str
+    start: int
+    end: int
+    blob: str
+
+
+def tracked_files(head: str | None = None) -> list[tuple[str, str]]:
+    """
+    (path, blob id) of every tracked file of a registered language: from the
+    index (`git ls-files -s`), or from the tree of `head` when given.
+    """
+    if head:
+        args = ['git', 'ls-tree', '-r', '-z', '--full-tree', head]
+    else:
+        args = ['git', 'ls-files', '-s', '-z']
+    try:
+        out = subprocess.run(args, capture_output=True, check=True).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+    files = []
+    # ls-tree: "<mode> blob <sha>\t<path>"; ls-files -s: "<mode> <sha> <stage>\t<path>"
+    for entry in out.split(b'\0'):
+        meta, _, path = entry.partition(b'\t')
+        parts = meta.split()
+        if len(parts) != 3 or not parts[0].startswith(b'100'):
+            continue
+        blob = parts[2] if head else parts[1]
+        path = path.decode('utf-8', errors='surrogateescape')
+        if language_for_path(path) is not None:
+            files.append((path, blob.decode('ascii')))
+    return files
+
+
+def file_definitions(data: bytes, language: str) -> tuple[list[tuple[str, int, int]], str]:
+    """
+    (name, start, end) of every definition in a file's contents, and the
+    backend that found them; files that are not indexed have none.
+    """
+    if len(data) > MAX_INDEXED_BYTES or sniff(data) is not None:
+        return [], parser_backend(language)
+    lines = decode_lines(data)
+    ranges, backend = parse_symbol_ranges(lines, None, None, language)
+    definitions = []
+    for start, end in ranges or ():
+        name = definition_name(lines[start - 1]) if start <= len(lines) else None
+        if name:
+            definitions.append((name, start, end))
+    return definitions, backend
+
+
+class DefinitionIndex:
+    """
+    Maps names to their definitions across the repository. `build()` looks up
+    every file's definitions in the symbol cache by blob id and only reads and
+    parses files whose contents changed since they were last indexed, so a
+    warm index costs one `git ls-files` and a few batched cache queries.
+    """
+
+    def __init__(
+        self,
+        cache: 'SymbolCache | None' = None,
+        objects: BlobReader | None = None,
+        jobs: int | None = None,
+    ):
+        self.cache = cache
+        self.objects = objects or shared_reader()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.by_name: dict[str, list[Definition]] = {}
+        self.parsed = 0
+        # Contents not in the object store, e.g. modified working tree files
+        self._contents: dict[str, bytes] = {}
+
+    def add_contents(self, blob: str, data: bytes) -> None:
+        """Make `data` readable as `blob` without the object store."""
+        self._contents[blob] = data
+
+    def read(self, blob: str) -> bytes | None:
+        data = self._contents.get(blob)
+        return data if data is not None else self.objects.read_object(blob)
+
+    def build(
+        self,
+        files: list[tuple[str, str]],
+        languages: Iterable[str] | None = None,
+        names: Iterable[str] | None = None,
+    ) -> 'DefinitionIndex':
+        """
+        Index (path, blob id) `files`, limited to `languages` if given. With
+        `names`, only definitions of those names are kept in `by_name`; every
+        file's definitions are still parsed and cached in full.
+        """
+        wanted = set(languages) if languages is not None else None
+        kept = set(names) if names is not None else None
+        by_language: dict[str, list[tuple[str, str]]] = {}
+        for path, blob in files:
+            spec = language_for_path(path)
+            if spec is not None and (wanted is None or spec.name in wanted):
+                by_language.setdefault(spec.name, []).append((path, blob))
+        for language, entries in by_language.items():
+            blobs = list(dict.fromkeys(blob for _, blob in entries))
+            known = self.cache.get_definitions_many(blobs, language) if self.cache is not None else {}
+            missing = [blob for blob in blobs if blob not in known]
+            for blob, (definitions, backend) in zip(missing, self._parse_all(missing, language)):
+                known[blob] = definitions
+                # Like symbol ranges, fallback results are not cached
+                if self.cache is not None and backend == parser_backend(language):
+                    self.cache.put_definitions(blob, language, definitions)
+            self.parsed += len(missing)
+            if kept is not None:
+                # Filter once per distinct blob rather than once per file
+                known = {
+                    blob: [d for d in definitions if d[0] in kept]
+                    for blob, definitions in known.items()
+                }
+            for path, blob in entries:
+                for name, start, end in known[blob]:
+                    self.by_name.setdefault(name, []).append(Definition(name, path, start, end, blob))
+        return self
+
+    def _parse_all(
+        self, blobs: list[str], language: str
+    ) -> list[tuple[list[tuple[str, int, int]], str]]:
+        def parse(blob):
+            data = self.read(blob)
+            return file_definitions(data, language) if data is not None else ([], 'missing')
+
+        if self.jobs == 1 or len(blobs) <= 1:
+            return list(map(parse, blobs))
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(blobs))) as pool:
+            return list(pool.map(parse, blobs))
+
+    def resolve(self, name: str, from_path: str) -> list[Definition]:
+        """
+        Definitions `name` most likely refers to from `from_path`: those in the
+        same file if any, else every candidate unless there are too many.
+        """
+        candidates = self.by_name.get(name, [])
+        local = [d for d in candidates if d.path == from_path]
+        if local:
+            return local
+        if len(candidates) > MAX_CANDIDATES:
+            return []
+        folder = os.path.dirname(from_path)
+        return sorted(candidates, key=lambda d: os.path.dirname(d.path) != folder)
+
+
+def referenced_names(contexts: list[Snippet]) -> list[tuple[str, str]]:
+    """(file_path, name) of identifiers in the changed lines of each snippet, first seen first."""
+    seen = {}
+    for ctx in contexts:
+        source = getattr(ctx, 'source', None)
+        if source is None:
+            continue
+        hunks = ctx.get('hunks') or [(ctx['hunk_start'], ctx['hunk_end'])]
+        for start, end in hunks:
+            for name in _IDENTIFIER_RE.findall(source.lines(start, end)):
+                seen.setdefault((ctx['file_path'], name), None)
+    return list(seen)
+
+
+def related_definitions(
+    contexts: list[Snippet],
+    max_tokens: int,
+    count_tokens: Callable[[str], int],
+    cache: 'SymbolCache | None' = None,
+    head: str | None = None,
+    jobs: int | None = None,
+    timings: Timings | None = None,
+) -> list[Snippet]:
+    """
+    Snippets with the definitions of names referenced in the changed lines of
+    `contexts`, in order of first reference, until `max_tokens` is spent. A
+    name resolves to definitions in the referencing file if it has any, else
+    to those in the same directory first. Definitions that overlap a context
+    snippet are already in the prompt and are skipped. Only files of the
+    languages being changed are indexed. Changed working tree files are
+    indexed from their current contents, other files from git objects.
+    """
+    references = referenced_names(contexts)
+    if not references or max_tokens <= 0:
+        return []
+    index = DefinitionIndex(cache, jobs=jobs)
+    files = dict(tracked_files(head))
+    if not head:
+        from codereviewprompt.cache import blob_sha
+
+        # Changed files are read from the working tree, like their snippets
+        for path in {ctx['file_path'] for ctx in contexts}:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            files[path] = blob_sha(data)
+            index.add_contents(files[path], data)
+    # Names resolve to definitions in the languages being changed
+    languages = {spec.name for ctx in contexts if (spec := language_for_path(ctx['file_path']))}
+    with stage(timings, 'index', files=len(files)) as record:
+        index.build(list(files.items()), languages, {name for _, name in references})
+        record['parsed'] = index.parsed
+
+    shown: dict[str, list[tuple[int, int]]] = {}
+    for ctx in contexts:
+        shown.setdefault(ctx['file_path'], []).append((ctx['context_start'], ctx['context_end']))
+    related: list[Snippet] = []
+    picked: set[Definition] = set()
+    sources: dict[str, SourceBuffer] = {}
+    budget = max_tokens
+    with stage(timings, 'resolve', names=len(references)) as record:
+        for from_path, name in references:
+            for definition in index.resolve(name, from_path):
+                if definition in picked or any(
+                    start <= definition.end and definition.start <= end
+                    for start, end in shown.get(definition.path, ())
+                ):
+                    continue
+                if definition.blob not in sources:
+                    data = index.read(definition.blob)
+                    if data is None:
+                        continue
+                    sources[definition.blob] = SourceBuffer(decode_lines(data))
+                source = sources[definition.blob]
+                cost = count_tokens(source.lines(definition.start, definition.end))
+                if cost > budget:
+                    continue
+                budget -= cost
+                picked.add(definition)
+                shown.setdefault(definition.path, []).append((definition.start, definition.end))
+                related.append(Snippet(
+                    definition.path, definition.start, definition.end, definition.start,
+                    definition.end, source, symbol=(definition.start, definition.end),
+                ))
+        record['definitions'] = len(related)
+    return related
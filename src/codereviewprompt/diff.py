@@ -1,104 +1,370 @@
 """
 Functions for extracting git diff hunks and surrounding context.
 """
+import codecs
 import subprocess
 import re
 import os
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
 
-def get_diff_hunks(base: str, unified: int = 0) -> dict[str, list[tuple[int, int]]]:
+from codereviewprompt.records import IntTuples, SourceBuffer, Snippet
+
+if TYPE_CHECKING:
+    from codereviewprompt.mapped import MappedBuffer
+    from codereviewprompt.timings import Timings
+
+# Regex to match a new-file path in diff header
+_NEW_FILE_RE = re.compile(r'^\+\+\+ [ab]/?(.*)')
+# Regex to match an old-file path in diff header
+_OLD_FILE_RE = re.compile(r'^--- [ab]/?(.*)')
+# Regex to match hunk headers, capturing old and new file start and length
+_HUNK_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+# Regex to match the `index <old>..<new>` blob id line
+_INDEX_RE = re.compile(r'^index ([0-9a-f]+)\.\.([0-9a-f]+)')
+# Regex to match the `diff --git a/<old> b/<new>` section header
+_DIFF_GIT_RE = re.compile(r'^diff --git a/(.*) b/(.*)$')
+# Regex to match `similarity index <n>%` of a detected rename or copy
+_SIMILARITY_RE = re.compile(r'^similarity index (\d+)%')
+
+# Raw diff text is spooled in memory up to this size, then moved to a temp file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+@dataclass(slots=True)
+class FileDiff:
     """
-    Run `git diff` against the given base (branch, tag, or commit) with specified unified context,
-    and parse hunk headers to return a mapping of file paths to lists of (start, end) line ranges
-    in the new version.
+    One file section of a `git diff`: its path, parsed hunk ranges in the new
+    version, and the location of its raw diff text inside the result spool.
+    `edits` keeps the raw (old_start, old_len, new_start, new_len) of every
+    hunk header and `old_blob` the base blob id, for incremental reparsing.
+    Both are array-backed so huge diffs do not allocate a tuple per hunk.
+    For a detected rename or copy, `old_path` is the source path and `hunks`
+    cover only the lines edited after the move.
+    """
+    path: str
+    hunks: IntTuples = field(default_factory=IntTuples)
+    edits: IntTuples = field(default_factory=lambda: IntTuples(4))
+    old_blob: str | None = None
+    deleted: bool = False
+    offset: int = 0
+    length: int = 0
+    old_path: str | None = None
+    similarity: int | None = None
+    copied: bool = False
+
+    @property
+    def pure_move(self) -> bool:
+        """True for a rename or copy without content changes."""
+        return self.old_path is not None and not self.hunks
+
+
+class DiffResult:
+    """
+    Structured result of a single `git diff` run.
+
+    `files` lists every file section in diff order, and `hunks` maps each
+    non-deleted path to its (start, end) line ranges. The raw diff text is
+    kept in a spooled temporary file rather than in Python strings; use
+    `text()` for one file or `iter_text()` to stream all of it.
+    """
+
+    def __init__(self, spool=None):
+        self.files: list[FileDiff] = []
+        self.hunks: dict[str, IntTuples] = {}
+        self._spool = spool
+
+    def __bool__(self) -> bool:
+        return bool(self.hunks)
+
+    def __enter__(self) -> 'DiffResult':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    @classmethod
+    def from_sections(cls, sections: Iterable[tuple[FileDiff, bytes]]) -> 'DiffResult':
+        """
+        Build a result from (file diff, raw diff bytes) pairs, e.g. file sections
+        kept from several earlier `read_diff` calls, in the given order.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        result = cls(spool)
+        for file_diff, data in sections:
+            file_diff = replace(file_diff, offset=spool.tell(), length=len(data))
+            spool.write(data)
+            result.files.append(file_diff)
+            if not file_diff.deleted and not file_diff.pure_move:
+                result.hunks.setdefault(file_diff.path, file_diff.hunks)
+        return result
+
+    def raw(self, file_diff: FileDiff) -> bytes:
+        """Return the undecoded diff bytes of a single file section."""
+        if self._spool is None or not file_diff.length:
+            return b''
+        self._spool.seek(file_diff.offset)
+        return self._spool.read(file_diff.length)
+
+    def text(self, file_diff: FileDiff) -> str:
+        """Return the raw diff text of a single file section."""
+        return self.raw(file_diff).decode('utf-8', errors='replace')
+
+    def write_text(self, file_diff: FileDiff, out: TextIO, chunk_size: int = 1 << 16) -> None:
+        """Copy the raw diff text of one file section to `out` in bounded chunks."""
+        if self._spool is None or not file_diff.length:
+            return
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._spool.seek(file_diff.offset)
+        remaining = file_diff.length
+        while remaining:
+            chunk = self._spool.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            out.write(decoder.decode(chunk))
+        out.write(decoder.decode(b'', final=True))
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the raw diff text one file section at a time, in diff order."""
+        for file_diff in self.files:
+            yield self.text(file_diff)
+
+
+def diff_command(
+    base: str,
+    unified: int = 0,
+    head: str | None = None,
+    paths: list[str] | None = None,
+    renames: bool = True,
+) -> list[str]:
+    """
+    The `git diff` argv used by `read_diff` and the streaming pipeline. With
+    `renames`, moved and copied files are detected (`-M -C`), so they show up
+    as their real edits rather than as a whole deletion plus a whole addition.
+    """
+    return (
+        ['git', 'diff', f'--unified={unified}']
+        + (['--find-renames', '--find-copies'] if renames else ['--no-renames'])
+        + [base]
+        + ([head] if head else [])
+        + (['--', *paths] if paths else [])
+    )
+
+
+# Extended header lines parsed before the first hunk of a file section
+_HEADER_PREFIXES = (b'+++ ', b'--- ', b'index ', b'similarity index ', b'rename from ', b'copy from ')
+
+
+class DiffParser:
     """
-    # Run git diff
+    Incremental parser for `git diff` output fed one raw line at a time. Builds
+    a DiffResult, spooling the raw text unless `keep_text` is False, and hands
+    back each file section as soon as the next one starts. Tracks the bytes
+    seen and the time spent parsing header lines.
+    """
+
+    def __init__(self, keep_text: bool = True):
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) if keep_text else None
+        self.result = DiffResult(spool)
+        self.bytes = 0
+        self.parse_time = 0.0
+        self._current: FileDiff | None = None
+        self._in_hunks = False
+
+    def feed(self, raw: bytes) -> FileDiff | None:
+        """Consume one line; return the previous file section if this line completes it."""
+        self.bytes += len(raw)
+        done = None
+        if raw.startswith(b'diff --git '):
+            done = self._current
+            self._current = _start_file(self.result, raw)
+            self._in_hunks = False
+        current = self._current
+        if current is None:
+            return done
+        spool = self.result._spool
+        if spool is not None:
+            spool.write(raw)
+            current.length += len(raw)
+        # Only header lines need decoding; content lines are copied as bytes.
+        # Once the first @@ is seen, ---/+++ prefixes are diff content.
+        if raw.startswith(b'@@ ') or (
+            not self._in_hunks and raw.startswith(_HEADER_PREFIXES)
+        ):
+            self._in_hunks = self._in_hunks or raw.startswith(b'@@ ')
+            t = time.perf_counter()
+            _parse_header(self.result, current, raw.decode('utf-8', errors='replace').rstrip('\n'))
+            self.parse_time += time.perf_counter() - t
+        return done
+
+    def finish(self) -> FileDiff | None:
+        """Return the last file section, which no following header completes."""
+        done, self._current = self._current, None
+        return done
+
+    def record(self, timings: 'Timings | None', start: float) -> None:
+        """Record 'git diff' and 'parse hunks' stages for a stream that began at `start`."""
+        if timings is None:
+            return
+        elapsed = time.perf_counter() - start
+        timings.add('git diff', start, elapsed - self.parse_time, bytes=self.bytes)
+        timings.add(
+            'parse hunks', start + elapsed - self.parse_time, self.parse_time,
+            files=len(self.result.files), hunks=sum(len(f.hunks) for f in self.result.files),
+        )
+
+
+def read_diff(
+    base: str,
+    unified: int = 0,
+    keep_text: bool = True,
+    head: str | None = None,
+    timings: 'Timings | None' = None,
+    paths: list[str] | None = None,
+    renames: bool = True,
+) -> DiffResult:
+    """
+    Run `git diff` once against the given base and stream its output line by line,
+    collecting the per-file hunk map and (unless `keep_text` is False) the raw diff
+    text of each file section. With `head`, diff `base` against that revision
+    instead of the working tree. `paths` limits the diff to those pathspecs, and
+    `renames` turns rename and copy detection on (the default) or off.
+    Returns an empty result if git fails.
+    With `timings`, the time spent parsing headers is recorded as 'parse hunks'
+    and the rest of the streaming loop as 'git diff'.
+    """
+    parser = DiffParser(keep_text)
     try:
-        output = subprocess.check_output(
-            ['git', 'diff', f'--unified={unified}', base],
+        proc = subprocess.Popen(
+            diff_command(base, unified, head, paths, renames),
+            stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
-            text=True,
         )
-    except subprocess.CalledProcessError:
-        return {}
-
-    hunks: dict[str, list[tuple[int, int]]] = {}
-    current_file: str | None = None
-    # Regex to match a new-file path in diff header
-    new_file_re = re.compile(r'^\+\+\+ [ab]/?(.*)')
-    # Regex to match hunk headers, capturing new file start and length
-    hunk_re = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
-
-    for line in output.splitlines():
-        # Detect file path
-        if line.startswith('+++ '):
-            m = new_file_re.match(line)
-            if m:
-                path = m.group(1)
-                # /dev/null indicates deletion
-                if path == '/dev/null':
-                    current_file = None
-                else:
-                    current_file = path
-                    hunks.setdefault(current_file, [])
-            else:
-                current_file = None
-            continue
-
-        # Parse hunk headers
-        if line.startswith('@@ ') and current_file:
-            m = hunk_re.match(line)
-            if not m:
-                continue
-            start = int(m.group(1))
-            length = int(m.group(2)) if m.group(2) is not None else 1
-            # If no new lines (deletion), treat the hunk as a single-line at start
-            if length == 0:
-                end = start
-            else:
-                end = start + length - 1
-            hunks[current_file].append((start, end))
-
-    return hunks
+    except FileNotFoundError:
+        return parser.result
+
+    start = time.perf_counter()
+    with proc:
+        for raw in proc.stdout:
+            parser.feed(raw)
+    parser.record(timings, start)
+    if proc.returncode != 0:
+        parser.result.close()
+        return DiffResult()
+    return parser.result
+
+
+def _start_file(result: DiffResult, raw: bytes) -> FileDiff:
+    """Open a new file section at the given `diff --git` header line."""
+    m = _DIFF_GIT_RE.match(raw.decode('utf-8', errors='replace').rstrip('\n'))
+    file_diff = FileDiff(path=m.group(2) if m else '')
+    if result._spool is not None:
+        file_diff.offset = result._spool.tell()
+    result.files.append(file_diff)
+    return file_diff
+
+
+def _parse_header(result: DiffResult, current: FileDiff, line: str) -> None:
+    """
+    Update the current file section from an index, similarity, rename/copy
+    source, ---/+++ path or @@ hunk header.
+    """
+    if line.startswith('similarity index '):
+        m = _SIMILARITY_RE.match(line)
+        if m:
+            current.similarity = int(m.group(1))
+        return
+    if line.startswith(('rename from ', 'copy from ')):
+        kind, _, old_path = line.partition(' from ')
+        current.old_path = old_path
+        current.copied = kind == 'copy'
+        return
+    if line.startswith('index '):
+        m = _INDEX_RE.match(line)
+        if m and m.group(1).strip('0'):
+            current.old_blob = m.group(1)
+        return
+    if line.startswith('--- '):
+        m = _OLD_FILE_RE.match(line)
+        if m:
+            current.path = m.group(1)
+        return
+    if line.startswith('+++ '):
+        m = _NEW_FILE_RE.match(line)
+        # /dev/null indicates deletion
+        if not m or m.group(1) == '/dev/null':
+            current.deleted = True
+        else:
+            current.path = m.group(1)
+            result.hunks.setdefault(current.path, current.hunks)
+        return
+    if current.deleted or current.path not in result.hunks:
+        return
+    m = _HUNK_RE.match(line)
+    if not m:
+        return
+    old_start = int(m.group(1))
+    old_length = int(m.group(2)) if m.group(2) is not None else 1
+    start = int(m.group(3))
+    length = int(m.group(4)) if m.group(4) is not None else 1
+    current.edits.append((old_start, old_length, start, length))
+    # If no new lines (deletion), treat the hunk as a single-line at start
+    if length == 0:
+        end = start
+    else:
+        end = start + length - 1
+    current.hunks.append((start, end))
+
+
+def get_diff_hunks(base: str, unified: int = 0) -> dict[str, list[tuple[int, int]]]:
+    """
+    Run `git diff` against the given base (branch, tag, or commit) with specified unified context,
+    and parse hunk headers to return a mapping of file paths to lists of (start, end) line ranges
+    in the new version. Use `read_diff(...).hunks` for the compact array-backed form.
+    """
+    return {path: list(hunks) for path, hunks in read_diff(base, unified, keep_text=False).hunks.items()}
 
 def extract_context(
     file_path: str,
     hunks: list[tuple[int, int]],
     context_lines: int,
-) -> list[dict]:
+    lines: 'list[str] | SourceBuffer | MappedBuffer | None' = None,
+) -> list[Snippet]:
     """
     Given a file path and list of (start, end) line ranges (1-based), return a list of
-    context snippets, each a dict with keys:
+    context snippets, each a mapping with keys:
       - file_path: the file examined
       - hunk_start, hunk_end: original hunk range
       - context_start, context_end: snippet boundaries
       - snippet: the code snippet as a single string
-    Extracts up to `context_lines` lines before and after each hunk.
+    Extracts up to `context_lines` lines before and after each hunk. Pass the
+    already read `lines` of the file, or its `SourceBuffer` or `MappedBuffer`,
+    to avoid reading it again; snippets are views into that buffer.
     """
-    if not os.path.isfile(file_path):
-        raise FileNotFoundError(f"File not found: {file_path}")
+    if lines is None:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
 
-    # Read all lines from file (preserving line breaks)
-    with open(file_path, encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
+        # Read all lines from file (preserving line breaks)
+        with open(file_path, encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    source = SourceBuffer(lines) if isinstance(lines, list) else lines
 
-    total = len(lines)
-    contexts: list[dict] = []
+    total = len(source)
+    contexts: list[Snippet] = []
 
     for start, end in hunks:
         # Determine context boundaries
         ctx_start = max(1, start - context_lines)
         ctx_end = min(total, end + context_lines)
-
-        # Extract snippet (0-based indexing)
-        snippet = ''.join(lines[ctx_start - 1 : ctx_end])
-
-        contexts.append({
-            'file_path': file_path,
-            'hunk_start': start,
-            'hunk_end': end,
-            'context_start': ctx_start,
-            'context_end': ctx_end,
-            'snippet': snippet,
-        })
+        contexts.append(Snippet(file_path, start, end, ctx_start, ctx_end, source))
 
     return contexts
\ No newline at end of file
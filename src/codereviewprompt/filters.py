@@ -0,0 +1,149 @@
+"""
+Path filtering pushed down into git: include/exclude globs, the
+.codereviewpromptignore file, linguist attributes and a file size limit all
+become pathspecs, so filtered files are never diffed or read.
+"""
+import os
+import subprocess
+from dataclasses import dataclass, field
+
+# Repository-root file of gitignore-style globs to leave out of prompts
+IGNORE_FILE = '.codereviewpromptignore'
+# Excluded when the repository has no ignore file: lockfiles and minified
+# bundles, which GitHub linguist also treats as generated
+DEFAULT_EXCLUDES = (
+    '*.lock',
+    'package-lock.json',
+    'pnpm-lock.yaml',
+    'go.sum',
+    '*.min.js',
+    '*.min.css',
+    '*.js.map',
+)
+# Files with any of these gitattributes set are excluded
+GENERATED_ATTRIBUTES = ('linguist-generated', 'linguist-vendored')
+# Files larger than this on either side of the diff are skipped
+DEFAULT_MAX_FILE_SIZE = 1024 * 1024
+
+
+def glob_pathspecs(pattern: str, exclude: bool = False) -> list[str]:
+    """
+    Translate a gitignore-style glob into pathspecs. Patterns without a slash
+    match at any depth, a leading slash anchors to the repository root, and a
+    pattern naming a directory also matches everything below it.
+    """
+    anchored = pattern.startswith('/')
+    core = pattern.strip('/')
+    if not anchored and '/' not in core:
+        core = '**/' + core
+    magic = 'exclude,glob' if exclude else 'glob'
+    return [f':({magic}){core}', f':({magic}){core}/**']
+
+
+def read_ignore_file(path: str = IGNORE_FILE) -> list[str] | None:
+    """
+    Globs from an ignore file, skipping blank lines and '#' comments, or None
+    if it does not exist. Negated ('!') patterns are not supported and skipped.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+    except FileNotFoundError:
+        return None
+    return [line for line in lines if line and not line.startswith(('#', '!'))]
+
+
+@dataclass
+class PathFilter:
+    """Which changed files to review; see `pathspecs()` and `oversized()`."""
+    include: list[str] = field(default_factory=list)
+    exclude: list[str] = field(default_factory=list)
+    skip_generated: bool = True
+    max_file_size: int | None = DEFAULT_MAX_FILE_SIZE
+
+    @classmethod
+    def from_options(
+        cls,
+        include: tuple[str, ...] = (),
+        exclude: tuple[str, ...] = (),
+        max_file_size: int | None = DEFAULT_MAX_FILE_SIZE,
+    ) -> 'PathFilter':
+        """Combine command line globs with the ignore file, or the default excludes."""
+        ignored = read_ignore_file()
+        defaults = list(DEFAULT_EXCLUDES) if ignored is None else ignored
+        return cls(list(include), defaults + list(exclude), True, max_file_size or None)
+
+    def pathspecs(self) -> list[str]:
+        """Pathspecs for `git diff`; an empty list means the whole tree."""
+        specs = [spec for pattern in self.include for spec in glob_pathspecs(pattern)]
+        specs += [spec for pattern in self.exclude for spec in glob_pathspecs(pattern, True)]
+        if self.skip_generated:
+            specs += [f':(exclude,attr:{attr})' for attr in GENERATED_ATTRIBUTES]
+        if specs and not self.include:
+            # Exclusions apply to the whole tree from the repository root
+            specs.insert(0, ':/')
+        return specs
+
+    def oversized(self, base: str, head: str | None = None, pathspecs: list[str] | None = None) -> list[str]:
+        """
+        Paths whose old or new version exceeds `max_file_size`, found without
+        diffing contents: `git diff --raw` lists blob ids, `git cat-file
+        --batch-check` sizes them, and working tree files are stat'ed.
+        """
+        if self.max_file_size is None:
+            return []
+        args = ['git', 'diff', '--raw', '-z', '--no-abbrev', '--no-renames', base]
+        args += ([head] if head else []) + ['--', *(pathspecs or [])]
+        try:
+            raw = subprocess.run(args, capture_output=True, check=True).stdout
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return []
+        # -z output alternates ":<modes> <old> <new> <status>" and "<path>" fields
+        fields = raw.split(b'\0')
+        entries = []
+        for meta, path in zip(fields[0::2], fields[1::2]):
+            parts = meta.split()
+            if len(parts) >= 4:
+                entries.append((path.decode('utf-8', errors='surrogateescape'), parts[2], parts[3]))
+        blobs = {
+            blob for _, old, new in entries for blob in (old, new) if blob.strip(b'0')
+        }
+        sizes = _blob_sizes(blobs)
+        too_big = []
+        for path, old, new in entries:
+            size = max(sizes.get(old, 0), sizes.get(new, 0))
+            if not head and not new.strip(b'0'):
+                # The new side is the working tree file
+                try:
+                    size = max(size, os.path.getsize(path))
+                except OSError:
+                    pass
+            if size > self.max_file_size:
+                too_big.append(path)
+        return too_big
+
+
+def _blob_sizes(blobs: set[bytes]) -> dict[bytes, int]:
+    """Sizes of blobs by id, from one `git cat-file --batch-check` call."""
+    if not blobs:
+        return {}
+    try:
+        out = subprocess.run(
+            ['git', 'cat-file', '--batch-check'],
+            input=b'\n'.join(blobs) + b'\n',
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+    sizes = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[1] == b'blob':
+            sizes[parts[0]] = int(parts[2])
+    return sizes
+
+
+def exclude_paths(paths: list[str]) -> list[str]:
+    """Pathspecs excluding exactly these paths."""
+    return [f':(exclude,literal){path}' for path in paths]
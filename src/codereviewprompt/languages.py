@@ -0,0 +1,215 @@
+"""
+Grammar registry: maps file extensions to Tree-sitter languages and the node
+types of their functions, classes and methods. Grammars load lazily, the first
+time a file of that language is seen, and each loads at most once per process.
+"""
+import importlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LanguageSpec:
+    """A language's file extensions, definition node types and grammar wheel."""
+    name: str
+    extensions: tuple[str, ...]
+    # Node types of definitions that can enclose a hunk: functions, classes, methods.
+    # An entry may also be a node pattern without its parentheses, e.g. to only
+    # match function values bound to a name.
+    definitions: tuple[str, ...]
+    # Standalone grammar wheel and its entry point, tried before the language pack
+    module: str | None = None
+    entry: str = 'language'
+
+
+# `const name = (...) => {...}` and `const name = function (...) {...}`; the
+# declarator is captured so the range starts at the name. Anonymous callbacks
+# are not definitions, like lambdas in Python.
+_JS_FUNCTION_VALUES = 'variable_declarator value: [(arrow_function) (function_expression)]'
+
+LANGUAGES: tuple[LanguageSpec, ...] = (
+    LanguageSpec('python', ('.py', '.pyi'),
+                 ('function_definition', 'class_definition'),
+                 module='tree_sitter_python'),
+    LanguageSpec('go', ('.go',),
+                 ('function_declaration', 'method_declaration', 'type_declaration'),
+                 module='tree_sitter_go'),
+    LanguageSpec('javascript', ('.js', '.jsx', '.mjs', '.cjs'),
+                 ('function_declaration', 'generator_function_declaration',
+                  'class_declaration', 'method_definition', _JS_FUNCTION_VALUES),
+                 module='tree_sitter_javascript'),
+    LanguageSpec('typescript', ('.ts', '.mts', '.cts'),
+                 ('function_declaration', 'generator_function_declaration',
+                  'class_declaration', 'abstract_class_declaration', 'method_definition',
+                  'interface_declaration', 'enum_declaration', _JS_FUNCTION_VALUES),
+                 module='tree_sitter_typescript', entry='language_typescript'),
+    LanguageSpec('tsx', ('.tsx',),
+                 ('function_declaration', 'generator_function_declaration',
+                  'class_declaration', 'abstract_class_declaration', 'method_definition',
+                  'interface_declaration', 'enum_declaration', _JS_FUNCTION_VALUES),
+                 module='tree_sitter_typescript', entry='language_tsx'),
+    LanguageSpec('rust', ('.rs',),
+                 ('function_item', 'impl_item', 'trait_item', 'struct_item', 'enum_item',
+                  'mod_item'),
+                 module='tree_sitter_rust'),
+    LanguageSpec('java', ('.java',),
+                 ('class_declaration', 'interface_declaration', 'enum_declaration',
+                  'method_declaration', 'constructor_declaration'),
+                 module='tree_sitter_java'),
+    LanguageSpec('c', ('.c', '.h'),
+                 ('function_definition', 'struct_specifier'),
+                 module='tree_sitter_c'),
+    LanguageSpec('cpp', ('.cc', '.cpp', '.cxx', '.hh', '.hpp', '.hxx'),
+                 ('function_definition', 'class_specifier', 'struct_specifier',
+                  'namespace_definition'),
+                 module='tree_sitter_cpp'),
+    LanguageSpec('ruby', ('.rb',),
+                 ('method', 'singleton_method', 'class', 'module'),
+                 module='tree_sitter_ruby'),
+)
+
+_BY_NAME = {spec.name: spec for spec in LANGUAGES}
+_BY_EXTENSION = {ext: spec for spec in LANGUAGES for ext in spec.extensions}
+
+
+def language_for_path(file_path: str) -> LanguageSpec | None:
+    """Return the language spec for a file based on its extension, or None."""
+    _, ext = os.path.splitext(file_path)
+    return _BY_EXTENSION.get(ext.lower())
+
+
+# Process-wide grammar registry: each language is loaded at most once, and parser
+# instances (which are not thread-safe) are cached per thread.
+_languages: dict[str, object] = {}
+_languages_lock = threading.Lock()
+_thread_local = threading.local()
+_queries: dict[str, object] = {}
+
+
+def _load_language(name: str):
+    """Load a Tree-sitter grammar from its own wheel or the language pack, or return None."""
+    try:
+        from tree_sitter import Language
+    except ImportError:
+        return None
+    spec = _BY_NAME.get(name)
+    try:
+        module = importlib.import_module(spec.module if spec and spec.module else f'tree_sitter_{name}')
+        return Language(getattr(module, spec.entry if spec else 'language')())
+    except Exception:
+        pass
+    try:
+        from tree_sitter_language_pack import get_language
+
+        return get_language(name)
+    except Exception:
+        return None
+
+
+def get_language(name: str):
+    """Return the cached Tree-sitter Language for `name`, or None if unavailable."""
+    try:
+        return _languages[name]
+    except KeyError:
+        pass
+    with _languages_lock:
+        if name not in _languages:
+            _languages[name] = _load_language(name)
+        return _languages[name]
+
+
+def get_parser(name: str):
+    """Return this thread's Tree-sitter Parser for `name`, or None if unavailable."""
+    parsers = getattr(_thread_local, 'parsers', None)
+    if parsers is None:
+        parsers = _thread_local.parsers = {}
+    if name not in parsers:
+        language = get_language(name)
+        if language is None:
+            parsers[name] = None
+        else:
+            from tree_sitter import Parser
+
+            try:
+                parsers[name] = Parser(language)
+            except Exception:
+                # e.g. "Incompatible Language version": the grammar was built for
+                # another runtime ABI. Treat the grammar as unavailable everywhere.
+                parsers[name] = None
+                with _languages_lock:
+                    _languages[name] = None
+    return parsers[name]
+
+
+def parser_backend(name: str) -> str:
+    """
+    Return the backend used to parse `name` sources: 'tree-sitter', 'ast' for
+    Python without a grammar, or 'none' when symbols cannot be extracted.
+    """
+    if get_language(name) is not None:
+        return 'tree-sitter'
+    return 'ast' if name == 'python' else 'none'
+
+
+def definitions_query(name: str):
+    """
+    Return the compiled (and cached) query capturing every definition node of
+    language `name`. Node types and patterns the installed grammar version
+    does not know are skipped. Returns None if the grammar or every node type is unavailable.
+    """
+    if name in _queries:
+        return _queries[name]
+    language = get_language(name)
+    spec = _BY_NAME.get(name)
+    query = None
+    if language is not None and spec is not None:
+        from tree_sitter import Query
+
+        def compile_types(types):
+            patterns = ' '.join(f'({node_type})' for node_type in types)
+            return Query(language, f'[{patterns}] @definition')
+
+        try:
+            query = compile_types(spec.definitions)
+        except Exception:
+            valid = []
+            for node_type in spec.definitions:
+                try:
+                    compile_types([node_type])
+                except Exception:
+                    continue
+                valid.append(node_type)
+            query = compile_types(valid) if valid else None
+    with _languages_lock:
+        _queries[name] = query
+    return query
+
+
+# Variable a JavaScript/TypeScript function value is assigned to, as in
+# `const add = (a, b) => ...` or `let f: Handler = async function () {`
+_DECLARATOR_NAME_RE = re.compile(
+    r'\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]*)?=\s*(?:async\b\s*)?'
+    r'(?:function\b|<|\(|[A-Za-z_$][\w$]*\s*=>)'
+)
+# Name after a definition keyword, skipping a Go method receiver and Ruby 'self.'
+_KEYWORD_NAME_RE = re.compile(
+    r'\b(?:def|class|func|function\*?|fn|interface|enum|struct|trait|module|type|impl)'
+    r'\s+(?:\([^)]*\)\s*)?(?:self\.)?([A-Za-z_$][\w$]*)'
+)
+# Otherwise the first identifier called with arguments, as in a method header
+_CALL_NAME_RE = re.compile(r'([A-Za-z_$][\w$]*)\s*\(')
+
+
+def definition_name(line: str) -> str | None:
+    """
+    Best-effort name of the function, class or method whose first line is
+    `line`, for any registered language; None if no name can be found.
+    """
+    m = (
+        _DECLARATOR_NAME_RE.search(line)
+        or _KEYWORD_NAME_RE.search(line)
+        or _CALL_NAME_RE.search(line)
+    )
+    return m.group(1) if m else None
@@ -0,0 +1,117 @@
+"""
+Memory-mapped source files: a compact newline offset index over the mapping
+(vectorized with numpy when it is installed) and zero-copy slicing of line
+ranges, plus a quick check for binary and non-UTF-8 content.
+"""
+import codecs
+import mmap
+import os
+from array import array
+
+# Working tree files at least this large are memory-mapped instead of read, and
+# get line-window context only (they are usually generated: dumps, bundles)
+MMAP_MIN_BYTES = 16 * 1024 * 1024
+# Leading bytes inspected to classify a file as binary or not UTF-8
+SNIFF_BYTES = 64 * 1024
+# Bytes scanned per vectorized step when indexing newlines
+INDEX_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class UnsupportedContentError(ValueError):
+    """Raised for binary or non-UTF-8 files, which are skipped rather than extracted."""
+
+
+def sniff(data) -> str | None:
+    """
+    Return why `data` (bytes or a mapping) cannot be used as source text, or
+    None. Only the first SNIFF_BYTES are inspected: a NUL byte means binary
+    (the heuristic git uses), and invalid UTF-8 means some other encoding.
+    """
+    head = data[:SNIFF_BYTES]
+    if b'\0' in head:
+        return 'binary file'
+    try:
+        # A multi-byte character may be cut at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=len(data) <= SNIFF_BYTES)
+    except UnicodeDecodeError:
+        return 'not UTF-8 text'
+    return None
+
+
+def newline_index(data) -> array:
+    """
+    Byte offset of the start of every line in `data`, plus its total length,
+    as `array('Q')`. Uses numpy in fixed-size chunks when available and a
+    C-level `find` loop otherwise.
+    """
+    offsets = array('Q', [0])
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        view = np.frombuffer(data, dtype=np.uint8)
+        chunk = None
+        for base in range(0, len(view), INDEX_CHUNK_BYTES):
+            chunk = view[base:base + INDEX_CHUNK_BYTES]
+            positions = np.flatnonzero(chunk == 10).astype(np.uint64) + (base + 1)
+            offsets.frombytes(positions.tobytes())
+        # Release the buffer export so the mapping can be closed
+        del view, chunk
+    else:
+        find = data.find
+        pos = find(b'\n')
+        while pos != -1:
+            offsets.append(pos + 1)
+            pos = find(b'\n', pos + 1)
+    if offsets[-1] != len(data):
+        # Last line without a trailing newline
+        offsets.append(len(data))
+    return offsets
+
+
+class MappedBuffer:
+    """
+    A file mapped read-only into memory with its line offset index. Offers the
+    same `lines()` and `size()` interface as `SourceBuffer`, so snippets can be
+    views into it; line text is decoded from the mapping only when sliced.
+    Raises UnsupportedContentError for binary or non-UTF-8 files.
+    """
+
+    __slots__ = ('path', '_map', 'offsets')
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # Empty files cannot be mapped; the mapping outlives the file object
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        reason = sniff(self._map)
+        if reason is not None:
+            self.close()
+            raise UnsupportedContentError(reason)
+        self.offsets = newline_index(self._map)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def view(self, start: int, end: int) -> memoryview:
+        """Zero-copy bytes of lines `start` to `end` (1-based, inclusive)."""
+        if end < start:
+            return memoryview(b'')
+        return memoryview(self._map)[self.offsets[start - 1]:self.offsets[end]]
+
+    def lines(self, start: int, end: int) -> str:
+        """Decoded text of lines `start` to `end`, with '\\r\\n' normalized to '\\n'."""
+        with self.view(start, end) as view:
+            return str(view, 'utf-8', 'replace').replace('\r\n', '\n')
+
+    def size(self, start: int, end: int) -> int:
+        """Byte length of lines `start` to `end`."""
+        if end < start:
+            return 0
+        return self.offsets[end] - self.offsets[start - 1]
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
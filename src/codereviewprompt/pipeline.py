@@ -0,0 +1,115 @@
+"""
+Asyncio pipeline: stream `git diff`, hand each file to context extraction as
+soon as its diff section is complete, and reassemble results in diff order.
+"""
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator
+
+from codereviewprompt.blobs import BlobReader, WorkingTreeReader
+from codereviewprompt.context import extract_one
+from codereviewprompt.diff import DiffParser, DiffResult, FileDiff, diff_command
+from codereviewprompt.records import Snippet
+from codereviewprompt.timings import Timings
+
+if TYPE_CHECKING:
+    from codereviewprompt.cache import SymbolCache
+
+# Bytes read from git per await; lines may span chunks
+READ_CHUNK_BYTES = 1 << 16
+
+Extraction = tuple[str, list[Snippet], Exception | None]
+
+
+async def _lines(stream: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    """Yield lines (with their newline) of any length from `stream`."""
+    parts: list[bytes] = []
+    while chunk := await stream.read(READ_CHUNK_BYTES):
+        cut = chunk.rfind(b'\n')
+        if cut == -1:
+            parts.append(chunk)
+            continue
+        parts.append(chunk[:cut + 1])
+        data = b''.join(parts)
+        parts = [chunk[cut + 1:]]
+        # Iterating a BytesIO splits at b'\n' only, keeping the newline
+        for line in io.BytesIO(data):
+            yield line
+    tail = b''.join(parts)
+    if tail:
+        yield tail
+
+
+async def extract_streaming_async(
+    base: str,
+    context_lines: int,
+    jobs: int | None = None,
+    scope: str = 'innermost',
+    cache: 'SymbolCache | None' = None,
+    reader: BlobReader | WorkingTreeReader | None = None,
+    head: str | None = None,
+    timings: Timings | None = None,
+    paths: list[str] | None = None,
+) -> tuple[DiffResult, list[Extraction]]:
+    """
+    Run `git diff` as an asyncio subprocess and parse its output as it arrives.
+    Each completed file section is submitted to a pool of `jobs` threads
+    (default: CPU count), so file reads and parsing overlap with git and with
+    each other; a semaphore keeps at most `jobs` extractions in flight. Returns
+    the diff and the (file_path, snippets, error) of every file in diff order,
+    or an empty diff if git fails.
+    """
+    parser = DiffParser()
+    jobs = jobs or os.cpu_count() or 1
+    slots = asyncio.Semaphore(jobs)
+    loop = asyncio.get_running_loop()
+    tasks: list[asyncio.Task] = []
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *diff_command(base, 0, head, paths),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return parser.result, []
+
+    async def extract(file_diff: FileDiff) -> Extraction:
+        async with slots:
+            return await loop.run_in_executor(
+                pool, extract_one, file_diff.path, file_diff.hunks, context_lines, scope,
+                cache, None, reader, timings,
+            )
+
+    def submit(file_diff: FileDiff | None) -> None:
+        if file_diff is not None and not file_diff.deleted and file_diff.hunks:
+            tasks.append(asyncio.create_task(extract(file_diff)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        try:
+            async for raw in _lines(proc.stdout):
+                submit(parser.feed(raw))
+            submit(parser.finish())
+            returncode = await proc.wait()
+            parser.record(timings, start)
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            parser.result.close()
+            raise
+    if returncode != 0:
+        parser.result.close()
+        return DiffResult(), []
+    return parser.result, results
+
+
+def extract_streaming(*args, **kwargs) -> tuple[DiffResult, list[Extraction]]:
+    """Synchronous entry point for `extract_streaming_async`."""
+    return asyncio.run(extract_streaming_async(*args, **kwargs))
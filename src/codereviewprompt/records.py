@@ -0,0 +1,185 @@
+"""
+Compact records for large diffs: hunk ranges stored column-wise in arrays, and
+context snippets stored as line views into one shared buffer per file.
+"""
+from array import array
+from collections.abc import Mapping
+from itertools import accumulate
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from codereviewprompt.mapped import MappedBuffer
+
+
+class IntTuples:
+    """
+    A list of fixed-width tuples of non-negative ints, such as (start, end) hunk
+    ranges, stored as one `array('I')` column per field instead of one tuple
+    object per item. Iterates and indexes as tuples and compares equal to any
+    sequence of equal tuples.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, width: int = 2, items: Iterable[tuple[int, ...]] = ()):
+        if width < 1:
+            raise ValueError("width must be at least 1")
+        self.columns = tuple(array('I') for _ in range(width))
+        self.extend(items)
+
+    def append(self, item: tuple[int, ...]) -> None:
+        if len(item) != len(self.columns):
+            raise ValueError(f"expected {len(self.columns)} values, got {len(item)}")
+        for column, value in zip(self.columns, item):
+            column.append(value)
+
+    def extend(self, items: Iterable[tuple[int, ...]]) -> None:
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __iter__(self) -> Iterator[tuple[int, ...]]:
+        return zip(*self.columns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(*(column[index] for column in self.columns)))
+        return tuple(column[index] for column in self.columns)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IntTuples):
+            return self.columns == other.columns
+        try:
+            return len(self) == len(other) and all(a == tuple(b) for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+
+class SourceBuffer:
+    """
+    Decoded text of one file held as a single string, with the character offset
+    of every line start, so snippets can reference line ranges without copying.
+    """
+
+    __slots__ = ('text', 'offsets', 'ascii')
+
+    def __init__(self, lines: list[str]):
+        self.text = ''.join(lines)
+        self.offsets = array('Q', accumulate(map(len, lines), initial=0))
+        # Character offsets double as UTF-8 byte offsets for ASCII text
+        self.ascii = self.text.isascii()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def lines(self, start: int, end: int) -> str:
+        """Text of lines `start` to `end` (1-based, inclusive)."""
+        if end < start:
+            return ''
+        return self.text[self.offsets[start - 1]:self.offsets[end]]
+
+    def size(self, start: int, end: int) -> int:
+        """UTF-8 byte length of lines `start` to `end`."""
+        if end < start:
+            return 0
+        if self.ascii:
+            return self.offsets[end] - self.offsets[start - 1]
+        return len(self.lines(start, end).encode('utf8'))
+
+
+# Keys every snippet has, then keys only present when set
+_REQUIRED_KEYS = ('file_path', 'hunk_start', 'hunk_end', 'context_start', 'context_end', 'snippet')
+_OPTIONAL_KEYS = ('backend', 'hunks')
+
+
+class Snippet(Mapping):
+    """
+    A context snippet: lines `context_start`..`context_end` of a shared
+    `SourceBuffer` or `MappedBuffer`, sliced into text only when `snippet` is
+    read (at render time). Reads like the snippet dicts it replaces: `ctx['snippet']`,
+    `'backend' in ctx` and `dict(ctx)` all work, and it compares equal to a dict
+    with the same keys. `backend` and `hunks` are present only when set.
+    `symbol` is the (start, end) line range of the enclosing definition the
+    snippet was cut from; it is an attribute only, not a key.
+    """
+
+    __slots__ = (
+        'file_path', 'hunk_start', 'hunk_end', 'context_start', 'context_end',
+        'source', 'backend', 'hunks', 'symbol', '_text',
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        hunk_start: int,
+        hunk_end: int,
+        context_start: int,
+        context_end: int,
+        source: 'SourceBuffer | MappedBuffer',
+        backend: str | None = None,
+        hunks: IntTuples | None = None,
+        symbol: tuple[int, int] | None = None,
+    ):
+        self.file_path = file_path
+        self.hunk_start = hunk_start
+        self.hunk_end = hunk_end
+        self.context_start = context_start
+        self.context_end = context_end
+        self.source = source
+        self.backend = backend
+        self.hunks = hunks
+        self.symbol = symbol
+        self._text: str | None = None
+
+    @property
+    def snippet(self) -> str:
+        if self._text is not None:
+            return self._text
+        return self.source.lines(self.context_start, self.context_end)
+
+    def size(self) -> int:
+        """UTF-8 byte length of the snippet text, without slicing it if possible."""
+        if self._text is not None:
+            return len(self._text.encode('utf8'))
+        return self.source.size(self.context_start, self.context_end)
+
+    def replace(self, **changes) -> 'Snippet':
+        """Return a copy with the given keys changed, sharing the same buffer."""
+        copy = Snippet(
+            self.file_path, self.hunk_start, self.hunk_end, self.context_start,
+            self.context_end, self.source, self.backend, self.hunks, self.symbol,
+        )
+        copy._text = self._text
+        for key, value in changes.items():
+            copy[key] = value
+        return copy
+
+    def __getitem__(self, key: str):
+        if key in _REQUIRED_KEYS or (key in _OPTIONAL_KEYS and getattr(self, key) is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key == 'snippet':
+            self._text = value
+        elif key in _REQUIRED_KEYS or key in _OPTIONAL_KEYS:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _REQUIRED_KEYS
+        for key in _OPTIONAL_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return len(_REQUIRED_KEYS) + sum(getattr(self, key) is not None for key in _OPTIONAL_KEYS)
+
+    def __repr__(self) -> str:
+        return f'Snippet({dict(self)!r})'
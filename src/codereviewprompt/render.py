@@ -0,0 +1,113 @@
+"""
+Prompt rendering: writes the review prompt to a text sink section by section.
+"""
+from typing import TextIO
+
+from codereviewprompt.diff import DiffResult, FileDiff
+from codereviewprompt.languages import definition_name
+
+RUBRIC = [
+    '**Critical**: security vulnerabilities, data loss, crashes.',
+    '**Major**: logic errors, performance regressions, incorrect functionality.',
+    '**Minor**: code readability, maintainability, edge cases.',
+    '**Style**: formatting, naming, comments.',
+]
+
+
+def header_lines(ticket: str | None = None) -> list[str]:
+    """Return the title, rubric and optional ticket lines that open every prompt."""
+    lines = ['# Code Review Prompt', '']
+    # Rubric & severity guide
+    lines += ['## Review Rubric & Severity Guide', '']
+    lines += RUBRIC
+    lines.append('')
+    # Optional ticket info
+    if ticket:
+        lines += [f'**Ticket**: {ticket}', '']
+    return lines
+
+
+def snippet_header(ctx: dict) -> str:
+    """Markdown heading for a context snippet, listing its hunks when merged."""
+    header = f"### {ctx['file_path']}:{ctx['context_start']}-{ctx['context_end']}"
+    hunks = ctx.get('hunks') or []
+    if len(hunks) > 1:
+        hunk_list = ', '.join(f'{s}' if s == e else f'{s}-{e}' for s, e in hunks)
+        header += f" (hunks: {hunk_list})"
+    return header
+
+
+def move_lines(files: list[FileDiff]) -> list[str]:
+    """
+    One summary line per renamed or copied file. Moves without edits are only
+    listed here; the diff shows the edits of the others.
+    """
+    lines = []
+    for file_diff in files:
+        if file_diff.old_path is None:
+            continue
+        kind = 'copied' if file_diff.copied else 'renamed'
+        line = f'- `{file_diff.old_path}` → `{file_diff.path}` ({kind}'
+        if file_diff.similarity is not None:
+            line += f', {file_diff.similarity}% similar'
+        lines.append(line + (')' if file_diff.pure_move else '; edits in the diff below)'))
+    return lines
+
+
+def fixed_text(diff_result: DiffResult, ticket: str | None = None) -> str:
+    """Prompt text outside diff sections and snippets, to reserve in a token budget."""
+    lines = header_lines(ticket) + move_lines(diff_result.files)
+    return '\n'.join(lines) + '## Diff\n```diff\n```\n## Context Snippets\n'
+
+
+def write_prompt(
+    out: TextIO,
+    diff_result: DiffResult,
+    contexts: list[dict],
+    ticket: str | None = None,
+    diff_files: list[FileDiff] | None = None,
+    omitted_diff_files: int = 0,
+    related: list[dict] | None = None,
+) -> None:
+    """
+    Write the full prompt to `out` incrementally: header and rubric, a summary
+    of renamed and copied files, the raw diff of each file in `diff_files`
+    (default: all files) copied from the diff spool in chunks, every context
+    snippet, then the `related` definitions of referenced names. Nothing
+    larger than one chunk or one snippet is held in memory by the renderer.
+    """
+    for line in header_lines(ticket):
+        out.write(line + '\n')
+
+    moves = move_lines(diff_result.files)
+    if moves:
+        out.write('## Renamed and Copied Files\n\n')
+        for line in moves:
+            out.write(line + '\n')
+        out.write('\n')
+
+    # Full diff; moves without edits are covered by the summary above
+    out.write('## Diff\n\n```diff\n')
+    for file_diff in diff_result.files if diff_files is None else diff_files:
+        if not file_diff.pure_move:
+            diff_result.write_text(file_diff, out)
+    out.write('```\n')
+    if omitted_diff_files:
+        out.write(f'_{omitted_diff_files} file diffs omitted to fit the token budget._\n')
+    out.write('\n')
+
+    # Contextual snippets grouped by file
+    out.write('## Context Snippets\n\n')
+    for ctx in contexts:
+        out.write(snippet_header(ctx) + '\n```\n')
+        out.write(ctx['snippet'].rstrip('\n'))
+        out.write('\n```\n\n')
+
+    if related:
+        out.write('## Referenced Definitions\n\n')
+        for ctx in related:
+            name = definition_name(ctx['snippet'].split('\n', 1)[0])
+            header = f"### {ctx['file_path']}:{ctx['context_start']}-{ctx['context_end']}"
+            out.write(header + (f' (`{name}`)' if name else '') + '\n```\n')
+            out.write(ctx['snippet'].rstrip('\n'))
+            out.write('\n```\n\n')
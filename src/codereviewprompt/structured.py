@@ -0,0 +1,113 @@
+"""
+Machine-readable prompt output: one JSON record per changed file with its
+hunks, enclosing symbol names, context ranges, snippet text and estimated
+token counts, written as one JSON document or streamed as JSON Lines.
+"""
+import json
+from typing import Callable, Iterable, Iterator, TextIO
+
+from codereviewprompt.context import coalesce_contexts
+from codereviewprompt.diff import DiffResult, FileDiff
+from codereviewprompt.languages import definition_name
+from codereviewprompt.records import Snippet
+from codereviewprompt.render import RUBRIC
+
+Extraction = tuple[str, list[Snippet], Exception | None]
+
+
+def _symbol_name(ctx) -> str | None:
+    """Name of the definition a symbol snippet was cut from, read from its first line."""
+    symbol = getattr(ctx, 'symbol', None)
+    if symbol is None:
+        return None
+    return definition_name(ctx.source.lines(symbol[0], symbol[0]))
+
+
+def file_record(
+    diff_result: DiffResult,
+    file_diff: FileDiff,
+    snippets: list[Snippet],
+    error: Exception | None,
+    count_tokens: Callable[[str], int],
+) -> dict:
+    """
+    The JSON record of one file. Line ranges are 1-based and inclusive; `tokens`
+    estimates the diff text plus every context snippet of the file.
+    """
+    names = {(ctx['hunk_start'], ctx['hunk_end']): _symbol_name(ctx) for ctx in snippets}
+    hunks = [
+        {'start': start, 'end': end, 'symbol': names.get((start, end))}
+        for start, end in file_diff.hunks
+    ]
+    contexts = []
+    for ctx in coalesce_contexts(snippets)[0]:
+        text = ctx['snippet']
+        contexts.append({
+            'start': ctx['context_start'],
+            'end': ctx['context_end'],
+            'hunks': [list(hunk) for hunk in ctx['hunks']],
+            'backend': ctx.get('backend'),
+            'text': text,
+            'tokens': count_tokens(text),
+        })
+    diff_text = diff_result.text(file_diff)
+    diff_tokens = count_tokens(diff_text)
+    return {
+        'path': file_diff.path,
+        'old_path': file_diff.old_path,
+        'copied': file_diff.copied,
+        'deleted': file_diff.deleted,
+        'hunks': hunks,
+        'symbols': list(dict.fromkeys(h['symbol'] for h in hunks if h['symbol'])),
+        'contexts': contexts,
+        'diff': diff_text,
+        'diff_tokens': diff_tokens,
+        'tokens': diff_tokens + sum(c['tokens'] for c in contexts),
+        'error': str(error) if error is not None else None,
+    }
+
+
+def file_records(
+    diff_result: DiffResult,
+    results: Iterable[Extraction],
+    count_tokens: Callable[[str], int],
+) -> Iterator[dict]:
+    """
+    Records for every file of the diff, in diff order, built as soon as each
+    extraction result arrives. `results` are (file_path, snippets, error) in
+    diff order for the files that were extracted; the other files (deleted,
+    moved without edits) get records without contexts.
+    """
+    files = iter(diff_result.files)
+    for path, snippets, error in results:
+        for file_diff in files:
+            if file_diff.path == path and not file_diff.deleted:
+                yield file_record(diff_result, file_diff, snippets, error, count_tokens)
+                break
+            yield file_record(diff_result, file_diff, [], None, count_tokens)
+    for file_diff in files:
+        yield file_record(diff_result, file_diff, [], None, count_tokens)
+
+
+def write_jsonl(out: TextIO, records: Iterable[dict]) -> int:
+    """Write one record per line, flushing each so consumers can start early."""
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        count += 1
+    return count
+
+
+def write_json(out: TextIO, records: Iterable[dict], ticket: str | None = None) -> int:
+    """Write one JSON document holding the rubric, the ticket and every file record."""
+    files = list(records)
+    document = {
+        'ticket': ticket,
+        'rubric': RUBRIC,
+        'files': files,
+        'tokens': sum(record['tokens'] for record in files),
+    }
+    json.dump(document, out, ensure_ascii=False, indent=2)
+    out.write('\n')
+    return len(files)
@@ -0,0 +1,129 @@
+"""
+Per-stage wall time, byte and count recording for `run --timings`, reported as
+a table, as JSON or in Chrome trace event format.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Event:
+    """One timed occurrence of a stage; `args` holds its bytes, counts and labels."""
+    name: str
+    start: float
+    thread: int
+    duration: float = 0.0
+    args: dict = field(default_factory=dict)
+
+
+class Timings:
+    """
+    Thread-safe recorder of stage events. Integer args (such as `bytes` or
+    `hunks`) are summed per stage in the summary; string args (such as the parse
+    `backend`) are tallied by value.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: list[Event] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, **args):
+        """Time the enclosed block as `name`; the yielded dict may be updated with args."""
+        event = Event(name, time.perf_counter(), threading.get_ident(), args=args)
+        try:
+            yield event.args
+        finally:
+            event.duration = time.perf_counter() - event.start
+            with self._lock:
+                self.events.append(event)
+
+    def add(self, name: str, start: float, duration: float, **args) -> None:
+        """Record a stage whose time was measured by the caller."""
+        event = Event(name, start, threading.get_ident(), duration, args)
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> list[dict]:
+        """Aggregate events by stage name, in the order stages first occurred."""
+        stages: dict[str, dict] = {}
+        for event in sorted(self.events, key=lambda e: e.start):
+            row = stages.setdefault(
+                event.name, {'stage': event.name, 'calls': 0, 'seconds': 0.0, 'max': 0.0}
+            )
+            row['calls'] += 1
+            row['seconds'] += event.duration
+            row['max'] = max(row['max'], event.duration)
+            for key, value in event.args.items():
+                if isinstance(value, bool) or not isinstance(value, (int, str)):
+                    continue
+                if isinstance(value, int):
+                    row[key] = row.get(key, 0) + value
+                else:
+                    tally = row.setdefault(key, {})
+                    tally[value] = tally.get(value, 0) + 1
+        return list(stages.values())
+
+    def format_table(self) -> str:
+        """Human readable per-stage table; per-file stages sum time across threads."""
+        rows = [f"{'stage':<16} {'calls':>6} {'total (ms)':>11} {'max (ms)':>9} {'bytes':>11}  details"]
+        for row in self.summary():
+            details = []
+            for key, value in row.items():
+                if key in ('stage', 'calls', 'seconds', 'max', 'bytes'):
+                    continue
+                if isinstance(value, dict):
+                    value = ', '.join(f'{k}={n}' for k, n in value.items())
+                details.append(f'{key}: {value}')
+            size = row.get('bytes')
+            rows.append(
+                f"{row['stage']:<16} {row['calls']:>6} {row['seconds'] * 1000:>11.1f} "
+                f"{row['max'] * 1000:>9.1f} {'' if size is None else size:>11}  {'; '.join(details)}"
+            )
+        return '\n'.join(rows)
+
+    def to_json(self) -> dict:
+        """Summary plus every raw event, with times in seconds from the start of the run."""
+        return {
+            'stages': self.summary(),
+            'events': [
+                {
+                    'name': e.name,
+                    'start': e.start - self.origin,
+                    'duration': e.duration,
+                    'thread': e.thread,
+                    'args': e.args,
+                }
+                for e in sorted(self.events, key=lambda e: e.start)
+            ],
+        }
+
+    def to_chrome_trace(self) -> dict:
+        """Complete ('X') events for chrome://tracing or Perfetto, in microseconds."""
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {
+                    'name': e.name,
+                    'ph': 'X',
+                    'ts': (e.start - self.origin) * 1e6,
+                    'dur': e.duration * 1e6,
+                    'pid': pid,
+                    'tid': e.thread,
+                    'args': e.args,
+                }
+                for e in sorted(self.events, key=lambda e: e.start)
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+
+def stage(timings: Timings | None, name: str, **args):
+    """`timings.stage(name, **args)`, or a no-op context when timings are off."""
+    if timings is None:
+        return nullcontext(args)
+    return timings.stage(name, **args)
@@ -0,0 +1,205 @@
+"""
+Watch mode: keep the diff and extracted context of every changed file in
+memory, and recompute only the files whose contents change between polls.
+"""
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from codereviewprompt.context import extract_all
+from codereviewprompt.diff import DiffResult, FileDiff, read_diff
+from codereviewprompt.filters import PathFilter
+from codereviewprompt.records import Snippet
+
+if TYPE_CHECKING:
+    from codereviewprompt.cache import SymbolCache
+
+
+@dataclass
+class WatchedFile:
+    """
+    Diff section and context snippets of one changed file, as of `stamp`;
+    `old_path` is the source of a rename or copy.
+    """
+    stamp: tuple[int, int] | None
+    old_path: str | None = None
+    file_diff: FileDiff | None = None
+    raw: bytes = b''
+    contexts: list[Snippet] = field(default_factory=list)
+    error: Exception | None = None
+
+
+def _stamp(path: str) -> tuple[int, int] | None:
+    """(mtime in ns, size) of a working tree file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _name_status(out: str) -> dict[str, str | None]:
+    """
+    Map each path of `git diff --name-status -z` output to the source path of
+    its rename or copy, or None.
+    """
+    fields = out.split('\0')
+    paths: dict[str, str | None] = {}
+    i = 0
+    while i + 1 < len(fields):
+        status = fields[i]
+        if status[:1] in ('R', 'C') and i + 2 < len(fields):
+            paths[fields[i + 2]] = fields[i + 1]
+            i += 3
+        else:
+            paths[fields[i + 1]] = None
+            i += 2
+    return paths
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(
+            ['git', *args], capture_output=True, text=True, check=True
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+class Watcher:
+    """
+    Tracks the working tree diff against `base`. Each `poll()` asks git for the
+    names of changed files (a cheap, stat-based check) and stats them; only
+    files that are new to the diff, whose mtime or size changed, or that became
+    or stopped being a rename or copy are diffed and extracted again,
+    reparsing them incrementally from the kept base revision trees. Everything
+    else is served from memory. Recomputing every file happens only when
+    `base` resolves to a different commit.
+    `pathspecs` restrict the watched files, and files larger than
+    `max_file_size` on either side of the diff are left out, as in `run`.
+    """
+
+    def __init__(
+        self,
+        base: str,
+        context_lines: int,
+        scope: str = 'innermost',
+        cache: 'SymbolCache | None' = None,
+        jobs: int | None = None,
+        pathspecs: list[str] | None = None,
+        max_file_size: int | None = None,
+    ):
+        self.base = base
+        self.context_lines = context_lines
+        self.scope = scope
+        self.cache = cache
+        self.jobs = jobs
+        self.pathspecs = pathspecs or []
+        self.max_file_size = max_file_size
+        self.files: dict[str, WatchedFile] = {}
+        self._base_commit: str | None = None
+        # Stamps of files left out for their size, so they are not re-sized every poll
+        self._oversized: dict[str, tuple[int, int] | None] = {}
+
+    def poll(self) -> list[str] | None:
+        """
+        Bring the in-memory state up to date. Returns the paths that were
+        recomputed or dropped (empty if nothing changed), or None if `base`
+        cannot be diffed.
+        """
+        base_commit = _git('rev-parse', '--verify', '--quiet', f'{self.base}^{{commit}}')
+        # Same rename and copy detection as `read_diff`, so a moved file is
+        # diffed together with its source instead of as a new file
+        names = _git(
+            'diff', '--name-status', '-z', '--find-renames', '--find-copies', self.base,
+            '--', *self.pathspecs,
+        )
+        if base_commit is None or names is None:
+            return None
+        if base_commit != self._base_commit:
+            self._base_commit = base_commit
+            self.files.clear()
+            self._oversized.clear()
+        sources = _name_status(names)
+        self._oversized = {p: s for p, s in self._oversized.items() if p in sources}
+        stamps = {}
+        for path in sources:
+            stamp = _stamp(path)
+            # Files left out for their size stay out until they change
+            if path not in self._oversized or self._oversized[path] != stamp:
+                stamps[path] = stamp
+        changed = [
+            path for path in stamps
+            if path not in self.files or self.files[path].stamp != stamps[path]
+            or self.files[path].old_path != sources[path]
+        ]
+        for path in changed:
+            self._oversized.pop(path, None)
+        for path in self._skip_oversized(changed):
+            self._oversized[path] = stamps.pop(path)
+            changed.remove(path)
+        dropped = [path for path in self.files if path not in stamps]
+        for path in dropped:
+            del self.files[path]
+        if changed:
+            self._recompute(changed, stamps, sources)
+        return changed + dropped
+
+    def _skip_oversized(self, paths: list[str]) -> list[str]:
+        """Those of `paths` over `max_file_size` in the base blob or the working tree."""
+        if self.max_file_size is None or not paths:
+            return []
+        path_filter = PathFilter(skip_generated=False, max_file_size=self.max_file_size)
+        return path_filter.oversized(self.base, None, [f':(literal){path}' for path in paths])
+
+    def _recompute(
+        self,
+        paths: list[str],
+        stamps: dict[str, tuple[int, int] | None],
+        sources: dict[str, str | None],
+    ) -> None:
+        """
+        Diff and extract only `paths`, replacing their in-memory state. The
+        sources of renames and copies are diffed along with them so git pairs
+        them up again.
+        """
+        for path in paths:
+            self.files[path] = WatchedFile(stamps[path], sources[path])
+        olds = [sources[path] for path in paths if sources[path] is not None]
+        # Literal pathspecs, so names like 'pages/[id].tsx' are not globs
+        literal = [f':(literal){path}' for path in dict.fromkeys(paths + olds)]
+        wanted = set(paths)
+        with read_diff(self.base, unified=0, paths=literal) as diff_result:
+            # A modified copy source is only diffed for pairing; it is kept
+            # up to date as a path of its own
+            file_diffs = [f for f in diff_result.files if f.path in wanted]
+            for file_diff in file_diffs:
+                self.files[file_diff.path].file_diff = file_diff
+                self.files[file_diff.path].raw = diff_result.raw(file_diff)
+            # Base trees stay cached across polls, so each edit is reparsed
+            # incrementally instead of from scratch
+            bases = {f.path: f for f in file_diffs if not f.deleted}
+            hunks = {path: h for path, h in diff_result.hunks.items() if path in wanted}
+            results = extract_all(
+                hunks, self.context_lines, self.jobs, self.scope, self.cache, bases
+            )
+            for path, snippets, error in results:
+                self.files[path].contexts = snippets
+                self.files[path].error = error
+
+    def diff_result(self) -> DiffResult:
+        """The whole diff, assembled from the kept file sections in path order."""
+        return DiffResult.from_sections(
+            (self.files[path].file_diff, self.files[path].raw)
+            for path in sorted(self.files)
+            if self.files[path].file_diff is not None
+        )
+
+    def contexts(self) -> list[Snippet]:
+        """Context snippets of every changed file, in path order."""
+        return [ctx for path in sorted(self.files) for ctx in self.files[path].contexts]
+
+    def errors(self) -> dict[str, Exception]:
+        """Extraction errors by path, for files that had to be skipped."""
+        return {path: f.error for path, f in self.files.items() if f.error is not None}
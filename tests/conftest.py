@@ -0,0 +1,24 @@
+import subprocess
+
+import pytest
+
+
+def git(*args):
+    """Run a git command in the current directory, failing the test if it fails."""
+    subprocess.run(['git', *args], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def commit(message='base'):
+    """Stage every file and commit it."""
+    git('add', '-A')
+    git('commit', '-q', '-m', message)
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """An empty repository with a committer identity, as the working directory."""
+    monkeypatch.chdir(tmp_path)
+    git('init', '-q')
+    git('config', 'user.email', 'test@example.com')
+    git('config', 'user.name', 'Test User')
+    return tmp_path
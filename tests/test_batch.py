@@ -0,0 +1,90 @@
+import pytest
+from click.testing import CliRunner
+from conftest import commit, git
+
+from codereviewprompt.batch import BatchRunner, Range, parse_ranges
+from codereviewprompt.blobs import BlobReader
+from codereviewprompt.cli import cli
+
+
+@pytest.fixture
+def repo(git_repo):
+    git('checkout', '-q', '-b', 'trunk')
+    (git_repo / 'mod.py').write_text('def foo():\n    return 1\n\n\ndef bar():\n    return 1\n')
+    commit()
+    for branch, func in (('feature/foo', 'foo'), ('feature/bar', 'bar')):
+        git('checkout', '-q', '-b', branch, 'trunk')
+        text = (git_repo / 'mod.py').read_text()
+        (git_repo / 'mod.py').write_text(text.replace(f'{func}():\n    return 1', f'{func}():\n    return 2'))
+        commit(func)
+    git('checkout', '-q', 'trunk')
+    return git_repo
+
+
+def test_parse_ranges():
+    lines = ['# open PRs\n', 'main..feature/x\n', '\n', 'main...topic pr-7  # merge base\n', '..HEAD\n']
+    assert parse_ranges(lines) == [
+        Range('main', 'feature/x', False, 'main..feature_x'),
+        Range('main', 'topic', True, 'pr-7'),
+        Range('HEAD', 'HEAD', False, '..HEAD'),
+    ]
+    for bad in ('main', 'a..b..c', 'a..b name extra', 'a..b ../../../tmp/evil', 'a..b dir\\name'):
+        with pytest.raises(ValueError, match='line 1'):
+            parse_ranges([bad])
+    assert parse_ranges(['a..b pr:7?']) == [Range('a', 'b', False, 'pr_7_')]
+    with pytest.raises(ValueError, match='line 2: name pr-7 is already used on line 1'):
+        parse_ranges(['a..b pr-7', 'c..d pr-7'])
+
+
+def test_revision_readers_share_one_process(repo):
+    with BlobReader() as objects:
+        assert objects.at('feature/foo').read('mod.py').startswith(b'def foo():\n    return 2')
+        assert objects.at('trunk').read('mod.py').startswith(b'def foo():\n    return 1')
+        assert objects.at('trunk').read('missing.py') is None
+
+
+def test_batch_runner_writes_one_prompt_per_range(repo, tmp_path):
+    ranges = parse_ranges(['trunk..feature/foo', 'feature/foo...feature/bar bar', 'trunk..trunk', 'trunk..nope'])
+    with BatchRunner(str(tmp_path / 'out'), context_lines=0, jobs=2) as runner:
+        results = list(runner.run(ranges))
+    assert [r.range for r in results] == ranges
+    foo, bar, empty, missing = results
+    assert foo.files == 1 and foo.path.endswith('trunk..feature_foo.md')
+    prompt = open(foo.path).read()
+    assert '+    return 2' in prompt and 'def foo' in prompt
+    # Diffed against the merge base, so only bar's change shows up
+    prompt = open(bar.path).read()
+    assert bar.path.endswith('bar.md')
+    assert 'def bar():\n    return 2' in prompt and 'def foo():\n    return 2' not in prompt
+    assert empty.path is None and empty.error is None
+    assert missing.error == 'unknown revision: nope'
+
+
+def test_batch_command_reads_stdin(repo):
+    result = CliRunner().invoke(
+        cli, ['batch', '--out-dir', 'prompts', '--no-cache', '--context-lines', '0'],
+        input='trunk..feature/foo foo\ntrunk..feature/bar bar\n',
+    )
+    assert result.exit_code == 0, result.output
+    assert 'Prompt for trunk..feature/foo (1 files) written to prompts/foo.md' in result.output
+    assert 'Processed 2 ranges' in result.output
+    assert (repo / 'prompts' / 'bar.md').exists()
+
+    result = CliRunner().invoke(cli, ['batch', '--no-cache'], input='trunk..nope\n')
+    assert result.exit_code == 1
+    assert '1 of 1 ranges failed' in result.output
+
+
+def test_batch_reports_files_it_could_not_extract(repo):
+    git('checkout', '-q', '-b', 'latin1', 'trunk')
+    (repo / 'legacy.py').write_bytes(b'name = "caf\xe9"\n')
+    commit('latin-1')
+    git('checkout', '-q', 'trunk')
+    with BatchRunner(str(repo / 'out'), context_lines=0, jobs=1) as runner:
+        result, = runner.run(parse_ranges(['trunk..latin1']))
+    assert result.error is None and result.files == 1
+    assert list(result.skipped) == ['legacy.py']
+
+    result = CliRunner().invoke(cli, ['batch', '--no-cache'], input='trunk..latin1\n')
+    assert result.exit_code == 0, result.output
+    assert 'Skipping legacy.py in trunk..latin1: ' in result.output
@@ -0,0 +1,24 @@
+import json
+
+from click.testing import CliRunner
+
+from codereviewprompt.bench import STAGES, Scenario, bench_scenario, format_report
+from codereviewprompt.cli import cli
+
+
+def test_bench_scenario_times_every_stage():
+    scenario = Scenario('tiny', files=2, functions=10, hunk_density=0.5, depth=2)
+    results = bench_scenario(scenario, repeat=1)
+    assert [r['stage'] for r in results] == list(STAGES)
+    assert all(r['min'] > 0 and r['scenario'] == 'tiny' for r in results)
+
+
+def test_bench_command_writes_comparable_json(tmp_path):
+    output = tmp_path / 'results.json'
+    runner = CliRunner()
+    result = runner.invoke(cli, ['bench', '-s', 'small', '--repeat', '1', '-o', str(output)])
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert report['meta']['scenarios']['small']['files'] == 10
+    assert len(report['results']) == len(STAGES)
+    assert 'speedup' in format_report(report, report)
@@ -0,0 +1,54 @@
+import pytest
+from click.testing import CliRunner
+from conftest import commit, git
+
+from codereviewprompt.blobs import BlobReader, WorkingTreeReader
+from codereviewprompt.cli import cli
+
+
+@pytest.fixture
+def repo(git_repo):
+    (git_repo / 'mod.py').write_text('def foo():\n    return 1\n')
+    commit('one')
+    git('tag', 'v1')
+    (git_repo / 'mod.py').write_text('def foo():\n    return 2\n')
+    commit('two')
+    return git_repo
+
+
+def test_blob_reader_reads_paths_at_revisions(repo):
+    with BlobReader(rev='v1') as reader:
+        assert reader.read('mod.py') == b'def foo():\n    return 1\n'
+        assert reader.read_object('HEAD:mod.py') == b'def foo():\n    return 2\n'
+        assert reader.read('missing.py') is None
+        # Directories are not blobs
+        assert reader.read_object('HEAD:') is None
+        # Served from the LRU on the second read
+        assert reader.read('mod.py') == b'def foo():\n    return 1\n'
+        assert 'v1:mod.py' in reader._cache
+
+
+def test_blob_reader_lru_is_bounded(repo):
+    with BlobReader(cache_bytes=30) as reader:
+        reader.read_object('v1:mod.py')
+        reader.read_object('HEAD:mod.py')
+        assert list(reader._cache) == ['HEAD:mod.py']
+        assert reader._cached_bytes <= 30
+
+
+def test_working_tree_reader(repo):
+    assert WorkingTreeReader().read('mod.py') == b'def foo():\n    return 2\n'
+    assert WorkingTreeReader().read('nope.py') is None
+
+
+def test_run_with_head_ignores_working_tree(repo):
+    # Working tree edits must not leak into a review of committed revisions
+    (repo / 'mod.py').write_text('def foo():\n    return 3\n')
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ['run', '--base', 'v1', '--head', 'HEAD', '--context-lines', '0', '--out', 'stdout']
+    )
+    assert result.exit_code == 0
+    assert '+    return 2' in result.output
+    assert 'return 3' not in result.output
+    assert '### mod.py:1-2' in result.output
@@ -0,0 +1,87 @@
+import pytest
+from click.testing import CliRunner
+from conftest import commit
+
+from codereviewprompt.budget import estimate_tokens, get_tokenizer, pack
+from codereviewprompt.cli import cli
+from codereviewprompt.diff import DiffResult, FileDiff
+
+
+def make_context(path, start, lines, hunk, symbol=True):
+    ctx = {
+        'file_path': path,
+        'hunk_start': hunk,
+        'hunk_end': hunk,
+        'context_start': start,
+        'context_end': start + len(lines) - 1,
+        'snippet': ''.join(lines),
+    }
+    if symbol:
+        ctx['backend'] = 'tree-sitter'
+    return ctx
+
+
+def test_estimate_tokens_is_byte_based():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('abcd') == 1
+    assert estimate_tokens('abcde') == 2
+    assert get_tokenizer('bytes') is estimate_tokens
+    with pytest.raises(ValueError):
+        get_tokenizer('nope')
+
+
+def test_pack_keeps_everything_within_budget():
+    contexts = [make_context('a.py', 1, ['x = 1\n'] * 4, 2)]
+    result = pack(DiffResult(), contexts, max_tokens=1000)
+    assert result.contexts == contexts
+    assert result.trimmed == result.dropped == 0
+
+
+def test_pack_prioritizes_diff_then_symbols_then_windows():
+    diff = DiffResult()
+    diff.files = [FileDiff('a.py', length=400), FileDiff('big.py', length=4000)]
+    lines = [f'line {i:04d}\n' for i in range(40)]  # 10 bytes, 3 tokens per line
+    window = make_context('w.py', 1, lines, 20, symbol=False)
+    symbol = make_context('s.py', 1, lines, 20)
+
+    # 106 tokens for the whole symbol snippet leave too little for any window line
+    result = pack(diff, [window, symbol], max_tokens=100 + 110)
+
+    # The oversized diff file is omitted, the small one kept
+    assert [f.path for f in result.diff_files] == ['a.py']
+    assert result.omitted_diff_files == 1
+    assert result.diff_tokens == 100
+    # The symbol snippet claimed the budget first; the window had to give way
+    assert [c['file_path'] for c in result.contexts] == ['s.py']
+    assert result.contexts[0]['snippet'] == ''.join(lines)
+    assert result.dropped == 1
+    assert result.tokens <= 210
+
+
+def test_pack_trims_context_around_hunks():
+    lines = [f'line {i:04d}\n' for i in range(1, 101)]
+    ctx = make_context('a.py', 1, lines, 50)
+    result = pack(DiffResult(), [ctx], max_tokens=40)
+    assert result.trimmed == 1
+    trimmed = result.contexts[0]
+    assert trimmed['context_start'] <= 50 <= trimmed['context_end']
+    assert 'line 0050\n' in trimmed['snippet']
+    assert trimmed['context_end'] - trimmed['context_start'] < 20
+    assert trimmed['snippet'] == ''.join(lines[trimmed['context_start'] - 1:trimmed['context_end']])
+    assert result.tokens <= 40
+
+
+def test_run_max_tokens_reports_summary(git_repo):
+    path = git_repo / 'foo.txt'
+    path.write_text(''.join(f'line {i}\n' for i in range(200)))
+    commit('init')
+    path.write_text(''.join(f'line {i}\n' if i != 100 else 'changed\n' for i in range(200)))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ['run', '--base', 'HEAD', '--out', 'stdout', '--max-tokens', '300']
+    )
+    assert result.exit_code == 0
+    assert 'Token budget 300' in result.output
+    assert '+changed' in result.output
+    assert '1 snippets trimmed' in result.output
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from codereviewprompt.cache import SymbolCache, blob_sha
+from codereviewprompt.cli import cli
+from codereviewprompt.context import extract_by_symbol
+
+
+def test_blob_sha_matches_git(tmp_path):
+    path = tmp_path / 'x.py'
+    path.write_bytes(b'print("hi")\n')
+    expected = subprocess.check_output(['git', 'hash-object', str(path)], text=True).strip()
+    assert blob_sha(path.read_bytes()) == expected
+
+
+def test_cache_roundtrip_and_stats(tmp_path):
+    db = str(tmp_path / 'cache' / 'symbols.sqlite')
+    with SymbolCache(db) as cache:
+        assert cache.get('abc', 'python') is None
+        cache.put('abc', 'python', [(1, 3), (5, 10)])
+        assert cache.get('abc', 'python') == [(1, 3), (5, 10)]
+        assert cache.get('abc', 'go') is None
+    # Entries persist across instances
+    with SymbolCache(db) as cache:
+        assert cache.get('abc', 'python') == [(1, 3), (5, 10)]
+        stats = cache.stats()
+        assert stats['entries'] == 1
+        assert stats['bytes'] == 16
+        assert stats['hits'] == 1
+        assert cache.clear() == 1
+        assert cache.get('abc', 'python') is None
+
+
+
+def test_cache_writes_do_not_block_other_processes(tmp_path):
+    db = str(tmp_path / 'symbols.sqlite')
+    with SymbolCache(db) as first, SymbolCache(db) as second:
+        first.put('a', 'python', [(1, 2)])
+        # Committed on store: visible and writable elsewhere while `first` is open
+        assert second.get('a', 'python') == [(1, 2)]
+        start = time.perf_counter()
+        second.put('b', 'python', [(3, 4)])
+        assert time.perf_counter() - start < 1
+        assert first.get('b', 'python') == [(3, 4)]
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    # Each entry is one range: 8 bytes. The budget fits two entries.
+    with SymbolCache(str(tmp_path / 'c.sqlite'), max_bytes=20) as cache:
+        cache.put('a', 'python', [(1, 2)])
+        cache.put('b', 'python', [(1, 2)])
+        cache.close()
+    with SymbolCache(str(tmp_path / 'c.sqlite'), max_bytes=20) as cache:
+        # Touch 'a' so that 'b' becomes the least recently used entry
+        assert cache.get('a', 'python') is not None
+        cache.close()
+    with SymbolCache(str(tmp_path / 'c.sqlite'), max_bytes=20) as cache:
+        cache.put('c', 'python', [(1, 2)])
+        assert cache.get('b', 'python') is None
+        assert cache.get('a', 'python') is not None
+        assert cache.get('c', 'python') is not None
+
+
+def test_extract_by_symbol_warm_cache_skips_parsing(tmp_path, monkeypatch):
+    import codereviewprompt.context as context
+
+    path = tmp_path / 'mod.py'
+    path.write_text('def foo():\n    return 1\n')
+    with SymbolCache(str(tmp_path / 'c.sqlite')) as cache:
+        cold = extract_by_symbol(str(path), [(2, 2)], 0, cache=cache)
+
+        def fail(*args):
+            raise AssertionError('parsed despite warm cache')
+
+        monkeypatch.setattr(context, 'parse_symbol_ranges', fail)
+        warm = extract_by_symbol(str(path), [(2, 2)], 0, cache=cache)
+    assert warm[0]['snippet'] == cold[0]['snippet']
+    assert warm[0]['context_start'] == 1
+    assert cold[0]['backend'] != 'cache'
+    assert warm[0]['backend'] == 'cache'
+
+
+def test_cache_of_another_version_is_dropped(tmp_path):
+    import sqlite3
+
+    db = str(tmp_path / 'symbols.sqlite')
+    with SymbolCache(db) as cache:
+        cache.put('abc', 'python', [(1, 3)])
+    conn = sqlite3.connect(db)
+    conn.execute('PRAGMA user_version = 1')
+    conn.close()
+    with SymbolCache(db) as cache:
+        assert cache.get('abc', 'python') is None
+        cache.put('abc', 'python', [(1, 3)])
+    with SymbolCache(db) as cache:
+        assert cache.get('abc', 'python') == [(1, 3)]
+
+
+def test_fallback_ranges_are_not_cached(tmp_path, monkeypatch):
+    import codereviewprompt.context as context
+
+    if context.parser_backend('python') != 'tree-sitter':
+        pytest.skip('needs the Tree-sitter Python grammar')
+
+    def fail(*args):
+        raise RuntimeError('tree-sitter failed')
+
+    monkeypatch.setattr(context, '_tree_sitter_ranges', fail)
+    path = tmp_path / 'mod.py'
+    path.write_text('def foo():\n    return 1\n')
+    with SymbolCache(str(tmp_path / 'c.sqlite')) as cache:
+        contexts = extract_by_symbol(str(path), [(2, 2)], 0, cache=cache)
+        assert contexts[0]['backend'] == 'ast'
+        assert cache.get(blob_sha(path.read_bytes()), 'python') is None
+
+
+def test_cache_cli_stats_and_clear(git_repo):
+    with SymbolCache.open_default() as cache:
+        cache.put('abc', 'python', [(1, 2)])
+    assert os.path.isfile(git_repo / '.git' / 'codereviewprompt' / 'symbols.sqlite')
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ['cache', 'stats'])
+    assert result.exit_code == 0
+    assert 'Entries: 1' in result.output
+    result = runner.invoke(cli, ['cache', 'clear'])
+    assert result.exit_code == 0
+    assert 'Removed 1 cached entries.' in result.output
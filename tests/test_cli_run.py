@@ -71,4 +71,73 @@ def test_run_no_changes(tmp_path):
     # In an empty or no-commit repo
     result = runner.invoke(cli, ['run', '--base', 'HEAD'])
     assert result.exit_code == 0
-    assert 'No changes detected' in result.output
\ No newline at end of file
+    assert 'No changes detected' in result.output
+
+
+def test_run_merges_overlapping_context(tmp_path):
+    repo = init_repo_with_change(tmp_path)
+    (repo / "foo.txt").write_text("a\nx\nb\ny\nc\n")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ['run', '--base', 'HEAD', '--context-lines', '1', '--out', 'stdout'],
+    )
+    assert result.exit_code == 0
+    # Both insertions share one snippet instead of repeating 'b'
+    assert 'foo.txt:1-5 (hunks: 2, 4)' in result.output
+    assert result.output.count('### foo.txt') == 1
+
+def test_run_timings_and_profile(tmp_path):
+    import json
+    import pstats
+
+    repo = init_repo_with_change(tmp_path)
+    timings_file = tmp_path / 'timings.json'
+    profile = tmp_path / 'run.prof'
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ['run', '--base', 'HEAD', '--out', str(tmp_path / 'prompt.md'), '--timings', 'json',
+         '--timings-file', str(timings_file), '--profile', str(profile)],
+    )
+    assert result.exit_code == 0, result.output
+    stages = {row['stage']: row for row in json.loads(timings_file.read_text())['stages']}
+    assert {'git diff', 'parse hunks', 'read', 'render', 'output'} <= set(stages)
+    assert stages['parse hunks']['hunks'] == 1
+    assert stages['read']['bytes'] == len('a\nx\nb\nc\n')
+    pstats.Stats(str(profile))
+
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_run_jsonl_and_json_formats(tmp_path, use_async):
+    repo = init_repo_with_change(tmp_path)
+    (repo / "mod.py").write_text("def keep():\n    return 1\n\n\ndef gone():\n    return 2\n")
+    subprocess.run(["git", "add", "mod.py"], check=True)
+    subprocess.run(["git", "commit", "-m", "mod"], check=True, stdout=subprocess.DEVNULL)
+    (repo / "mod.py").write_text("def keep():\n    return 10\n")
+    args = ['run', '--base', 'HEAD', '--context-lines', '0', '--out', 'stdout', '--no-cache']
+    args += ['--async'] if use_async else []
+
+    result = CliRunner().invoke(cli, args + ['--format', 'jsonl'])
+    assert result.exit_code == 0, result.output
+    import json
+
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [r['path'] for r in records] == ['foo.txt', 'mod.py']
+    foo, mod = records
+    assert foo['hunks'] == [{'start': 2, 'end': 2, 'symbol': None}]
+    assert foo['contexts'][0]['text'] == 'x\n'
+    assert '+x' in foo['diff']
+    assert mod['symbols'] == ['keep']
+    assert mod['contexts'][0]['start'] == 1 and mod['contexts'][0]['end'] == 2
+    assert mod['contexts'][0]['backend'] in ('tree-sitter', 'ast')
+    assert mod['tokens'] == mod['diff_tokens'] + mod['contexts'][0]['tokens'] > 0
+
+    result = CliRunner().invoke(cli, args + ['--format', 'json', '--ticket', 'ABC-1'])
+    document = json.loads(result.output)
+    assert document['ticket'] == 'ABC-1'
+    assert document['files'] == records
+    assert document['tokens'] == sum(r['tokens'] for r in records)
+
+    result = CliRunner().invoke(cli, args + ['--format', 'jsonl', '--max-tokens', '100'])
+    assert result.exit_code == 2
@@ -1,5 +1,9 @@
 import ast
-from codereviewprompt.context import extract_by_symbol
+
+import pytest
+from conftest import commit
+
+from codereviewprompt.context import SymbolIndex, extract_by_symbol
 from codereviewprompt.diff import extract_context
 
 
@@ -46,9 +50,16 @@ def test_extract_by_symbol_python_class(tmp_path):
     # Hunk inside method m (line 3)
     hunks = [(3, 3)]
     contexts = extract_by_symbol(str(file_path), hunks, context_lines=0)
-    # Should extract class A block (lines 1-3)
+    # Should extract the innermost symbol, method m (lines 2-3)
     assert len(contexts) == 1
     ctx = contexts[0]
+    assert ctx['context_start'] == 2
+    assert ctx['context_end'] == 3
+    assert ctx['snippet'] == ''.join(content[1:3])
+
+    # Outermost scope extracts class A block (lines 1-3)
+    contexts = extract_by_symbol(str(file_path), hunks, context_lines=0, scope='outermost')
+    ctx = contexts[0]
     assert ctx['context_start'] == 1
     assert ctx['context_end'] == 3
     expected = ''.join(content[0:3])
@@ -78,4 +89,232 @@ def test_extract_by_symbol_syntax_error(tmp_path):
     # context_start should be 1 (2-1)
     assert ctx['context_start'] == 1
     # snippet should include both lines
-    assert 'def bad()' in ctx['snippet']
\ No newline at end of file
+    assert 'def bad()' in ctx['snippet']
+
+def test_extract_all_keeps_order_and_isolates_failures(tmp_path, monkeypatch):
+    import codereviewprompt.context as context
+
+    hunks_map = {}
+    for i in range(8):
+        path = tmp_path / f'mod{i}.py'
+        path.write_text(f'def f{i}():\n    return {i}\n')
+        hunks_map[str(path)] = [(2, 2)]
+    hunks_map[str(tmp_path / 'deleted.py')] = [(1, 1)]
+
+    real = context.extract_file_context
+
+    def flaky(file_path, *args):
+        if file_path.endswith('mod3.py'):
+            raise ValueError('boom')
+        return real(file_path, *args)
+
+    monkeypatch.setattr(context, 'extract_file_context', flaky)
+    results = list(context.extract_all(hunks_map, context_lines=0, jobs=4))
+
+    assert [path for path, _, _ in results] == list(hunks_map)
+    by_path = {path: (snippets, error) for path, snippets, error in results}
+    assert isinstance(by_path[str(tmp_path / 'mod3.py')][1], ValueError)
+    assert by_path[str(tmp_path / 'deleted.py')] == ([], None)
+    snippets, error = by_path[str(tmp_path / 'mod5.py')]
+    assert error is None
+    assert snippets[0]['snippet'] == 'def f5():\n    return 5\n'
+
+
+def test_symbol_index_nested_lookup():
+    # module-level class 1-20 containing methods 2-5 and 7-15 (with a nested def 9-12),
+    # followed by a top-level function 22-30
+    index = SymbolIndex([(22, 30), (1, 20), (7, 15), (2, 5), (9, 12)])
+    assert index.innermost(10) == (9, 12)
+    assert index.outermost(10) == (1, 20)
+    assert index.innermost(13) == (7, 15)
+    assert index.innermost(6) == (1, 20)
+    assert index.innermost(25) == (22, 30)
+    assert index.outermost(25) == (22, 30)
+    assert index.innermost(21) is None
+    assert index.lookup(31) is None
+    assert index.lookup(3, 'outermost') == (1, 20)
+
+
+def test_symbol_index_overlapping_ranges_are_siblings():
+    # `const a = () => {\n}, b = () => {\n}`: declarators share line 2
+    index = SymbolIndex([(1, 2), (2, 3)])
+    assert index.outermost(3) == (2, 3)
+    assert index.innermost(3) == (2, 3)
+    assert index.outermost(1) == (1, 2)
+    index = SymbolIndex([(1, 10), (1, 2), (2, 3)])
+    assert index.innermost(3) == (2, 3)
+    assert index.outermost(3) == (1, 10)
+
+
+def test_parser_registry_reuses_parsers_per_thread():
+    import threading
+    from codereviewprompt.context import get_language, get_parser, parser_backend
+
+    if get_language('python') is None:
+        assert parser_backend('python') == 'ast'
+        pytest.skip('python grammar not installed')
+    assert get_language('python') is get_language('python')
+    assert get_parser('python') is get_parser('python')
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_parser('python')))
+    thread.start()
+    thread.join()
+    assert other[0] is not None
+    assert other[0] is not get_parser('python')
+    assert parser_backend('python') == 'tree-sitter'
+
+
+def test_extract_by_symbol_reports_ast_backend(tmp_path, monkeypatch):
+    import codereviewprompt.context as context
+
+    monkeypatch.setattr(context, 'get_parser', lambda name: None)
+    file_path = tmp_path / 'mod.py'
+    file_path.write_text('def foo():\n    return 1\n')
+    contexts = extract_by_symbol(str(file_path), [(2, 2)], context_lines=0)
+    assert contexts[0]['backend'] == 'ast'
+    assert contexts[0]['context_start'] == 1
+
+
+def test_parse_symbol_ranges_limits_to_hunk_lines():
+    from codereviewprompt.context import parse_symbol_ranges, parser_backend
+
+    lines = [
+        'class A:\n',
+        '    def m(self):\n',
+        '        return 1\n',
+        '    def n(self):\n',
+        '        return 2\n',
+        'def other():\n',
+        '    pass\n',
+    ]
+    ranges, backend = parse_symbol_ranges(lines)
+    assert ranges == [(1, 5), (2, 3), (4, 5), (6, 7)]
+    if backend == 'tree-sitter':
+        # Only definitions overlapping line 5 are reported: the class and method n
+        ranges, _ = parse_symbol_ranges(lines, [(5, 5)])
+        assert ranges == [(1, 5), (4, 5)]
+
+
+def test_extract_by_symbol_deeply_nested(tmp_path):
+    # Deep enough to overflow a recursive Python walk of the syntax tree
+    depth = 600
+    source = ''.join('    ' * i + f'def f{i}():\n' for i in range(depth))
+    source += '    ' * depth + 'return 1\n'
+    file_path = tmp_path / 'deep.py'
+    file_path.write_text(source)
+    contexts = extract_by_symbol(str(file_path), [(depth + 1, depth + 1)], context_lines=0)
+    assert contexts[0]['context_end'] == depth + 1
+    if contexts[0].get('backend') == 'tree-sitter':
+        # Innermost definition is the last nested function
+        assert contexts[0]['context_start'] == depth
+
+
+def test_incremental_parse_matches_full_parse(git_repo):
+    import codereviewprompt.context as context
+    from codereviewprompt.diff import read_diff
+
+    if context.parser_backend('python') != 'tree-sitter' or not context._edits_tree_copies():
+        pytest.skip('needs the Tree-sitter Python grammar and tree-sitter >= 0.25')
+    base = ''.join(f'def f{i}(x):\n    y = x + {i}\n    return y\n\n' for i in range(50))
+    (git_repo / 'mod.py').write_text(base)
+    commit()
+
+    lines = base.splitlines(keepends=True)
+    lines[5] = '    y = x * 100\n'                         # change inside f1
+    lines[20:24] = []                                      # delete f5
+    lines.insert(40, 'class Added:\n    def m(self):\n        pass\n\n')  # insert
+    (git_repo / 'mod.py').write_text(''.join(lines))
+
+    with read_diff('HEAD') as result:
+        file_diff = result.files[0]
+        assert file_diff.old_blob and file_diff.edits
+        new_lines = context.decode_lines((git_repo / 'mod.py').read_bytes())
+        full, _ = context.parse_symbol_ranges(new_lines)
+        incremental, backend = context.parse_symbol_ranges(new_lines, base=file_diff)
+        assert backend == 'tree-sitter'
+        assert incremental == full
+        assert ('python', file_diff.old_blob) in context._base_trees
+
+        parser = context.get_parser('python')
+        source = ''.join(new_lines).encode('utf8')
+        tree = context._incremental_parse('python', parser, new_lines, source, file_diff)
+        assert str(tree.root_node) == str(parser.parse(source).root_node)
+
+
+def test_incremental_parse_is_skipped_before_tree_sitter_0_25(monkeypatch):
+    import tree_sitter
+
+    from codereviewprompt import context
+    from codereviewprompt.diff import FileDiff
+
+    monkeypatch.delattr(tree_sitter, 'QueryCursor', raising=False)
+    monkeypatch.setattr(context, '_base_trees', type(context._base_trees)())
+    base = FileDiff('mod.py', old_blob='abc1234', edits=[(2, 1, 2, 1)])
+    lines = ['def a():\n', '    return 2\n']
+    assert context._incremental_parse('python', None, lines, b'', base) is None
+    assert not context._base_trees
+
+
+def test_coalesce_contexts_merges_overlapping_snippets(tmp_path):
+    from codereviewprompt.context import coalesce_contexts
+
+    lines = [f'line{i}\n' for i in range(1, 31)]
+    file_path = tmp_path / 'f.txt'
+    file_path.write_text(''.join(lines))
+    other = tmp_path / 'g.txt'
+    other.write_text(''.join(lines))
+    contexts = (
+        extract_context(str(file_path), [(5, 5), (8, 9), (12, 12), (25, 25)], context_lines=2)
+        + extract_context(str(other), [(3, 3)], context_lines=1)
+        + extract_context(str(file_path), [(8, 9)], context_lines=2)  # exact duplicate
+    )
+    before = sum(len(c['snippet']) for c in contexts)
+
+    merged, saved = coalesce_contexts(contexts)
+
+    assert [(c['file_path'], c['context_start'], c['context_end']) for c in merged] == [
+        (str(file_path), 3, 14),
+        (str(file_path), 23, 27),
+        (str(other), 2, 4),
+    ]
+    first = merged[0]
+    assert first['snippet'] == ''.join(lines[2:14])
+    assert first['hunks'] == [(5, 5), (8, 9), (12, 12)]
+    assert (first['hunk_start'], first['hunk_end']) == (5, 12)
+    assert merged[1]['hunks'] == [(25, 25)]
+    assert saved == before - sum(len(c['snippet']) for c in merged)
+    assert saved > 0
+
+
+def test_query_nodes_uses_query_point_range_before_tree_sitter_0_25(monkeypatch):
+    import tree_sitter
+
+    from codereviewprompt import context
+
+    class OldQuery:
+        """The tree-sitter 0.23/0.24 API: point range and captures on the Query."""
+        point_range = None
+
+        def set_point_range(self, point_range):
+            self.point_range = point_range
+
+        def captures(self, root):
+            return {'definition': [(root, self.point_range)]}
+
+    monkeypatch.delattr(tree_sitter, 'QueryCursor', raising=False)
+    query = OldQuery()
+    assert context._query_nodes(query, 'root', (2, 0), (5, 0)) == [('root', ((2, 0), (5, 0)))]
+
+
+def test_parse_symbol_ranges_falls_back_when_tree_sitter_fails(monkeypatch):
+    from codereviewprompt import context
+
+    def broken(*args):
+        raise TypeError('captures() takes at most 2 arguments (3 given)')
+
+    monkeypatch.setattr(context, 'get_parser', lambda name: object())
+    monkeypatch.setattr(context, 'definitions_query', lambda name: object())
+    monkeypatch.setattr(context, '_tree_sitter_ranges', broken)
+    lines = ['def f():\n', '    return 1\n']
+    assert context.parse_symbol_ranges(lines) == ([(1, 2)], 'ast')
+    assert context.parse_symbol_ranges(lines, language='go') == (None, 'none')
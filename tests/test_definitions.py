@@ -0,0 +1,90 @@
+import pytest
+from click.testing import CliRunner
+from conftest import commit, git
+
+from codereviewprompt.budget import estimate_tokens
+from codereviewprompt.cache import SymbolCache
+from codereviewprompt.cli import cli
+from codereviewprompt.context import extract_all
+from codereviewprompt.definitions import DefinitionIndex, related_definitions, tracked_files
+from codereviewprompt.diff import read_diff
+
+HELPERS = '''def normalize(text):
+    return text.strip().lower()
+
+
+def unused():
+    return 0
+
+
+class Cache:
+    def get(self, key):
+        return key
+'''
+
+APP = '''from helpers import normalize
+
+
+def handle(text):
+    return text
+'''
+
+
+@pytest.fixture
+def repo(git_repo):
+    (git_repo / 'helpers.py').write_text(HELPERS)
+    (git_repo / 'app.py').write_text(APP)
+    (git_repo / 'README.md').write_text('normalize\n')
+    commit()
+    (git_repo / 'app.py').write_text(APP.replace('return text', 'return normalize(text) or Cache()'))
+    return git_repo
+
+
+def contexts():
+    with read_diff('HEAD') as diff_result:
+        return [ctx for _, snippets, _ in extract_all(diff_result.hunks, 0, jobs=1) for ctx in snippets]
+
+
+def test_tracked_files_lists_registered_languages(repo):
+    paths = [path for path, _ in tracked_files()]
+    assert paths == ['app.py', 'helpers.py']
+    commit('change')
+    assert [path for path, _ in tracked_files('HEAD')] == paths
+
+
+def test_related_definitions_resolve_names_in_changed_lines(repo):
+    related = related_definitions(contexts(), 1000, estimate_tokens)
+    assert [(ctx['file_path'], ctx['context_start'], ctx['context_end']) for ctx in related] == [
+        ('helpers.py', 1, 2),
+        ('helpers.py', 9, 11),
+    ]
+    assert related[0]['snippet'].startswith('def normalize(text):')
+    # Only what fits the budget is added
+    related = related_definitions(contexts(), 20, estimate_tokens)
+    assert [ctx['context_start'] for ctx in related] == [1]
+
+
+def test_definition_index_is_cached_per_blob(repo, tmp_path):
+    with SymbolCache(str(tmp_path / 'cache.sqlite')) as cache:
+        first = DefinitionIndex(cache, jobs=1).build(tracked_files())
+        assert first.parsed == 2
+        assert [d.path for d in first.by_name['normalize']] == ['helpers.py']
+        assert [(d.start, d.end) for d in first.by_name['get']] == [(10, 11)]
+        second = DefinitionIndex(cache, jobs=1).build(tracked_files())
+        assert second.parsed == 0
+        assert second.by_name == first.by_name
+
+        (repo / 'helpers.py').write_text('\n' + HELPERS)
+        git('add', 'helpers.py')
+        third = DefinitionIndex(cache, jobs=1).build(tracked_files())
+        assert third.parsed == 1
+        assert third.by_name['normalize'][0].start == 2
+
+
+def test_run_related_tokens(repo):
+    result = CliRunner().invoke(
+        cli, ['run', '--base', 'HEAD', '--out', 'stdout', '--context-lines', '0', '--related-tokens', '200'],
+    )
+    assert result.exit_code == 0, result.output
+    assert '## Referenced Definitions' in result.output
+    assert '### helpers.py:1-2 (`normalize`)\n```\ndef normalize(text):' in result.output
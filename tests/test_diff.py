@@ -2,7 +2,7 @@ import os
 import subprocess
 import pytest
 
-from codereviewprompt.diff import get_diff_hunks, extract_context
+from codereviewprompt.diff import get_diff_hunks, extract_context, read_diff
 
 def test_extract_context_simple(tmp_path):
     # Create a test file with 10 lines
@@ -75,4 +75,84 @@ def test_get_diff_hunks(tmp_path):
         assert start == 3
         assert end == 3
     finally:
-        os.chdir(cwd)
\ No newline at end of file
+        os.chdir(cwd)
+
+def test_read_diff_collects_hunks_and_text(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        subprocess.run(["git", "init"], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(["git", "config", "user.email", "test@example.com"], check=True)
+        subprocess.run(["git", "config", "user.name", "Test User"], check=True)
+
+        (repo / "foo.txt").write_text("a\nb\nc\n")
+        (repo / "gone.txt").write_text("bye\n")
+        subprocess.run(["git", "add", "."], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(["git", "commit", "-m", "initial"], check=True, stdout=subprocess.DEVNULL)
+
+        # Added content that looks like a diff header must not confuse the parser
+        (repo / "foo.txt").write_text("a\n++ not a header\nb\nc\n")
+        (repo / "gone.txt").unlink()
+
+        with read_diff('HEAD') as result:
+            assert result.hunks == {'foo.txt': [(2, 2)]}
+            assert [f.path for f in result.files] == ['foo.txt', 'gone.txt']
+            assert result.files[1].deleted
+            foo_text = result.text(result.files[0])
+            assert foo_text.startswith('diff --git a/foo.txt b/foo.txt')
+            assert '+++ not a header' in foo_text
+            assert ''.join(result.iter_text()).count('diff --git') == 2
+    finally:
+        os.chdir(cwd)
+
+
+def test_read_diff_bad_base_is_empty(tmp_path):
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        subprocess.run(["git", "init"], check=True, stdout=subprocess.DEVNULL)
+        result = read_diff('no-such-ref')
+        assert not result
+        assert result.files == []
+    finally:
+        os.chdir(cwd)
+
+
+def test_read_diff_detects_renames_and_copies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init"], check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(["git", "config", "user.email", "test@example.com"], check=True)
+    subprocess.run(["git", "config", "user.name", "Test User"], check=True)
+    body = ''.join(f'line {i}\n' for i in range(1, 41))
+    (tmp_path / "moved.txt").write_text(body)
+    (tmp_path / "edited.txt").write_text(body.replace('line', 'row'))
+    (tmp_path / "source.txt").write_text(body.replace('line', 'item'))
+    subprocess.run(["git", "add", "."], check=True)
+    subprocess.run(["git", "commit", "-m", "initial"], check=True, stdout=subprocess.DEVNULL)
+
+    subprocess.run(["git", "mv", "moved.txt", "pkg_moved.txt"], check=True)
+    subprocess.run(["git", "mv", "edited.txt", "pkg_edited.txt"], check=True)
+    (tmp_path / "pkg_edited.txt").write_text(body.replace('line', 'row').replace('row 20\n', 'row twenty\n'))
+    (tmp_path / "source.txt").write_text(body.replace('line', 'item') + 'item 41\n')
+    (tmp_path / "copy.txt").write_text(body.replace('line', 'item').replace('item 5\n', 'item five\n'))
+    subprocess.run(["git", "add", "."], check=True)
+
+    with read_diff('HEAD') as result:
+        files = {f.path: f for f in result.files}
+        assert set(files) == {'copy.txt', 'pkg_edited.txt', 'pkg_moved.txt', 'source.txt'}
+        moved = files['pkg_moved.txt']
+        assert (moved.old_path, moved.similarity, moved.copied) == ('moved.txt', 100, False)
+        assert moved.pure_move and 'pkg_moved.txt' not in result.hunks
+        # Only the edited line of a renamed file is a hunk, not the whole file
+        edited = files['pkg_edited.txt']
+        assert edited.old_path == 'edited.txt' and not edited.pure_move
+        assert result.hunks['pkg_edited.txt'] == [(20, 20)]
+        copy = files['copy.txt']
+        assert copy.copied and copy.old_path == 'source.txt'
+        assert result.hunks['copy.txt'] == [(5, 5)]
+
+    with read_diff('HEAD', renames=False) as result:
+        assert result.hunks['pkg_moved.txt'] == [(1, 40)]
+        assert all(f.old_path is None for f in result.files)
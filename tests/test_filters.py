@@ -0,0 +1,71 @@
+import pytest
+from click.testing import CliRunner
+from conftest import commit
+
+from codereviewprompt.cli import cli
+from codereviewprompt.diff import read_diff
+from codereviewprompt.filters import PathFilter, glob_pathspecs, read_ignore_file
+
+
+@pytest.fixture
+def repo(git_repo):
+    files = {
+        'app.py': 'x = 1\n',
+        'src/lib.py': 'y = 1\n',
+        'vendor/dep.py': 'z = 1\n',
+        'uv.lock': 'lock = 1\n',
+        'gen/schema.py': 's = 1\n',
+        'big.sql': 'select 1;\n',
+    }
+    for name, text in files.items():
+        (git_repo / name).parent.mkdir(parents=True, exist_ok=True)
+        (git_repo / name).write_text(text)
+    (git_repo / '.gitattributes').write_text('gen/** linguist-generated\n')
+    commit()
+    for name, text in files.items():
+        (git_repo / name).write_text(text + 'changed = 2\n')
+    (git_repo / 'big.sql').write_text('select 1;\n' * 500)
+    return git_repo
+
+
+def diffed(specs):
+    with read_diff('HEAD', paths=specs) as result:
+        return [f.path for f in result.files]
+
+
+def test_glob_pathspecs():
+    assert glob_pathspecs('*.lock') == [':(glob)**/*.lock', ':(glob)**/*.lock/**']
+    assert glob_pathspecs('/vendor/', exclude=True) == [
+        ':(exclude,glob)vendor', ':(exclude,glob)vendor/**'
+    ]
+
+
+def test_default_excludes_and_generated_files(repo):
+    specs = PathFilter.from_options().pathspecs()
+    assert diffed(specs) == ['app.py', 'big.sql', 'src/lib.py', 'vendor/dep.py']
+
+
+def test_ignore_file_replaces_defaults(repo):
+    (repo / '.codereviewpromptignore').write_text('# third party\nvendor/\n\n!keep.py\n')
+    assert read_ignore_file() == ['vendor/']
+    specs = PathFilter.from_options(exclude=('*.sql',)).pathspecs()
+    assert diffed(specs) == ['app.py', 'src/lib.py', 'uv.lock']
+
+
+def test_include_and_oversized(repo):
+    path_filter = PathFilter.from_options(include=('*.py', '*.sql'), max_file_size=1000)
+    specs = path_filter.pathspecs()
+    assert diffed(specs) == ['app.py', 'big.sql', 'src/lib.py', 'vendor/dep.py']
+    assert path_filter.oversized('HEAD', None, specs) == ['big.sql']
+
+
+def test_run_reports_skipped_oversized_files(repo):
+    result = CliRunner().invoke(
+        cli, ['run', '--base', 'HEAD', '--out', 'stdout', '--no-cache', '--exclude', 'vendor',
+              '--max-file-size', '1000'],
+    )
+    assert result.exit_code == 0, result.output
+    assert 'Skipping 1 files over 1000 bytes: big.sql' in result.output
+    assert 'diff --git a/app.py' in result.output
+    for name in ('big.sql', 'vendor/dep.py', 'uv.lock', 'gen/schema.py'):
+        assert f'diff --git a/{name}' not in result.output
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+import codereviewprompt.languages as languages
+from codereviewprompt.context import extract_by_symbol
+from codereviewprompt.languages import LanguageSpec, definition_name, language_for_path
+
+
+def test_language_for_path_maps_extensions():
+    assert language_for_path('pkg/mod.py').name == 'python'
+    assert language_for_path('cmd/main.go').name == 'go'
+    assert language_for_path('web/App.TSX').name == 'tsx'
+    assert language_for_path('src/lib.rs').name == 'rust'
+    assert language_for_path('README.md') is None
+    assert language_for_path('Makefile') is None
+
+
+def test_grammars_load_lazily(tmp_path):
+    languages._languages.pop('go', None)
+    path = tmp_path / 'mod.py'
+    path.write_text('def foo():\n    return 1\n')
+    extract_by_symbol(str(path), [(2, 2)], context_lines=0)
+    assert 'python' in languages._languages
+    assert 'go' not in languages._languages
+
+
+def test_definitions_query_skips_unknown_node_types(monkeypatch):
+    if languages.get_language('python') is None:
+        pytest.skip('python grammar not installed')
+    spec = LanguageSpec('python', ('.py',), ('function_definition', 'no_such_node'))
+    monkeypatch.setitem(languages._BY_NAME, 'python', spec)
+    monkeypatch.setattr(languages, '_queries', {})
+    query = languages.definitions_query('python')
+    assert query is not None
+    assert query.pattern_count == 1
+
+
+def test_extract_by_symbol_go(tmp_path):
+    if languages.get_language('go') is None:
+        pytest.skip('go grammar not installed')
+    content = (
+        'package main\n'
+        '\n'
+        'func add(a, b int) int {\n'
+        '\treturn a + b\n'
+        '}\n'
+    )
+    path = tmp_path / 'main.go'
+    path.write_text(content)
+    contexts = extract_by_symbol(str(path), [(4, 4)], context_lines=0)
+    assert (contexts[0]['context_start'], contexts[0]['context_end']) == (3, 5)
+    assert contexts[0]['backend'] == 'tree-sitter'
+
+
+def test_extract_by_symbol_javascript_function_values(tmp_path):
+    if languages.get_language('javascript') is None:
+        pytest.skip('javascript grammar not installed')
+    content = (
+        'export const add = (a, b) => {\n'
+        '  return a + b;\n'
+        '};\n'
+        '\n'
+        'const scale = function (xs, k) {\n'
+        '  return xs.map((x) => x * k);\n'
+        '};\n'
+    )
+    path = tmp_path / 'math.js'
+    path.write_text(content)
+    contexts = extract_by_symbol(str(path), [(2, 2), (6, 6)], context_lines=0)
+    # The callback on line 6 is not a definition; its named enclosing function is
+    assert [(c['context_start'], c['context_end']) for c in contexts] == [(1, 3), (5, 7)]
+    assert contexts[0]['backend'] == 'tree-sitter'
+    assert [definition_name(content.splitlines()[c['context_start'] - 1]) for c in contexts] == [
+        'add', 'scale',
+    ]
+
+
+def test_definition_name_reads_variable_bound_functions():
+    assert definition_name('export const add = (a, b) => {') == 'add'
+    assert definition_name('let handler: Handler = async <T,>(req: T) => {') == 'handler'
+    assert definition_name('var double = x => x * 2') == 'double'
+    assert definition_name('const scale = function named(xs) {') == 'scale'
+    assert definition_name('function plain(a) {') == 'plain'
+    assert definition_name('func (s *Server) Serve(l net.Listener) error {') == 'Serve'
+
+def test_extract_by_symbol_without_grammar_uses_line_windows(tmp_path, monkeypatch):
+    monkeypatch.setitem(languages._languages, 'rust', None)
+    path = tmp_path / 'lib.rs'
+    path.write_text('fn a() {}\nfn b() {}\nfn c() {}\n')
+    contexts = extract_by_symbol(str(path), [(2, 2)], context_lines=1)
+    assert (contexts[0]['context_start'], contexts[0]['context_end']) == (1, 3)
+    assert 'backend' not in contexts[0]
+
+
+def test_incompatible_grammar_falls_back_to_ast(tmp_path, monkeypatch):
+    tree_sitter = pytest.importorskip('tree_sitter')
+
+    def incompatible(language):
+        raise ValueError('Incompatible Language version 15. Must be between 13 and 14')
+
+    monkeypatch.setattr(tree_sitter, 'Parser', incompatible)
+    monkeypatch.setitem(languages._languages, 'python', object())
+    monkeypatch.setattr(languages, '_thread_local', threading.local())
+    assert languages.get_parser('python') is None
+    assert languages.parser_backend('python') == 'ast'
+    path = tmp_path / 'mod.py'
+    path.write_text('def a():\n    return 1\n')
+    contexts = extract_by_symbol(str(path), [(2, 2)], context_lines=0)
+    assert contexts[0]['backend'] == 'ast'
+    assert (contexts[0]['context_start'], contexts[0]['context_end']) == (1, 2)
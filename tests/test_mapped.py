@@ -0,0 +1,55 @@
+import pytest
+
+from codereviewprompt import mapped
+from codereviewprompt.blobs import WorkingTreeReader
+from codereviewprompt.context import extract_all
+from codereviewprompt.mapped import MappedBuffer, UnsupportedContentError, newline_index, sniff
+
+
+def test_newline_index_with_and_without_trailing_newline():
+    assert list(newline_index(b'a\nbb\n')) == [0, 2, 5]
+    assert list(newline_index(b'a\nbb')) == [0, 2, 4]
+    assert list(newline_index(b'')) == [0]
+
+
+def test_sniff_detects_binary_and_other_encodings():
+    assert sniff(b'def f():\n    return "\xc3\xa9"\n') is None
+    assert sniff(b'\x89PNG\r\n\x1a\n\0\0') == 'binary file'
+    assert sniff('caf\xe9\n'.encode('latin-1')) == 'not UTF-8 text'
+    # A multi-byte character cut at the end of the sample is not an error
+    data = b'a' * (mapped.SNIFF_BYTES - 1) + '\xe9'.encode('utf8') + b'\n'
+    assert sniff(data) is None
+
+
+def test_mapped_buffer_slices_lines(tmp_path):
+    path = tmp_path / 'dump.sql'
+    path.write_bytes(b'one\r\ntwo\nthree\n')
+    buffer = MappedBuffer(str(path))
+    assert len(buffer) == 3
+    assert bytes(buffer.view(2, 3)) == b'two\nthree\n'
+    assert buffer.lines(1, 2) == 'one\ntwo\n'
+    assert buffer.size(1, 1) == 5
+    buffer.close()
+
+
+class EagerMapReader(WorkingTreeReader):
+    """Memory-maps every file, however small."""
+
+    def map(self, path, min_bytes=1):
+        return super().map(path, min_bytes)
+
+
+def test_large_and_undecodable_files_in_extract_all(tmp_path):
+    big = tmp_path / 'big.sql'
+    big.write_text(''.join(f'INSERT INTO t VALUES ({i});\n' for i in range(1, 101)))
+    latin = tmp_path / 'latin.py'
+    latin.write_bytes('x = "caf\xe9"\n'.encode('latin-1'))
+    hunks_map = {str(big): [(50, 50)], str(latin): [(1, 1)]}
+    results = list(extract_all(hunks_map, 1, jobs=1, reader=EagerMapReader()))
+    (_, snippets, error), (_, _, latin_error) = results
+    assert error is None
+    assert isinstance(snippets[0].source, MappedBuffer)
+    assert snippets[0]['snippet'] == ''.join(f'INSERT INTO t VALUES ({i});\n' for i in (49, 50, 51))
+    assert isinstance(latin_error, UnsupportedContentError)
+    with pytest.raises(UnsupportedContentError):
+        MappedBuffer(str(latin))
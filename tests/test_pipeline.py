@@ -0,0 +1,39 @@
+import pytest
+from conftest import commit
+
+from codereviewprompt.context import extract_all
+from codereviewprompt.diff import read_diff
+from codereviewprompt.pipeline import extract_streaming
+
+
+@pytest.fixture
+def repo(git_repo):
+    for n in range(8):
+        (git_repo / f'mod{n}.py').write_text(f'def f{n}():\n    return {n}\n')
+    (git_repo / 'gone.py').write_text('x = 1\n')
+    commit()
+    for n in range(8):
+        (git_repo / f'mod{n}.py').write_text(f'def f{n}():\n    return {n * 10}\n')
+    # A diff line far longer than one read chunk
+    (git_repo / 'mod3.py').write_text('def f3():\n    return "' + 'x' * 200_000 + '"\n')
+    (git_repo / 'gone.py').unlink()
+    return git_repo
+
+
+def test_streaming_matches_sequential_extraction_in_diff_order(repo):
+    diff_result, results = extract_streaming('HEAD', 1, jobs=3)
+    with diff_result, read_diff('HEAD') as expected:
+        assert [f.path for f in diff_result.files] == [f.path for f in expected.files]
+        assert list(diff_result.iter_text()) == list(expected.iter_text())
+        assert diff_result.hunks == expected.hunks
+        sequential = list(extract_all(expected.hunks, 1, jobs=1))
+    assert [(path, error) for path, _, error in results] == [
+        (path, error) for path, _, error in sequential
+    ]
+    assert [dict(c) for _, s, _ in results for c in s] == [dict(c) for _, s, _ in sequential for c in s]
+    assert 'gone.py' not in [path for path, _, _ in results]
+
+
+def test_streaming_returns_empty_diff_when_git_fails(repo):
+    diff_result, results = extract_streaming('no-such-ref', 1)
+    assert not diff_result and results == []
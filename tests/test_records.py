@@ -0,0 +1,45 @@
+import pytest
+
+from codereviewprompt.context import coalesce_contexts
+from codereviewprompt.diff import extract_context
+from codereviewprompt.records import IntTuples, SourceBuffer, Snippet
+
+
+def test_int_tuples_behave_like_a_list_of_tuples():
+    hunks = IntTuples(2, [(1, 2), (5, 5)])
+    hunks.append((9, 12))
+    assert len(hunks) == 3
+    assert list(hunks) == [(1, 2), (5, 5), (9, 12)]
+    assert hunks[-1] == (9, 12)
+    assert hunks[1:] == [(5, 5), (9, 12)]
+    assert hunks == [(1, 2), (5, 5), (9, 12)]
+    assert {'a.py': hunks} == {'a.py': [(1, 2), (5, 5), (9, 12)]}
+    with pytest.raises(ValueError):
+        hunks.append((1, 2, 3))
+
+
+def test_snippet_is_a_view_read_like_a_dict():
+    source = SourceBuffer(['a\n', 'b\n', 'é\n', 'd\n'])
+    ctx = Snippet('f.py', 2, 3, 2, 3, source, backend='ast')
+    assert ctx['snippet'] == 'b\né\n'
+    assert ctx.size() == len('b\né\n'.encode('utf8'))
+    assert 'backend' in ctx and 'hunks' not in ctx
+    assert ctx == {
+        'file_path': 'f.py', 'hunk_start': 2, 'hunk_end': 3,
+        'context_start': 2, 'context_end': 3, 'snippet': 'b\né\n', 'backend': 'ast',
+    }
+    assert ctx.replace(context_end=4)['snippet'] == 'b\né\nd\n'
+    ctx['snippet'] = 'override'
+    assert ctx['snippet'] == 'override'
+
+
+def test_coalesce_widens_views_without_copying_text():
+    lines = [f'line {i}\n' for i in range(1, 31)]
+    contexts = extract_context('m.py', [(5, 5), (8, 8), (25, 25)], 2, lines)
+    merged, saved = coalesce_contexts(contexts)
+    first = merged[0]
+    assert first._text is None and first.source is contexts[0].source
+    assert (first['context_start'], first['context_end']) == (3, 10)
+    assert first['snippet'] == ''.join(lines[2:10])
+    assert first['hunks'] == [(5, 5), (8, 8)]
+    assert saved == len('line 6\nline 7\n')
@@ -0,0 +1,71 @@
+import io
+
+from codereviewprompt.diff import DiffResult, FileDiff
+from codereviewprompt.render import header_lines, snippet_header, write_prompt
+
+
+def make_diff(texts: list[tuple[str, str]]) -> DiffResult:
+    import tempfile
+
+    spool = tempfile.SpooledTemporaryFile()
+    result = DiffResult(spool)
+    for path, text in texts:
+        data = text.encode('utf-8')
+        result.files.append(FileDiff(path, offset=spool.tell(), length=len(data)))
+        spool.write(data)
+    return result
+
+
+def test_write_text_streams_multibyte_text_in_small_chunks():
+    text = 'diff --git a/é.txt b/é.txt\n+héllo wörld ✓\n'
+    with make_diff([('é.txt', text)]) as diff:
+        out = io.StringIO()
+        diff.write_text(diff.files[0], out, chunk_size=1)
+        assert out.getvalue() == text
+
+
+def test_write_prompt_sections_in_order():
+    ctx = {
+        'file_path': 'a.py',
+        'hunk_start': 2,
+        'hunk_end': 4,
+        'context_start': 1,
+        'context_end': 5,
+        'snippet': 'l1\nl2\nl3\nl4\nl5\n',
+        'hunks': [(2, 2), (4, 4)],
+    }
+    with make_diff([('a.py', 'diff --git a/a.py b/a.py\n+l2\n'), ('b.py', 'diff --git a/b.py b/b.py\n+x\n')]) as diff:
+        out = io.StringIO()
+        write_prompt(out, diff, [ctx], ticket='ABC-1', diff_files=diff.files[:1], omitted_diff_files=1)
+    prompt = out.getvalue()
+
+    assert prompt.startswith('\n'.join(header_lines('ABC-1')))
+    assert '**Ticket**: ABC-1' in prompt
+    assert '```diff\ndiff --git a/a.py b/a.py\n+l2\n```\n' in prompt
+    assert 'b.py' not in prompt
+    assert '_1 file diffs omitted to fit the token budget._' in prompt
+    assert prompt.index('## Diff') < prompt.index('## Context Snippets')
+    assert '### a.py:1-5 (hunks: 2, 4)\n```\nl1\nl2\nl3\nl4\nl5\n```\n' in prompt
+    assert snippet_header(dict(ctx, hunks=[(2, 2)])) == '### a.py:1-5'
+
+
+def test_write_prompt_summarizes_moves():
+    with make_diff([
+        ('new/a.py', 'diff --git a/a.py b/new/a.py\nsimilarity index 100%\nrename from a.py\nrename to new/a.py\n'),
+        ('c.py', 'diff --git a/b.py b/c.py\nsimilarity index 90%\ncopy from b.py\ncopy to c.py\n+x\n'),
+    ]) as diff:
+        diff.files[0].old_path, diff.files[0].similarity = 'a.py', 100
+        diff.files[1].old_path, diff.files[1].similarity, diff.files[1].copied = 'b.py', 90, True
+        diff.files[1].hunks.append((3, 3))
+        out = io.StringIO()
+        write_prompt(out, diff, [])
+    prompt = out.getvalue()
+
+    assert (
+        '## Renamed and Copied Files\n\n'
+        '- `a.py` → `new/a.py` (renamed, 100% similar)\n'
+        '- `b.py` → `c.py` (copied, 90% similar; edits in the diff below)\n'
+    ) in prompt
+    # The pure rename is only summarized; the copy's edits stay in the diff
+    assert 'rename from' not in prompt
+    assert '```diff\ndiff --git a/b.py b/c.py\n' in prompt
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+from conftest import commit
+
+# Import cost the package may add on top of click, in microseconds
+IMPORT_BUDGET_US = 50_000
+# Wall time budget for `run` when there is nothing to review, in seconds
+NO_CHANGES_BUDGET_S = 0.100
+# Modules that must not be imported before a code path needs them
+HEAVY_MODULES = (
+    'tree_sitter',
+    'tree_sitter_language_pack',
+    'sqlite3',
+    'pyperclip',
+    'concurrent.futures',
+    'codereviewprompt.context',
+    'codereviewprompt.cache',
+)
+
+
+def run_python(code: str, cwd=None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        check=True,
+    )
+
+
+def cumulative_import_us(stderr: str, module: str) -> int:
+    """Cumulative microseconds for `module` from `python -X importtime` output."""
+    for line in stderr.splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f'{module} not found in importtime output')
+
+
+def loaded_heavy_modules(stdout: str) -> list[str]:
+    loaded = stdout.split()
+    return [m for m in HEAVY_MODULES if m in loaded]
+
+
+def test_cli_import_time_budget():
+    result = run_python(
+        'import sys, click, codereviewprompt.cli; print(" ".join(sys.modules))'
+    )
+    own = cumulative_import_us(result.stderr, 'codereviewprompt.cli')
+    assert own < IMPORT_BUDGET_US, f'codereviewprompt.cli import took {own} us'
+    assert loaded_heavy_modules(result.stdout) == []
+
+
+def test_no_changes_path_is_fast_and_lean(git_repo):
+    # A real HEAD, so the budget covers the `git diff --raw` size pre-pass too
+    (git_repo / 'mod.py').write_text('def foo():\n    return 1\n')
+    commit()
+    code = (
+        'import sys, time\n'
+        'from codereviewprompt.cli import cli\n'
+        'start = time.perf_counter()\n'
+        'try:\n'
+        '    cli(["run", "--base", "HEAD"])\n'
+        'except SystemExit:\n'
+        '    pass\n'
+        'print("ELAPSED", time.perf_counter() - start)\n'
+        'print(" ".join(sys.modules))\n'
+    )
+    result = run_python(code, cwd=git_repo)
+    assert 'No changes detected.' in result.stdout
+    elapsed = float(result.stdout.split('ELAPSED ')[1].split()[0])
+    assert elapsed < NO_CHANGES_BUDGET_S, f'no-changes run took {elapsed:.3f}s'
+    assert loaded_heavy_modules(result.stdout.split('\n', 2)[-1]) == []
@@ -0,0 +1,41 @@
+from codereviewprompt.diff import DiffResult, FileDiff
+from codereviewprompt.languages import definition_name
+from codereviewprompt.records import IntTuples, SourceBuffer, Snippet
+from codereviewprompt.structured import file_records
+
+
+def test_definition_name_across_languages():
+    assert definition_name('    def foo(self):') == 'foo'
+    assert definition_name('class Widget(Base):') == 'Widget'
+    assert definition_name('func (s *Server) Handle(w http.ResponseWriter) {') == 'Handle'
+    assert definition_name('  async render() {') == 'render'
+    assert definition_name('public static int add(int a, int b) {') == 'add'
+    assert definition_name('x = 1') is None
+
+
+def test_file_records_cover_every_file_in_diff_order():
+    source = SourceBuffer(['class A:\n', '    def f(self):\n', '        return 1\n', '    x = 2\n'])
+    diff = DiffResult()
+    diff.files = [
+        FileDiff('gone.py', deleted=True),
+        FileDiff('a.py', hunks=IntTuples(2, [(3, 3), (4, 4)])),
+        FileDiff('b.py', old_path='old_b.py', similarity=100),
+    ]
+    snippets = [
+        Snippet('a.py', 3, 3, 2, 3, source, 'ast', symbol=(2, 3)),
+        Snippet('a.py', 4, 4, 4, 4, source),
+    ]
+    records = list(file_records(diff, [('a.py', snippets, None)], len))
+
+    assert [r['path'] for r in records] == ['gone.py', 'a.py', 'b.py']
+    gone, a, b = records
+    assert gone['deleted'] and gone['contexts'] == []
+    assert a['hunks'] == [{'start': 3, 'end': 3, 'symbol': 'f'}, {'start': 4, 'end': 4, 'symbol': None}]
+    assert a['symbols'] == ['f']
+    # Adjacent snippets are coalesced into one context
+    assert a['contexts'] == [{
+        'start': 2, 'end': 4, 'hunks': [[3, 3], [4, 4]], 'backend': 'ast',
+        'text': '    def f(self):\n        return 1\n    x = 2\n', 'tokens': 44,
+    }]
+    assert a['tokens'] == 44
+    assert b['old_path'] == 'old_b.py' and b['hunks'] == []
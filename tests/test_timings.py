@@ -0,0 +1,40 @@
+import threading
+
+from codereviewprompt.timings import Timings, stage
+
+
+def test_summary_sums_counts_and_tallies_labels():
+    timings = Timings()
+    for backend in ('tree-sitter', 'cache', 'tree-sitter'):
+        with timings.stage('parse', bytes=10) as record:
+            record['backend'] = backend
+    timings.add('git diff', timings.origin, 0.5, bytes=7)
+    rows = {row['stage']: row for row in timings.summary()}
+    assert rows['parse']['calls'] == 3
+    assert rows['parse']['bytes'] == 30
+    assert rows['parse']['backend'] == {'tree-sitter': 2, 'cache': 1}
+    assert rows['git diff']['seconds'] == 0.5
+    assert 'backend: tree-sitter=2, cache=1' in timings.format_table()
+
+
+def test_events_from_threads_and_chrome_trace():
+    timings = Timings()
+
+    def work():
+        with stage(timings, 'read', bytes=1):
+            pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    trace = timings.to_chrome_trace()['traceEvents']
+    assert len(trace) == 4
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in trace)
+
+
+def test_stage_is_a_no_op_without_timings():
+    with stage(None, 'render', snippets=2) as record:
+        record['bytes'] = 3
+    assert record == {'snippets': 2, 'bytes': 3}
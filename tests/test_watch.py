@@ -0,0 +1,122 @@
+import os
+
+import pytest
+from click.testing import CliRunner
+from conftest import commit, git
+
+from codereviewprompt.cli import cli
+from codereviewprompt.filters import PathFilter
+from codereviewprompt.watch import Watcher
+
+
+@pytest.fixture
+def repo(git_repo):
+    for name in ('a.py', 'b.py', 'c.py'):
+        (git_repo / name).write_text(f'def {name[0]}():\n    return 1\n')
+    commit()
+    return git_repo
+
+
+def touch(path, text):
+    path.write_text(text)
+    # Make sure the change is visible even on coarse mtime filesystems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_watcher_recomputes_only_changed_files(repo):
+    touch(repo / 'a.py', 'def a():\n    return 2\n')
+    touch(repo / 'b.py', 'def b():\n    return 2\n')
+    watcher = Watcher('HEAD', context_lines=0, jobs=1)
+    assert watcher.poll() == ['a.py', 'b.py']
+    b_contexts = watcher.files['b.py'].contexts
+    assert watcher.poll() == []
+
+    touch(repo / 'a.py', 'def a():\n    return 3\n')
+    touch(repo / 'c.py', 'def c():\n    return 3\n')
+    assert watcher.poll() == ['a.py', 'c.py']
+    # Untouched files keep their snippets without being recomputed
+    assert watcher.files['b.py'].contexts is b_contexts
+    assert '3' in watcher.files['a.py'].contexts[0]['snippet']
+
+    git('checkout', '--', 'b.py')
+    assert watcher.poll() == ['b.py']
+    with watcher.diff_result() as diff_result:
+        assert [f.path for f in diff_result.files] == ['a.py', 'c.py']
+        assert '+    return 3' in diff_result.text(diff_result.files[0])
+    assert [c['file_path'] for c in watcher.contexts()] == ['a.py', 'c.py']
+
+
+def test_watcher_reparses_incrementally_from_base_tree(repo, monkeypatch):
+    import codereviewprompt.context as context
+
+    if context.parser_backend('python') != 'tree-sitter' or not context._edits_tree_copies():
+        pytest.skip('needs the Tree-sitter Python grammar and tree-sitter >= 0.25')
+    calls = []
+    incremental_parse = context._incremental_parse
+    monkeypatch.setattr(
+        context, '_incremental_parse',
+        lambda *args: calls.append(args[-1].path) or incremental_parse(*args),
+    )
+    watcher = Watcher('HEAD', context_lines=0, jobs=1)
+    touch(repo / 'a.py', 'def a():\n    return 2\n')
+    watcher.poll()
+    touch(repo / 'a.py', 'def a():\n    return 3\n')
+    watcher.poll()
+    assert calls == ['a.py', 'a.py']
+    assert '3' in watcher.files['a.py'].contexts[0]['snippet']
+
+
+def test_watcher_diffs_renamed_files_against_their_source(repo):
+    body = ''.join(f'\n\ndef f{i}():\n    return {i}\n' for i in range(10))
+    (repo / 'a.py').write_text('def a():\n    return 1\n' + body)
+    commit('longer')
+    git('mv', 'a.py', 'renamed.py')
+    touch(repo / 'renamed.py', 'def a():\n    return 2\n' + body)
+    watcher = Watcher('HEAD', context_lines=0, jobs=1)
+    assert watcher.poll() == ['renamed.py']
+    assert watcher.files['renamed.py'].old_path == 'a.py'
+    with watcher.diff_result() as diff_result:
+        file_diff, = diff_result.files
+        assert file_diff.old_path == 'a.py'
+        text = diff_result.text(file_diff)
+        assert 'rename from a.py' in text and 'new file' not in text
+        assert '-    return 1' in text and '+    return 2' in text
+
+    touch(repo / 'renamed.py', 'def a():\n    return 3\n' + body)
+    assert watcher.poll() == ['renamed.py']
+    assert watcher.files['renamed.py'].file_diff.old_path == 'a.py'
+    assert '3' in watcher.files['renamed.py'].contexts[0]['snippet']
+
+def test_watcher_skips_files_oversized_on_either_side(repo, monkeypatch):
+    (repo / 'big.py').write_text('x = 1\n' * 200)
+    commit('big')
+    # Shrinks below the limit, but its base blob is still too big
+    touch(repo / 'big.py', 'x = 2\n')
+    touch(repo / 'a.py', 'def a():\n    return 2\n')
+    calls = []
+    oversized = PathFilter.oversized
+    monkeypatch.setattr(
+        PathFilter, 'oversized', lambda *args: calls.append(args) or oversized(*args)
+    )
+    watcher = Watcher('HEAD', context_lines=0, jobs=1, max_file_size=500)
+    assert watcher.poll() == ['a.py']
+    # Unchanged files left out for their size are not sized again
+    assert watcher.poll() == []
+    assert len(calls) == 1
+
+    touch(repo / 'a.py', 'def a():\n' + '    x = 1\n' * 100)
+    assert watcher.poll() == ['a.py']
+    assert 'a.py' not in watcher.files
+
+
+def test_watch_command_writes_prompt(repo):
+    touch(repo / 'a.py', 'def a():\n    return 2\n')
+    out = repo / 'prompt.md'
+    result = CliRunner().invoke(
+        cli, ['watch', '--base', 'HEAD', '--out', str(out), '--no-cache', '--polls', '2',
+              '--interval', '0.05'],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.count('Prompt written to') == 1
+    assert '### a.py:1-2' in out.read_text()